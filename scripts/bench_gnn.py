@@ -0,0 +1,53 @@
+"""Inference latency of the GNN policy for batches of envs stepped together."""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import gymnasium as gym
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import tarware  # noqa: F401
+from tarware_ext.envs import EnvPool
+from tarware_ext.policies.gnn_policy import GNNPolicy
+from tarware_ext.runners import run_episode_batch
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--env-id", default="tarware-tiny-3agvs-2pickers-globalobs-v1")
+    parser.add_argument("--num-envs", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--steps", type=int, default=200)
+    parser.add_argument("--hidden", type=int, default=64)
+    parser.add_argument("--layers", type=int, default=2)
+    parser.add_argument("--weights", default=None, help="Weights saved with GNNPolicy.save")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for num_envs in args.num_envs:
+        pool = EnvPool([lambda: gym.make(args.env_id).unwrapped for _ in range(num_envs)])
+        policy = GNNPolicy(hidden=args.hidden, num_layers=args.layers, seed=args.seed)
+        if args.weights:
+            policy.load(args.weights)
+        start = time.perf_counter()
+        results = run_episode_batch(pool, policy, max_steps=args.steps, seed=args.seed)
+        elapsed = time.perf_counter() - start
+        env_steps = sum(r["episode_length"] for r in results)
+        latency = policy.latency_ms
+        print(
+            f"envs={num_envs:3d} | {env_steps / elapsed:8.1f} env steps/s | per call: "
+            f"graph {latency['graph']:6.2f} ms, masks {latency['masks']:6.2f} ms, "
+            f"forward {latency['forward']:6.2f} ms, total {latency['total']:6.2f} ms "
+            f"({latency['total'] / num_envs:.2f} ms per env)"
+        )
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Compare per-worker forward passes with a shared batched InferenceServer on many rollout worker threads."""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import threading
+import time
+from pathlib import Path
+
+import gymnasium as gym
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import tarware  # noqa: F401
+from tarware_ext.envs import TarwareAdapter
+from tarware_ext.policies.inference_server import InferencePolicy, InferenceServer
+from tarware_ext.runners import run_episode
+
+
+class RandomMLP:
+    """Stand-in for a learned policy: a random-weight MLP scoring the actions, argmax over the valid ones."""
+
+    def __init__(self, obs_length: int, num_actions: int, hidden: int, seed: int = 0) -> None:
+        rng = np.random.default_rng(seed)
+        self.w1 = rng.normal(size=(obs_length, hidden)).astype(np.float32) / np.sqrt(obs_length)
+        self.w2 = rng.normal(size=(hidden, num_actions)).astype(np.float32) / np.sqrt(hidden)
+        self.calls = 0
+
+    def __call__(self, obs: np.ndarray, masks: np.ndarray) -> np.ndarray:
+        self.calls += 1
+        logits = np.maximum(obs.astype(np.float32) @ self.w1, 0.0) @ self.w2
+        logits[masks == 0] = -np.inf
+        return logits.argmax(axis=-1)
+
+
+class DirectPolicy:
+    """Runs the forward pass on the worker's own (1, num_agents, obs_length) batch."""
+
+    uses_masks = True
+
+    def __init__(self, forward: RandomMLP) -> None:
+        self.forward = forward
+
+    def reset(self) -> None:
+        return None
+
+    def act(self, obs, masks=None) -> np.ndarray:
+        return self.forward(np.stack(obs)[None], np.asarray(masks)[None])[0]
+
+
+def run_workers(env_id: str, policy, num_workers: int, steps: int) -> float:
+    envs = [TarwareAdapter(gym.make(env_id).unwrapped) for _ in range(num_workers)]
+    threads = [
+        threading.Thread(target=run_episode, args=(env, policy), kwargs={"max_steps": steps, "seed": i})
+        for i, env in enumerate(envs)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return num_workers * steps / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--env-id", default="tarware-tiny-3agvs-2pickers-globalobs-v1")
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--steps", type=int, default=200)
+    parser.add_argument("--hidden", type=int, default=512)
+    parser.add_argument("--max-batch-size", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    probe = gym.make(args.env_id).unwrapped
+    obs_length = probe.observation_space[0].shape[0]
+    num_actions = probe.action_space[0].n
+
+    direct_forward = RandomMLP(obs_length, num_actions, args.hidden)
+    direct_sps = run_workers(args.env_id, DirectPolicy(direct_forward), args.workers, args.steps)
+    print(f"per-worker forward: {direct_sps:9.1f} env steps/s, {direct_forward.calls} forward calls")
+
+    server_forward = RandomMLP(obs_length, num_actions, args.hidden)
+    server = InferenceServer(server_forward, max_batch_size=args.max_batch_size, max_wait_s=args.max_wait_ms / 1e3)
+    with server:
+        served_sps = run_workers(args.env_id, InferencePolicy(server), args.workers, args.steps)
+    print(
+        f"inference server:   {served_sps:9.1f} env steps/s, {server_forward.calls} forward calls, "
+        f"{server.mean_batch_size:.1f} envs per batch"
+    )
+
+
+if __name__ == "__main__":
+    main()
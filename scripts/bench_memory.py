@@ -0,0 +1,59 @@
+"""Measure the memory footprint of TA-RWARE envs, with and without low-memory mode."""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import tracemalloc
+from pathlib import Path
+
+import gymnasium as gym
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import tarware  # noqa: F401
+
+
+def bytes_per_env(env_id: str, num_envs: int, steps: int, low_memory: bool) -> float:
+    tracemalloc.start()
+    envs = []
+    base, _ = tracemalloc.get_traced_memory()
+    for i in range(num_envs):
+        env = gym.make(env_id, low_memory=low_memory).unwrapped
+        env.reset(seed=i)
+        for _ in range(steps):
+            env.step(env.action_space.sample())
+        envs.append(env)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (current - base) / num_envs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--env-ids",
+        nargs="+",
+        default=[
+            "tarware-tiny-3agvs-2pickers-globalobs-v1",
+            "tarware-medium-8agvs-4pickers-partialobs-v1",
+            "tarware-extralarge-14agvs-7pickers-globalobs-v1",
+        ],
+    )
+    parser.add_argument("--num-envs", type=int, default=8)
+    parser.add_argument("--steps", type=int, default=20)
+    args = parser.parse_args()
+
+    for env_id in args.env_ids:
+        default = bytes_per_env(env_id, args.num_envs, args.steps, low_memory=False)
+        compact = bytes_per_env(env_id, args.num_envs, args.steps, low_memory=True)
+        print(
+            f"{env_id}: default={default / 1024:.1f} KiB/env | low_memory={compact / 1024:.1f} KiB/env "
+            f"| ratio={default / max(compact, 1.0):.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Check that envs interleaved in an EnvPool follow the same trajectories as isolated runs."""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+import gymnasium as gym
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import tarware  # noqa: F401
+from tarware_ext.envs import EnvPool
+from tarware_ext.policies import GraphGreedyPolicy
+
+
+def _trajectory_step(obs, reward, info) -> tuple:
+    counters = (info["shelf_deliveries"], info["clashes"], info["stucks"], info["agvs_distance_travelled"])
+    return np.concatenate(obs).tobytes(), np.asarray(reward).tobytes(), counters
+
+
+def isolated_run(env_id: str, seed: int, steps: int) -> list:
+    env = gym.make(env_id).unwrapped
+    policy = GraphGreedyPolicy()
+    env.reset(seed=seed)
+    policy.reset(env)
+    trajectory = []
+    for _ in range(steps):
+        obs, reward, _, _, info = env.step(policy.act(env))
+        trajectory.append(_trajectory_step(obs, reward, info))
+    return trajectory
+
+
+def pooled_run(env_id: str, seeds: list, steps: int) -> list:
+    pool = EnvPool([lambda: gym.make(env_id).unwrapped for _ in seeds])
+    policies = [GraphGreedyPolicy() for _ in seeds]
+    trajectories = [[] for _ in seeds]
+    # Stagger the resets so that every env is reset while the others are mid-episode
+    for t in range(steps + len(seeds)):
+        for index, (env, policy) in enumerate(zip(pool.envs, policies)):
+            if t == index:
+                pool.reset_env(index, seed=seeds[index])
+                policy.reset(env)
+            if index <= t < index + steps:
+                obs, reward, _, _, info = env.step(policy.act(env))
+                trajectories[index].append(_trajectory_step(obs, reward, info))
+    pool.close()
+    return trajectories
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--env-id", default="tarware-tiny-3agvs-2pickers-globalobs-v1")
+    parser.add_argument("--num-envs", type=int, default=4)
+    parser.add_argument("--steps", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    seeds = [args.seed + i for i in range(args.num_envs)]
+    pooled = pooled_run(args.env_id, seeds, args.steps)
+    mismatches = 0
+    for seed, trajectory in zip(seeds, pooled):
+        if trajectory != isolated_run(args.env_id, seed, args.steps):
+            print(f"seed={seed}: interleaved trajectory differs from the isolated run")
+            mismatches += 1
+    if mismatches:
+        sys.exit(1)
+    print(f"OK: {args.num_envs} interleaved envs match their isolated runs over {args.steps} steps")
+
+
+if __name__ == "__main__":
+    main()
@@ -16,26 +16,36 @@ if str(PROJECT_ROOT) not in sys.path:
 import tarware  # noqa: F401
 from tarware_ext.envs import TarwareAdapter
 from tarware_ext.logs import CSVLogger
-from tarware_ext.policies import DistanceMode, GraphGreedyPolicy, HeuristicPolicy, RandomPolicy
+from tarware_ext.policies import (
+    ActiveCapController,
+    AssignmentStrategy,
+    DistanceMode,
+    GraphGreedyPolicy,
+    HeuristicPolicy,
+    RandomPolicy,
+)
 from tarware_ext.runners import evaluate
 
 
-def _make_env(env_id: str) -> Callable[[], TarwareAdapter]:
+def _make_env(
+    env_id: str, decision_points: bool = False, max_skip: int | None = None, fast: bool = False
+) -> Callable[[], TarwareAdapter]:
     def _factory() -> TarwareAdapter:
         env = gym.make(env_id)
-        return TarwareAdapter(env)
+        return TarwareAdapter(env, decision_points=decision_points, max_skip=max_skip, fast=fast)
 
     return _factory
 
 
-def _build_policy(name: str, env: TarwareAdapter, distance: str | None = None):
+def _build_policy(name: str, env: TarwareAdapter, distance: str | None = None, assignment: str | None = None):
     if name == "random":
         return RandomPolicy(env)
     if name == "heuristic":
         return HeuristicPolicy(env)
     if name == "graph_greedy":
         mode = DistanceMode(distance or DistanceMode.MANHATTAN.value)
-        return GraphGreedyPolicy(distance_mode=mode)
+        strategy = AssignmentStrategy(assignment or AssignmentStrategy.GREEDY.value)
+        return GraphGreedyPolicy(distance_mode=mode, assignment=strategy)
     raise ValueError(f"Unknown policy: {name}")
 
 
@@ -43,12 +53,20 @@ def main() -> None:
     parser = argparse.ArgumentParser()
     parser.add_argument("--env-id", required=True)
     parser.add_argument("--policy", choices=["random", "heuristic", "graph_greedy"], default="random")
-    parser.add_argument("--distance", choices=["manhattan", "find_path"], default="manhattan")
+    parser.add_argument("--distance", choices=[m.value for m in DistanceMode], default="manhattan")
+    parser.add_argument("--assignment", choices=[s.value for s in AssignmentStrategy], default="greedy")
     parser.add_argument("--active-alpha", type=int, default=3)
     parser.add_argument("--max-active-agvs", type=int, default=None)
+    parser.add_argument(
+        "--auto-tune", action="store_true", help="Adapt the active-AGV cap online, starting from the alpha rule"
+    )
+    parser.add_argument("--tune-window", type=int, default=50)
     parser.add_argument("--episodes", type=int, default=5)
     parser.add_argument("--steps", type=int, default=200)
     parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--decision-points", action="store_true")
+    parser.add_argument("--max-skip", type=int, default=None)
+    parser.add_argument("--fast", action="store_true", help="Keep rewards and dones as arrays in the adapter")
     parser.add_argument("--csv", default="eval.csv")
     parser.add_argument("--no-csv", action="store_true")
     args = parser.parse_args()
@@ -59,15 +77,18 @@ def main() -> None:
             args.policy,
             env,
             distance=args.distance,
+            assignment=args.assignment,
         )
         policy.active_alpha = args.active_alpha
         if args.max_active_agvs is not None:
             policy.max_active_agvs = args.max_active_agvs
+        if args.auto_tune:
+            policy.cap_controller = ActiveCapController(window=args.tune_window)
     else:
         policy = _build_policy(args.policy, env, distance=args.distance)
     env.close()
 
-    eval_fn = _make_env(args.env_id)
+    eval_fn = _make_env(args.env_id, decision_points=args.decision_points, max_skip=args.max_skip, fast=args.fast)
     results = evaluate(
         eval_fn,
         policy,
@@ -103,8 +124,10 @@ def main() -> None:
             "seed",
             "env_id",
             "distance_mode",
+            "assignment",
             "active_alpha",
             "max_active_agvs",
+            "auto_tune",
             "episode_length",
             "shelf_deliveries",
             "clashes",
@@ -118,8 +141,10 @@ def main() -> None:
             enriched = dict(row)
             enriched["env_id"] = args.env_id
             enriched["distance_mode"] = args.distance
+            enriched["assignment"] = args.assignment
             enriched["active_alpha"] = args.active_alpha
             enriched["max_active_agvs"] = args.max_active_agvs
+            enriched["auto_tune"] = args.auto_tune
             logger.log({key: enriched.get(key) for key in fieldnames})
         logger.close()
 
@@ -1,10 +1,81 @@
-"""Placeholder for future graph-based RL training."""
+"""Train MAPPO or PPO policies on batched TA-RWARE envs."""
 
 from __future__ import annotations
 
+import argparse
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from tarware_ext.logs import JSONLLogger
+from tarware_ext.training import MAPPO, PPO, PPOConfig
+
 
 def main() -> None:
-    raise NotImplementedError("Training entrypoint will be added once graph builder/policy is ready.")
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--algo", choices=["mappo", "ppo"], default="mappo")
+    parser.add_argument("--env-id", default="tarware-tiny-3agvs-2pickers-sharedobs-v1")
+    parser.add_argument("--num-envs", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=None, help="Env worker processes (default: cores - 1)")
+    parser.add_argument("--total-steps", type=int, default=100_000)
+    parser.add_argument("--rollout-steps", type=int, default=128)
+    parser.add_argument("--epochs", type=int, default=4)
+    parser.add_argument("--minibatch-size", type=int, default=256)
+    parser.add_argument("--hidden", type=int, nargs="+", default=[128, 128])
+    parser.add_argument("--lr", type=float, default=3e-4)
+    parser.add_argument("--entropy-coef", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--memmap-dir", default=None, help="Keep the rollout buffer in memory-mapped files here")
+    parser.add_argument("--save", default=None, help="Save the actor and critic weights to this .npz file")
+    parser.add_argument("--log", default=None, help="Write the metrics of every iteration to this JSONL file")
+    args = parser.parse_args()
+
+    config = PPOConfig(
+        env_id=args.env_id,
+        num_envs=args.num_envs,
+        num_workers=args.workers,
+        total_steps=args.total_steps,
+        rollout_steps=args.rollout_steps,
+        epochs=args.epochs,
+        minibatch_size=args.minibatch_size,
+        hidden=tuple(args.hidden),
+        lr=args.lr,
+        entropy_coef=args.entropy_coef,
+        seed=args.seed,
+        memmap_dir=args.memmap_dir,
+    )
+    trainer = MAPPO(config) if args.algo == "mappo" else PPO(config)
+    logger = JSONLLogger(args.log) if args.log else None
+
+    def report(metrics) -> None:
+        parts = [
+            f"iter={metrics['iteration']}",
+            f"env_steps={metrics['env_steps']}",
+            f"env_steps_per_s={metrics['env_steps_per_s']:.1f}",
+            f"updates_per_s={metrics['updates_per_s']:.1f}",
+        ]
+        # No episode has finished yet in the first iterations
+        if "mean_episode_return" in metrics:
+            parts += [
+                f"mean_return={metrics['mean_episode_return']:.2f}",
+                f"mean_deliveries={metrics['mean_episode_deliveries']:.2f}",
+            ]
+        parts += [f"entropy={metrics['entropy']:.3f}", f"approx_kl={metrics['approx_kl']:.4f}"]
+        print(" | ".join(parts))
+        if logger is not None:
+            logger.log(metrics)
+
+    try:
+        trainer.train(callback=report)
+    finally:
+        if logger is not None:
+            logger.close()
+    if args.save:
+        trainer.save(args.save)
+        print(f"saved weights to {args.save}")
 
 
 if __name__ == "__main__":
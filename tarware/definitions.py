@@ -28,4 +28,11 @@ class CollisionLayers(IntEnum):
     AGVS = 0
     PICKERS = 1
     SHELVES = 2
-    CARRIED_SHELVES = 3
\ No newline at end of file
+    CARRIED_SHELVES = 3
+
+class EventType(IntEnum):
+    LOAD = 0
+    UNLOAD = 1
+    DELIVERY = 2
+    CLASH = 3
+    STUCK = 4
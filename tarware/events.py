@@ -0,0 +1,97 @@
+"""Structured per-step event records emitted by the warehouse simulator."""
+
+import os
+from typing import Optional
+
+import numpy as np
+
+from tarware.definitions import EventType
+
+EVENT_DTYPE = np.dtype(
+    [
+        ("type", np.uint8),
+        ("step", np.int32),
+        ("agent_id", np.int32),
+        ("shelf_id", np.int32),
+        ("x", np.int16),
+        ("y", np.int16),
+    ]
+)
+
+
+class EventLog:
+    """Growable buffer holding the events of the current step."""
+
+    def __init__(self, capacity: int = 64):
+        self._buffer = np.zeros(capacity, dtype=EVENT_DTYPE)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def clear(self) -> None:
+        self._size = 0
+
+    def record(self, event_type: EventType, step: int, agent_id: int, shelf_id: int, x: int, y: int) -> None:
+        if self._size == len(self._buffer):
+            self._buffer = np.concatenate([self._buffer, np.zeros(len(self._buffer), dtype=EVENT_DTYPE)])
+        self._buffer[self._size] = (event_type, step, agent_id, shelf_id, x, y)
+        self._size += 1
+
+    def records(self) -> np.recarray:
+        """Returns a view over the recorded events, only valid until the next step."""
+        return self._buffer[:self._size].view(np.recarray)
+
+
+class MemmapEventSink:
+    """
+    Appends event records to a memory-mapped file on disk. The file is grown by doubling its capacity and
+    trimmed to the number of written records on `close`, after which it can be opened with `load_events`.
+    """
+
+    def __init__(self, path: str, capacity: int = 1 << 16):
+        self.path = path
+        self._size = 0
+        self._capacity = 0
+        self._memmap: Optional[np.memmap] = None
+        with open(path, "wb"):
+            pass
+        self._grow(capacity)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _grow(self, capacity: int) -> None:
+        if self._memmap is not None:
+            self._memmap.flush()
+            self._memmap = None
+        os.truncate(self.path, capacity * EVENT_DTYPE.itemsize)
+        self._memmap = np.memmap(self.path, dtype=EVENT_DTYPE, mode="r+", shape=(capacity,))
+        self._capacity = capacity
+
+    def append(self, events: np.ndarray) -> None:
+        count = len(events)
+        if not count:
+            return
+        if self._size + count > self._capacity:
+            self._grow(max(2 * self._capacity, self._size + count))
+        self._memmap[self._size:self._size + count] = events
+        self._size += count
+
+    def flush(self) -> None:
+        if self._memmap is not None:
+            self._memmap.flush()
+
+    def close(self) -> None:
+        if self._memmap is None:
+            return
+        self._memmap.flush()
+        self._memmap = None
+        os.truncate(self.path, self._size * EVENT_DTYPE.itemsize)
+
+
+def load_events(path: str) -> np.recarray:
+    """Opens an event file written by `MemmapEventSink` as a read-only record array."""
+    if os.path.getsize(path) == 0:
+        return np.zeros(0, dtype=EVENT_DTYPE).view(np.recarray)
+    return np.memmap(path, dtype=EVENT_DTYPE, mode="r").view(np.recarray)
@@ -23,124 +23,186 @@ class Mission:
     assigned_time: int
     at_location: bool = False
 
-def heuristic_episode(env, render=False, seed=None):
-    # non_goal_location_ids corresponds to the item ordering in `get_empty_shelf_information`
-    non_goal_location_ids = []
-    for id_, coords in env.action_id_to_coords_map.items():
-        if (coords[1], coords[0]) not in env.goals:
-            non_goal_location_ids.append(id_)
-    non_goal_location_ids = np.array(non_goal_location_ids)
-    location_map =  env.action_id_to_coords_map
-    _ = env.reset(seed=seed)
-    done = False
-    all_infos = []
-    timestep = 0
-
-    agents = env.agents
-    agvs = [a for a in agents if a.type == AgentType.AGV]
-    pickers = [a for a in agents if a.type == AgentType.PICKER]
-    coords_original_loc_map = {v:k for k, v in env.action_id_to_coords_map.items()}
-    # split the pickers evenly into sections throughout the warehouse
-    sections = env.rack_groups
-    picker_sections = split_list(sections, len(pickers))
-    picker_sections = [flatten_list(l) for l in picker_sections]
-
-    assigned_agvs: dict[Agent, Mission] = OrderedDict({}) # keep track of what jobs AGVs have been assigned
-    assigned_pickers: dict[Agent, Mission] = OrderedDict({}) # keep track of what jobs Pickers have been assigned
-    assigned_items: dict[int, Agent] = OrderedDict({}) # keep track of which items have been picked up by an AGV (key is item.id)
-    global_episode_return = 0
-    episode_returns = np.zeros(env.num_agents)
-    while not done:
-
-        request_queue = env.request_queue # this is a list of locations that need to be picked up next.
-        goal_locations = env.goals # (y, x) format
-        actions = {k: 0 for k in agents} # default to no-op
-
+def _agv_path_length(start, goal):
+    # `find_path(..., care_for_agents=False)` plans AGVs on an obstacle-free grid, so the length of the path
+    # (which excludes the start cell) is the Manhattan distance
+    return abs(start[0] - goal[0]) + abs(start[1] - goal[1])
+
+
+class StepwiseHeuristic:
+    """
+    Step-wise version of the heuristic: `reset(env)` after resetting the env, then `act(env)` every step
+    returns the macro actions of all agents. The mission state is kept between calls, so the same seed yields
+    the same actions as `heuristic_episode`, while the env loop is owned by the caller.
+
+    The dispatcher only does work for what changed since the last call:
+    - shelf requested / AGV freed: the request queue is only scanned while some AGV has no mission, and
+      assigned items are tracked in a set instead of being searched in the mission dict,
+    - agent arrived: mission transitions (shelf loaded, shelf delivered, shelf returned) are only evaluated
+      for AGVs that are no longer busy,
+    - picker zones are a hash map from location to picker, and pickers are only dispatched while some are
+      idle.
+
+    After every `act`, `redispatch` tells whether agents were released from a mission in that call; they only
+    get a new one on the next call, so a decision-point step should not skip past it.
+    """
+
+    def __init__(self):
+        self.redispatch = False
+
+    def reset(self, env):
+        # non_goal_location_ids corresponds to the item ordering in `get_empty_shelf_information`
+        non_goal_location_ids = []
+        for id_, coords in env.action_id_to_coords_map.items():
+            if (coords[1], coords[0]) not in env.goals:
+                non_goal_location_ids.append(id_)
+        self.non_goal_location_ids = np.array(non_goal_location_ids)
+        self.location_map = env.action_id_to_coords_map
+        self.coords_original_loc_map = {v:k for k, v in env.action_id_to_coords_map.items()}
+        # goal locations are in (x, y) format
+        self.goal_location_ids = [self.coords_original_loc_map[(y, x)] for (x, y) in env.goals]
+
+        self.agents = env.agents
+        self.agvs = [a for a in self.agents if a.type == AgentType.AGV]
+        self.pickers = [a for a in self.agents if a.type == AgentType.PICKER]
+        # split the pickers evenly into sections throughout the warehouse, a location belongs to the first
+        # section that contains it
+        sections = env.rack_groups
+        picker_sections = split_list(sections, len(self.pickers))
+        self.picker_of_location = {}
+        for picker, section in zip(self.pickers, picker_sections):
+            for location in flatten_list(section):
+                self.picker_of_location.setdefault(location, picker)
+
+        self.assigned_agvs: dict[Agent, Mission] = OrderedDict({}) # keep track of what jobs AGVs have been assigned
+        self.assigned_pickers: dict[Agent, Mission] = OrderedDict({}) # keep track of what jobs Pickers have been assigned
+        self.assigned_items: dict[Agent, int] = OrderedDict({}) # keep track of which items have been picked up by an AGV
+        self.assigned_item_ids = set()
+        self.redispatch = False
+
+    def _dispatch_requests(self, env, timestep):
         # [AGV None -> AGV PICKING] find closest non-busy agv agent to each item in request queue, send them there, and put the AGV in a mission queue
-        for item in request_queue:
-
-            if item.id in assigned_items.values():
-                continue
-
-            available_agvs = [a for a in agvs if not a.busy and not a.carrying_shelf]
-            available_agvs = [a for a in available_agvs if not a in assigned_agvs]
-
+        if len(self.assigned_agvs) == len(self.agvs):
+            return
+        available_agvs = [a for a in self.agvs if not a.busy and not a.carrying_shelf and a not in self.assigned_agvs]
+        for item in env.request_queue:
             if not available_agvs:
+                return
+            if item.id in self.assigned_item_ids:
                 continue
-
-            agv_shortest_paths = [env.find_path((a.y, a.x), (item.y, item.x), a, care_for_agents=False) for a in available_agvs]
-            agv_distances = [len(p) for p in agv_shortest_paths]
-            closest_agv = available_agvs[np.argmin(agv_distances)]
-            item_location_id = coords_original_loc_map[(item.y, item.x)]
-            if closest_agv:
-                assigned_agvs[closest_agv] = Mission(MissionType.PICKING, item_location_id, item.x, item.y, timestep)
-                assigned_items[closest_agv] = item.id
-
-        for agv in agvs:
-
-            if agv in assigned_agvs and (agv.x == assigned_agvs[agv].location_x) and (agv.y == assigned_agvs[agv].location_y):
-                assigned_agvs[agv].at_location = True
-
-            if agv not in assigned_agvs or agv.busy:
+            agv_distances = [_agv_path_length((a.y, a.x), (item.y, item.x)) for a in available_agvs]
+            closest_agv = available_agvs.pop(int(np.argmin(agv_distances)))
+            item_location_id = self.coords_original_loc_map[(item.y, item.x)]
+            self.assigned_agvs[closest_agv] = Mission(MissionType.PICKING, item_location_id, item.x, item.y, timestep)
+            self.assigned_items[closest_agv] = item.id
+            self.assigned_item_ids.add(item.id)
+
+    def _closest_empty_location(self, env, agv):
+        empty_shelves = env.get_empty_shelf_information()
+        assigned_item_loc_agvs = {mission.location_id for mission in self.assigned_agvs.values()}
+        empty_location_ids = [loc_id for loc_id in self.non_goal_location_ids[empty_shelves > 0] if loc_id not in assigned_item_loc_agvs]
+        distances = [_agv_path_length((agv.y, agv.x), self.location_map[loc_id]) for loc_id in empty_location_ids]
+        return empty_location_ids[np.argmin(distances)]
+
+    def _advance_agv_missions(self, env, timestep):
+        redispatch = False
+        for agv in self.agvs:
+            mission = self.assigned_agvs.get(agv)
+            if mission is None:
+                continue
+            if agv.x == mission.location_x and agv.y == mission.location_y:
+                mission.at_location = True
+            if agv.busy or not mission.at_location:
                 continue
 
             # [AGV PICKING -> AGV DELIVERING] The shelf has been picked onto the AGV. Go to the closest goal location.
-            if assigned_agvs[agv].mission_type == MissionType.PICKING and assigned_agvs[agv].at_location and agv.carrying_shelf:
-                goal_shortest_paths = [env.find_path((agv.y, agv.x), (y, x), agv, care_for_agents=False) for (x,y) in goal_locations]
-                goal_distances = [len(p) for p in goal_shortest_paths] 
-                closest_goal = goal_locations[np.argmin(goal_distances)] # goal locations are in (y, x) format
-                goal_location_id = coords_original_loc_map[(closest_goal[1], closest_goal[0])]
-                mission = assigned_agvs.pop(agv)
-                assigned_agvs[agv] = Mission(MissionType.DELIVERING, goal_location_id, closest_goal[0], closest_goal[1], timestep)
+            if mission.mission_type == MissionType.PICKING and agv.carrying_shelf:
+                goal_distances = [_agv_path_length((agv.y, agv.x), (y, x)) for (x, y) in env.goals]
+                goal_index = int(np.argmin(goal_distances))
+                closest_goal = env.goals[goal_index]
+                self.assigned_agvs.pop(agv)
+                mission = self.assigned_agvs[agv] = Mission(
+                    MissionType.DELIVERING, self.goal_location_ids[goal_index], closest_goal[0], closest_goal[1], timestep
+                )
 
             # [AGV DELIVERING -> AGV RETURNING] The shelf has been delivered to the pick station. Return to closest empty shelf.
-            if assigned_agvs[agv].mission_type == MissionType.DELIVERING and assigned_agvs[agv].at_location and agv.carrying_shelf:
-                empty_shelves = env.get_empty_shelf_information()
-                empty_location_ids = list(non_goal_location_ids[empty_shelves > 0])
-                assigned_item_loc_agvs = [mission.location_id for mission in assigned_agvs.values()]
-                empty_location_ids = [loc_id for loc_id in empty_location_ids if loc_id not in assigned_item_loc_agvs]
-                empty_location_yx = [location_map[i] for i in empty_location_ids]
-                closest_empty_location_paths = [env.find_path((agv.y, agv.x), (y, x), agv, care_for_agents=False) for (y,x) in empty_location_yx]
-                closest_empty_location_distances = [len(p) for p in closest_empty_location_paths]
-                closest_location_id = empty_location_ids[np.argmin(closest_empty_location_distances)]
-                closest_location_yx = location_map[closest_location_id]
-                assigned_agvs.pop(agv)
-                assigned_agvs[agv] = Mission(MissionType.RETURNING, closest_location_id, closest_location_yx[1], closest_location_yx[0], timestep)
-
-            # [AGV RETURNING -> AGV None] The item is returned to the rack. 
-            if assigned_agvs[agv].mission_type == MissionType.RETURNING and assigned_agvs[agv].at_location and not agv.carrying_shelf:
-                assigned_agvs.pop(agv)
-                assigned_items.pop(agv)
-
+            if mission.mission_type == MissionType.DELIVERING and mission.at_location and agv.carrying_shelf:
+                closest_location_id = self._closest_empty_location(env, agv)
+                closest_location_yx = self.location_map[closest_location_id]
+                self.assigned_agvs.pop(agv)
+                mission = self.assigned_agvs[agv] = Mission(
+                    MissionType.RETURNING, closest_location_id, closest_location_yx[1], closest_location_yx[0], timestep
+                )
+
+            # [AGV RETURNING -> AGV None] The item is returned to the rack.
+            if mission.mission_type == MissionType.RETURNING and mission.at_location and not agv.carrying_shelf:
+                self.assigned_agvs.pop(agv)
+                self.assigned_item_ids.discard(self.assigned_items.pop(agv))
+                redispatch = True
+        return redispatch
+
+    def _dispatch_pickers(self, timestep):
         # Send pickers to where AGVs are going. Since assigned_agvs is ordered, the picker will prioritize the first agv
-        for agv, mission in assigned_agvs.items():
-            if mission.mission_type in [MissionType.PICKING, MissionType.RETURNING]:
-                in_pickers_zone = [(mission.location_y, mission.location_x) in p for p in picker_sections]
-                relevant_picker = pickers[in_pickers_zone.index(True)]
-                if relevant_picker not in assigned_pickers.keys():
-                    assigned_pickers[relevant_picker] = Mission(MissionType.PICKING, mission.location_id, mission.location_x, mission.location_y, timestep)
-
+        if len(self.assigned_pickers) == len(self.pickers):
+            return
+        for mission in self.assigned_agvs.values():
+            if mission.mission_type in (MissionType.PICKING, MissionType.RETURNING):
+                relevant_picker = self.picker_of_location[(mission.location_y, mission.location_x)]
+                if relevant_picker not in self.assigned_pickers:
+                    self.assigned_pickers[relevant_picker] = Mission(MissionType.PICKING, mission.location_id, mission.location_x, mission.location_y, timestep)
+
+    def _release_pickers(self):
         # Picker has reached destination, remove its mission.
-        for picker in pickers:
-            if picker in assigned_pickers and (picker.x == assigned_pickers[picker].location_x) and (picker.y == assigned_pickers[picker].location_y):
-                assigned_pickers[picker].at_location = True
-                assigned_pickers.pop(picker)
-
-        # Map the missions to actions
-        for agv, mission in assigned_agvs.items():
+        redispatch = False
+        for picker in self.pickers:
+            mission = self.assigned_pickers.get(picker)
+            if mission is not None and picker.x == mission.location_x and picker.y == mission.location_y:
+                mission.at_location = True
+                self.assigned_pickers.pop(picker)
+                redispatch = True
+        return redispatch
+
+    def act(self, env):
+        timestep = env._cur_steps
+        self._dispatch_requests(env, timestep)
+        agvs_released = self._advance_agv_missions(env, timestep)
+        self._dispatch_pickers(timestep)
+        pickers_released = self._release_pickers()
+        self.redispatch = agvs_released or pickers_released
+
+        # Map the missions to actions, macro_action should be the index of self.action_id_to_coords_map
+        actions = {k: 0 for k in self.agents} # default to no-op
+        for agv, mission in self.assigned_agvs.items():
             actions[agv] = mission.location_id if not agv.busy else 0
-        for picker, mission in assigned_pickers.items():
+        for picker, mission in self.assigned_pickers.items():
             actions[picker] = mission.location_id
-        # macro_action should be the index of self.action_id_to_coords_map
+        return list(actions.values())
+
+
+def heuristic_episode(env, render=False, seed=None, decision_points=False, max_skip=None):
+    # With `decision_points`, the env is advanced through `step_to_decision` so the dispatcher only runs
+    # when an agent becomes free (or every `max_skip` steps).
+    _ = env.reset(seed=seed)
+    heuristic = StepwiseHeuristic()
+    heuristic.reset(env)
+    done = False
+    all_infos = []
+    global_episode_return = 0
+    episode_returns = np.zeros(env.num_agents)
+    while not done:
+        actions = heuristic.act(env)
         if render:
             env.render(mode="human")
 
-        _, reward, terminated, truncated, info = env.step(list(actions.values()))
-        done = terminated or truncated
+        if decision_points:
+            # Agents released from a mission are only re-dispatched on the next call, so don't skip past it
+            skip = 1 if heuristic.redispatch else max_skip
+            _, reward, terminated, truncated, info = env.step_to_decision(actions, max_skip=skip)
+        else:
+            _, reward, terminated, truncated, info = env.step(actions)
         episode_returns += np.array(reward, dtype=np.float64)
         global_episode_return += np.sum(reward)
-        done = all(done)
+        done = all(terminated) or all(truncated)
         all_infos.append(info)
-        timestep += 1
 
     return all_infos, global_episode_return, episode_returns
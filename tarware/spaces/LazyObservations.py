@@ -0,0 +1,53 @@
+from collections.abc import Sequence
+
+
+class LazyObservations(Sequence):
+    """
+    Tuple-like proxy over the observations of one `reset`/`step`. Environment info is only extracted on first
+    access, and the observation of each agent is only built when it is indexed, so callers that ignore
+    observations pay nothing for them.
+
+    The proxy reads the live environment state, so it must be consumed before the next `reset`/`step`;
+    building an observation afterwards raises a RuntimeError instead of silently returning one of a later step.
+    Observations that were already built stay accessible.
+    """
+    __slots__ = ("_environment", "_version", "_observations", "_extracted")
+
+    def __init__(self, environment):
+        self._environment = environment
+        self._version = environment._obs_version
+        self._observations = [None] * environment.num_agents
+        self._extracted = False
+
+    def _check_fresh(self):
+        if self._version != self._environment._obs_version:
+            raise RuntimeError(
+                "Lazy observations were accessed after the environment was stepped or reset. "
+                "Materialize them with tuple(obs) before the next step."
+            )
+
+    def _observation(self, index):
+        if self._observations[index] is None:
+            self._check_fresh()
+            mapper = self._environment.observation_space_mapper
+            if not self._extracted:
+                mapper.extract_environment_info(self._environment)
+                self._extracted = True
+            self._observations[index] = mapper.agent_observation(self._environment.agents[index])
+        return self._observations[index]
+
+    def __len__(self):
+        return len(self._observations)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return tuple(self._observation(i) for i in range(*index.indices(len(self))))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("agent index out of range")
+        return self._observation(index)
+
+    @property
+    def materialized(self) -> bool:
+        return self._extracted
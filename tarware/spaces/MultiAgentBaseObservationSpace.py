@@ -1,11 +1,12 @@
 from abc import ABC
 
 import numpy as np
+from gymnasium import spaces
 
 
 class _VectorWriter:
-    def __init__(self, size: int):
-        self.vector = np.zeros(size, dtype=np.float32)
+    def __init__(self, size: int, dtype=np.float32):
+        self.vector = np.zeros(size, dtype=dtype)
         self.idx = 0
 
     def write(self, data):
@@ -17,17 +18,117 @@ class _VectorWriter:
         self.idx += bits
 
 
+_ENCODINGS = ("dense", "packed")
+
+# Normalised coordinates are stored as uint16 fixed point numbers in the packed encoding
+_NORMALISED_SCALE = np.iinfo(np.uint16).max
+
+
 class MultiAgentBaseObservationSpace(ABC):
-    def __init__(self, num_agvs, num_pickers, grid_size, shelf_locations, msg_bits, normalised_coordinates=False):
+    def __init__(self, num_agvs, num_pickers, grid_size, shelf_locations, msg_bits, normalised_coordinates=False, low_memory=False, encoding="dense"):
         self.num_agvs = num_agvs
         self.num_pickers = num_pickers
         self.num_agents = num_agvs + num_pickers
         self.grid_size = grid_size
         self.shelf_locations = shelf_locations
         self.normalised_coordinates = normalised_coordinates
+        self.low_memory = low_memory
+        if encoding not in _ENCODINGS:
+            raise ValueError(f"encoding is {encoding}. Should be one of {_ENCODINGS}")
+        self.encoding = encoding
+        self._flag_index = []
+        self._coord_index = []
+        # Observations only hold 0/1 flags and coordinates, which fit in small integers unless normalised
+        if not low_memory:
+            self.obs_dtype = np.float32
+        elif normalised_coordinates:
+            self.obs_dtype = np.float16
+        else:
+            self.obs_dtype = np.uint8 if max(grid_size) <= np.iinfo(np.uint8).max else np.uint16
+        self._box_cache = {}
         self.ma_spaces = []
+        # Space of what `observations` returns, when it is not one vector per agent
+        self.joint_space = None
         super(MultiAgentBaseObservationSpace, self).__init__()
 
+    def _make_box(self, obs_length):
+        shape = obs_length if isinstance(obs_length, tuple) else (obs_length,)
+        if not self.low_memory:
+            return spaces.Box(low=-float("inf"), high=float("inf"), shape=shape, dtype=np.float32)
+        # Agents with equal observation lengths share one space instead of each holding its own bound arrays
+        if shape not in self._box_cache:
+            if np.issubdtype(self.obs_dtype, np.integer):
+                low, high = 0, np.iinfo(self.obs_dtype).max
+            else:
+                low, high = -float("inf"), float("inf")
+            self._box_cache[shape] = spaces.Box(low=low, high=high, shape=shape, dtype=self.obs_dtype)
+        return self._box_cache[shape]
+
+    @staticmethod
+    def _agent_info_mask(with_status):
+        # Agent info is [carrying, carrying requested, loading] (AGVs only), location and target
+        return [False, False, False] * with_status + [True, True, True, True]
+
+    def _coordinate_mask(self, agent_index):
+        """Boolean mask of the coordinate entries of the (dense) observation of the agent at `agent_index`."""
+        raise NotImplementedError(f"{type(self).__name__} does not support the packed encoding")
+
+    def _setup_encoding(self):
+        """
+        Replaces the per-agent Box spaces with Dict spaces of bit-packed flags and integer coordinates when the
+        packed encoding is used. Called by the subclasses once their dense spaces are defined.
+        """
+        if self.encoding == "dense":
+            return
+        if self.normalised_coordinates:
+            coords_dtype = np.uint16
+        else:
+            coords_dtype = np.uint8 if max(self.grid_size) <= np.iinfo(np.uint8).max else np.uint16
+        self._coords_dtype = coords_dtype
+        ma_spaces = []
+        for agent_index in range(self.num_agents):
+            # Entries beyond the mask are never written and stay zero, they are encoded as flags
+            coordinate_mask = np.zeros(self.obs_lengths[agent_index], dtype=bool)
+            agent_mask = self._coordinate_mask(agent_index)
+            coordinate_mask[:len(agent_mask)] = agent_mask
+            self._flag_index.append(np.flatnonzero(~coordinate_mask))
+            self._coord_index.append(np.flatnonzero(coordinate_mask))
+            ma_spaces.append(spaces.Dict({
+                "flags": spaces.Box(low=0, high=255, shape=((len(self._flag_index[-1]) + 7) // 8,), dtype=np.uint8),
+                "coords": spaces.Box(low=0, high=np.iinfo(coords_dtype).max, shape=(len(self._coord_index[-1]),), dtype=coords_dtype),
+            }))
+        self.ma_spaces = spaces.Tuple(tuple(ma_spaces))
+
+    def encode(self, agent_index, vector):
+        """Packed encoding of the dense observation `vector` of the agent at `agent_index`."""
+        coords = vector[self._coord_index[agent_index]]
+        if self.normalised_coordinates:
+            coords = np.rint(coords * _NORMALISED_SCALE)
+        return {
+            "flags": np.packbits(vector[self._flag_index[agent_index]] != 0),
+            "coords": coords.astype(self._coords_dtype),
+        }
+
+    def decode(self, agent_index, encoded):
+        """
+        Dense float32 observation of the agent at `agent_index` from its packed encoding. The arrays in
+        `encoded` may have leading batch dimensions, e.g. a (batch, num_bytes) block of flags from a buffer.
+        """
+        flag_index, coord_index = self._flag_index[agent_index], self._coord_index[agent_index]
+        flags, coords = encoded["flags"], encoded["coords"]
+        dense = np.empty(flags.shape[:-1] + (len(flag_index) + len(coord_index),), dtype=np.float32)
+        dense[..., flag_index] = np.unpackbits(flags, axis=-1, count=len(flag_index))
+        dense[..., coord_index] = coords
+        if self.normalised_coordinates:
+            dense[..., coord_index] /= _NORMALISED_SCALE
+        return dense
+
+    def agent_observation(self, agent):
+        """Observation of `agent` in the configured encoding, after `extract_environment_info`."""
+        if self.encoding == "dense":
+            return self.observation(agent)
+        return self.encode(agent.id - 1, self.observation(agent))
+
     def process_coordinates(self, coords, environment):
         if self.normalised_coordinates:
             return (coords[0] / (environment.grid_size[0] - 1), coords[1] / (environment.grid_size[1] - 1))
@@ -35,4 +136,8 @@ class MultiAgentBaseObservationSpace(ABC):
             return coords
     
     def observation(self, agent, environment):
-        raise NotImplementedError("Please Implement this method")
\ No newline at end of file
+        raise NotImplementedError("Please Implement this method")
+
+    def observations(self, environment):
+        self.extract_environment_info(environment)
+        return tuple([self.agent_observation(agent) for agent in environment.agents])
\ No newline at end of file
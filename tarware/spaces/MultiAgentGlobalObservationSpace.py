@@ -7,8 +7,8 @@ from tarware.spaces.MultiAgentBaseObservationSpace import (
 
 
 class MultiAgentGlobalObservationSpace(MultiAgentBaseObservationSpace):
-    def __init__(self, num_agvs, num_pickers, grid_size, shelf_locations, normalised_coordinates=False):
-        super(MultiAgentGlobalObservationSpace, self).__init__(num_agvs, num_pickers, grid_size, shelf_locations, normalised_coordinates)
+    def __init__(self, num_agvs, num_pickers, grid_size, shelf_locations, normalised_coordinates=False, low_memory=False, encoding="dense"):
+        super(MultiAgentGlobalObservationSpace, self).__init__(num_agvs, num_pickers, grid_size, shelf_locations, msg_bits=0, normalised_coordinates=normalised_coordinates, low_memory=low_memory, encoding=encoding)
 
         self._define_obs_length()
         self.obs_lengths = [self.obs_length for _ in range(self.num_agents)]
@@ -17,16 +17,15 @@ class MultiAgentGlobalObservationSpace(MultiAgentBaseObservationSpace):
 
         ma_spaces = []
         for obs_length in self.obs_lengths:
-            ma_spaces += [
-                spaces.Box(
-                    low=-float("inf"),
-                    high=float("inf"),
-                    shape=(obs_length,),
-                    dtype=np.float32,
-                )
-            ]
+            ma_spaces += [self._make_box(obs_length)]
 
         self.ma_spaces = spaces.Tuple(tuple(ma_spaces))
+        self._setup_encoding()
+
+    def _coordinate_mask(self, agent_index):
+        agent_masks = [self._agent_info_mask(self.num_pickers > 0 and i < self.num_agvs) for i in range(self.num_agents)]
+        own_mask = agent_masks.pop(agent_index)
+        return sum(agent_masks, own_mask) + [False] * (self.obs_bits_per_shelf + self.obs_bits_for_requests)
 
     def _define_obs_length(self):
         location_space = spaces.Box(low=0.0, high=max(self.grid_size), shape=(2,), dtype=np.float32)
@@ -72,7 +71,7 @@ class MultiAgentGlobalObservationSpace(MultiAgentBaseObservationSpace):
                     self._current_shelves_info.extend([0, 0])
 
     def observation(self, agent):
-        obs = _VectorWriter(self.ma_spaces[agent.id - 1].shape[0])
+        obs = _VectorWriter(self.obs_lengths[agent.id - 1], self.obs_dtype)
         obs.write(self._current_agents_info[agent.id - 1])
         for agent_id, agent_info in enumerate(self._current_agents_info):
             if agent_id != agent.id - 1:
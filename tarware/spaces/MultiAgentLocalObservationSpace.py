@@ -0,0 +1,81 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from tarware.definitions import Action, CollisionLayers
+from tarware.spaces.MultiAgentBaseObservationSpace import \
+    MultiAgentBaseObservationSpace
+
+# Window channels: occupancy of the four collision layers, requested shelves and cells inside the grid
+_NUM_CHANNELS = len(CollisionLayers) + 2
+# Ego features: carrying, carrying a requested shelf, loading, own location and target location
+_EGO_LENGTH = 7
+
+
+class MultiAgentLocalObservationSpace(MultiAgentBaseObservationSpace):
+    """
+    Egocentric observations: a (2 * sensor_range + 1)^2 window of the collision layers around each agent, plus
+    a requested-shelf and an inside-grid channel, followed by the agent's own status, location and target.
+    The observation size only depends on `sensor_range`, not on the size of the warehouse.
+
+    Every step, the grid is written once into a padded buffer and the windows of all agents are taken with
+    a single gather over a zero-copy sliding window view of that buffer.
+    """
+    def __init__(self, num_agvs, num_pickers, grid_size, shelf_locations, normalised_coordinates=False, low_memory=False, encoding="dense", sensor_range=1):
+        super(MultiAgentLocalObservationSpace, self).__init__(num_agvs, num_pickers, grid_size, shelf_locations, msg_bits=0, normalised_coordinates=normalised_coordinates, low_memory=low_memory, encoding=encoding)
+
+        self.sensor_range = sensor_range
+        self.window_size = 2 * sensor_range + 1
+        self.obs_length = _NUM_CHANNELS * self.window_size ** 2 + _EGO_LENGTH
+        self.obs_lengths = [self.obs_length for _ in range(self.num_agents)]
+
+        rows, cols = grid_size
+        self._padded = np.zeros((_NUM_CHANNELS, rows + 2 * sensor_range, cols + 2 * sensor_range), dtype=self.obs_dtype)
+        self._interior = self._padded[:, sensor_range:sensor_range + rows, sensor_range:sensor_range + cols]
+        self._interior[-1] = 1
+        # Zero-copy view of shape (channels, rows, cols, window, window), indexed by the agent location
+        self._windows = sliding_window_view(self._padded, (self.window_size, self.window_size), axis=(1, 2))
+        self._current_obs = np.zeros((self.num_agents, self.obs_length), dtype=self.obs_dtype)
+
+        self.ma_spaces = [self._make_box(obs_length) for obs_length in self.obs_lengths]
+        self._setup_encoding()
+
+    def _coordinate_mask(self, agent_index):
+        return [False] * (self.obs_length - _EGO_LENGTH) + self._agent_info_mask(True)
+
+    def extract_environment_info(self, environment):
+        grid = environment.grid
+        np.not_equal(grid, 0, out=self._interior[:len(CollisionLayers)], casting="unsafe")
+        requested = np.zeros(len(environment.shelfs) + 1, dtype=bool)
+        requested[[shelf.id for shelf in environment.request_queue]] = True
+        self._interior[len(CollisionLayers)] = (
+            requested[grid[CollisionLayers.SHELVES]] | requested[grid[CollisionLayers.CARRIED_SHELVES]]
+        )
+
+        agents = environment.agents
+        ys = np.fromiter((agent.y for agent in agents), dtype=np.intp, count=len(agents))
+        xs = np.fromiter((agent.x for agent in agents), dtype=np.intp, count=len(agents))
+        windows = self._windows[:, ys, xs]
+        obs = np.empty((len(agents), self.obs_length), dtype=self.obs_dtype)
+        obs[:, :-_EGO_LENGTH] = windows.transpose(1, 0, 2, 3).reshape(len(agents), -1)
+
+        ego = obs[:, -_EGO_LENGTH:]
+        for i, agent in enumerate(agents):
+            carrying = agent.carrying_shelf is not None
+            ego[i, 0] = carrying
+            ego[i, 1] = carrying and requested[agent.carrying_shelf.id]
+            ego[i, 2] = agent.req_action == Action.TOGGLE_LOAD
+            ego[i, 3:5] = self.process_coordinates((agent.y, agent.x), environment)
+            if agent.target:
+                ego[i, 5:7] = self.process_coordinates(environment.action_id_to_coords_map[agent.target], environment)
+            else:
+                ego[i, 5:7] = 0
+        self._current_obs = obs
+
+    def observation(self, agent):
+        return self._current_obs[agent.id - 1]
+
+    def observations(self, environment):
+        if self.encoding != "dense":
+            return super(MultiAgentLocalObservationSpace, self).observations(environment)
+        self.extract_environment_info(environment)
+        return tuple(self._current_obs)
@@ -0,0 +1,29 @@
+import numpy as np
+from gymnasium import spaces
+
+from tarware.spaces.MultiAgentBaseObservationSpace import \
+    MultiAgentBaseObservationSpace
+
+
+class MultiAgentNoObservationSpace(MultiAgentBaseObservationSpace):
+    """
+    Observation space for controllers that read the environment state directly (e.g. the heuristic and the
+    graph greedy policy). Every agent observes an empty vector and no environment info is extracted.
+    """
+    def __init__(self, num_agvs, num_pickers, grid_size, shelf_locations, normalised_coordinates=False, low_memory=False, encoding="dense"):
+        super(MultiAgentNoObservationSpace, self).__init__(num_agvs, num_pickers, grid_size, shelf_locations, msg_bits=0, normalised_coordinates=normalised_coordinates, low_memory=low_memory, encoding=encoding)
+
+        self.obs_lengths = [0 for _ in range(self.num_agents)]
+        self._empty_obs = np.zeros(0, dtype=self.obs_dtype)
+        self._empty_obs.flags.writeable = False
+        self.ma_spaces = spaces.Tuple(tuple(self._make_box(obs_length) for obs_length in self.obs_lengths))
+        self._setup_encoding()
+
+    def _coordinate_mask(self, agent_index):
+        return []
+
+    def extract_environment_info(self, environment):
+        pass
+
+    def observation(self, agent):
+        return self._empty_obs
@@ -8,28 +8,33 @@ from tarware.spaces.MultiAgentBaseObservationSpace import (
 
 
 class MultiAgentPartialObservationSpace(MultiAgentBaseObservationSpace):
-    def __init__(self, num_agvs, num_pickers, grid_size, shelf_locations, normalised_coordinates=False):
-        super(MultiAgentPartialObservationSpace, self).__init__(num_agvs, num_pickers, grid_size, shelf_locations, normalised_coordinates)
+    def __init__(self, num_agvs, num_pickers, grid_size, shelf_locations, normalised_coordinates=False, low_memory=False, encoding="dense"):
+        super(MultiAgentPartialObservationSpace, self).__init__(num_agvs, num_pickers, grid_size, shelf_locations, msg_bits=0, normalised_coordinates=normalised_coordinates, low_memory=low_memory, encoding=encoding)
 
         self._define_obs_length_agvs()
         self._define_obs_length_pickers()
         self.agv_obs_lengths = [self._obs_length_agvs for _ in range(self.num_agvs)]
         self.picker_obs_lengths = [self._obs_length_pickers for _ in range(self.num_pickers)]
+        self.obs_lengths = self.agv_obs_lengths + self.picker_obs_lengths
         self._current_agvs_agents_info = []
         self._current_pickers_agents_info = []
         self._current_shelves_info = []
         ma_spaces = []
         for obs_length in self.agv_obs_lengths + self.picker_obs_lengths:
-            ma_spaces += [
-                spaces.Box(
-                    low=-float("inf"),
-                    high=float("inf"),
-                    shape=(obs_length,),
-                    dtype=np.float32,
-                )
-            ]
+            ma_spaces += [self._make_box(obs_length)]
 
         self.ma_spaces = spaces.Tuple(tuple(ma_spaces))
+        self._setup_encoding()
+
+    def _coordinate_mask(self, agent_index):
+        is_agv = [self.num_pickers > 0 and i < self.num_agvs for i in range(self.num_agents)]
+        others = [i for i in range(self.num_agents) if i != agent_index]
+        if is_agv[agent_index]:
+            # AGVs observe the location and target of the others, and the shelves
+            return sum((self._agent_info_mask(False) for _ in others), self._agent_info_mask(True)) + [False] * (
+                self.agvs_obs_bits_per_shelf + self.agvs_obs_bits_for_requests
+            )
+        return sum((self._agent_info_mask(is_agv[i]) for i in others), self._agent_info_mask(False))
 
     def _define_obs_length_agvs(self):
         location_space = spaces.Box(low=0.0, high=max(self.grid_size), shape=(2,), dtype=np.float32)
@@ -93,7 +98,7 @@ class MultiAgentPartialObservationSpace(MultiAgentBaseObservationSpace):
                     self._current_shelves_info.extend([0, 0])
 
     def observation(self, agent):
-        obs = _VectorWriter(self.ma_spaces[agent.id - 1].shape[0])
+        obs = _VectorWriter(self.obs_lengths[agent.id - 1], self.obs_dtype)
         if agent.type == AgentType.AGV:
             obs.write(self._current_pickers_agents_info[agent.id - 1])
             for agent_id, agent_info in enumerate(self._current_agvs_agents_info):
@@ -0,0 +1,85 @@
+import numpy as np
+from gymnasium import spaces
+
+from tarware.spaces.MultiAgentBaseObservationSpace import _VectorWriter
+from tarware.spaces.MultiAgentGlobalObservationSpace import \
+    MultiAgentGlobalObservationSpace
+
+
+class SharedObservations(dict):
+    """
+    Observations of one step in shared-state form: the global `state` vector (all agents in id order followed
+    by the shelf block) is stored once, and `ego` holds one small row per agent with its index followed by
+    its own agent info. The legacy per-agent global observation is a gather of `state`.
+
+    It is a dict with "state" and "ego" keys, a member of the `joint_space` of the env, whose values are also
+    the `state` and `ego` attributes.
+    """
+    __slots__ = ("_gather_index",)
+
+    def __init__(self, state, ego, gather_index):
+        super().__init__(state=state, ego=ego)
+        self._gather_index = gather_index
+
+    @property
+    def state(self):
+        return self["state"]
+
+    @property
+    def ego(self):
+        return self["ego"]
+
+    def agent_observation(self, agent_index):
+        """Legacy global observation of the agent at `agent_index` (own info first, then the others)."""
+        return self.state[self._gather_index[agent_index]]
+
+    def to_legacy(self):
+        """Legacy observations of all agents, stacked as a (num_agents, obs_length) array."""
+        return self.state[self._gather_index]
+
+
+class MultiAgentSharedObservationSpace(MultiAgentGlobalObservationSpace):
+    """
+    Shared-state variant of the global observation space. Instead of one reordered copy of the global vector
+    per agent, every step returns a `SharedObservations` with the state stored once and a per-agent ego
+    block. `ma_spaces` still describes the legacy per-agent vectors, while `joint_space` describes what is
+    actually returned.
+    """
+    def __init__(self, num_agvs, num_pickers, grid_size, shelf_locations, normalised_coordinates=False, low_memory=False, encoding="dense"):
+        if encoding != "dense":
+            raise ValueError("The shared observation type only supports the dense encoding")
+        super(MultiAgentSharedObservationSpace, self).__init__(num_agvs, num_pickers, grid_size, shelf_locations, normalised_coordinates=normalised_coordinates, low_memory=low_memory)
+
+        # AGVs observe their carrying and loading status on top of their location and target
+        self._agent_info_lengths = [
+            7 if self.num_pickers > 0 and i < self.num_agvs else 4 for i in range(self.num_agents)
+        ]
+        self.ego_length = 1 + max(self._agent_info_lengths)
+        self._gather_index = self._build_gather_index()
+
+        self.joint_space = spaces.Dict({
+            "state": self._make_box(self.obs_length),
+            "ego": self._make_box((self.num_agents, self.ego_length)),
+        })
+
+    def _build_gather_index(self):
+        offsets = np.concatenate([[0], np.cumsum(self._agent_info_lengths)])
+        agent_ranges = [np.arange(offsets[i], offsets[i + 1]) for i in range(self.num_agents)]
+        shelves_range = np.arange(offsets[-1], self.obs_length)
+        gather_index = np.empty((self.num_agents, self.obs_length), dtype=np.intp)
+        for i in range(self.num_agents):
+            gather_index[i] = np.concatenate(
+                [agent_ranges[i]] + [agent_ranges[j] for j in range(self.num_agents) if j != i] + [shelves_range]
+            )
+        return gather_index
+
+    def observations(self, environment):
+        self.extract_environment_info(environment)
+        state = _VectorWriter(self.obs_length, self.obs_dtype)
+        ego = np.zeros((self.num_agents, self.ego_length), dtype=self.obs_dtype)
+        for agent_index, agent_info in enumerate(self._current_agents_info):
+            state.write(agent_info)
+            ego[agent_index, 0] = agent_index
+            ego[agent_index, 1:1 + len(agent_info)] = agent_info
+        state.write(self._current_shelves_info)
+        return SharedObservations(state.vector, ego, self._gather_index)
@@ -1,8 +1,16 @@
+from .LazyObservations import LazyObservations
 from .MultiAgentGlobalObservationSpace import MultiAgentGlobalObservationSpace
+from .MultiAgentLocalObservationSpace import MultiAgentLocalObservationSpace
+from .MultiAgentNoObservationSpace import MultiAgentNoObservationSpace
 from .MultiAgentPartialObservationSpace import \
     MultiAgentPartialObservationSpace
+from .MultiAgentSharedObservationSpace import (
+    MultiAgentSharedObservationSpace, SharedObservations)
 
 observation_map = {
     'partial': MultiAgentPartialObservationSpace,
-    'global': MultiAgentGlobalObservationSpace
-}
\ No newline at end of file
+    'global': MultiAgentGlobalObservationSpace,
+    'none': MultiAgentNoObservationSpace,
+    'shared': MultiAgentSharedObservationSpace,
+    'local': MultiAgentLocalObservationSpace,
+}
@@ -0,0 +1,181 @@
+"""Travel times of agents over (cell, direction) states, counting the turns the path follower spends."""
+
+from collections import OrderedDict
+from typing import Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from tarware.definitions import AgentType, Direction
+
+# Direction value -> (dy, dx) of a forward move
+_MOVES = np.zeros((len(Direction), 2), dtype=np.int64)
+_MOVES[Direction.UP.value] = (-1, 0)
+_MOVES[Direction.DOWN.value] = (1, 0)
+_MOVES[Direction.LEFT.value] = (0, -1)
+_MOVES[Direction.RIGHT.value] = (0, 1)
+
+# Steps `get_next_micro_action` spends turning from one direction to another: one per quarter turn
+_TURN_ORDER = [Direction.UP, Direction.RIGHT, Direction.DOWN, Direction.LEFT]
+TURN_STEPS = np.zeros((len(Direction), len(Direction)), dtype=np.int64)
+for _a in Direction:
+    for _b in Direction:
+        _diff = (_TURN_ORDER.index(_a) - _TURN_ORDER.index(_b)) % 4
+        TURN_STEPS[_a.value, _b.value] = min(_diff, 4 - _diff)
+
+# (dy, dx) + 1 -> direction value of the move, for vectorised lookups
+_DIRECTION_OF_MOVE = np.full((3, 3), -1, dtype=np.int64)
+for _d, (_dy, _dx) in enumerate(_MOVES):
+    _DIRECTION_OF_MOVE[_dy + 1, _dx + 1] = _d
+
+_UNREACHABLE = np.iinfo(np.int32).max // 2
+
+
+class TravelTimeEstimator:
+    """
+    Number of steps an agent needs to reach a location, counting the steps spent turning: an agent only moves
+    forward, and `get_next_micro_action` spends one step per quarter turn before moving in a new direction.
+
+    `time_field(target, agent_type)` is the (4, rows, cols) array of these times from every (direction, cell)
+    state, computed once per target and agent type by a backward search over the traversable cells (all cells
+    for AGVs, the highways for pickers, as in `Warehouse.find_path` without other agents) and cached. The
+    times are those of the fastest route, a lower bound: the A* path the env follows has the fewest cells but
+    does not minimise turns, so it can take a few steps more. `path_time` gives the exact number of steps to
+    follow a given path, `path_travel_time` those of the path the env would compute and `etas` those of every
+    agent to the end of its current path (all without other agents in the way).
+
+    At the end of their path, AGVs spend one more step toggling the load, and pickers wait on the cell before
+    the target until the AGV there toggles the load, i.e. they are ready `path_time(..., path[:-1])` steps
+    after being dispatched.
+    """
+
+    def __init__(self, env, max_cached_fields: int = 4096):
+        self.grid_size = tuple(env.grid_size)
+        self.max_cached_fields = max_cached_fields
+        # Pickers travel on the highways and can't use the bottom row of goals, except as a target
+        self._passable = {
+            AgentType.AGV: np.ones(self.grid_size, dtype=bool),
+            AgentType.AGENT: np.ones(self.grid_size, dtype=bool),
+            AgentType.PICKER: np.asarray(env.highways, dtype=bool).copy(),
+        }
+        self._passable[AgentType.PICKER][-1, :] = False
+        self._fields: "OrderedDict[Tuple[Tuple[int, int], AgentType], np.ndarray]" = OrderedDict()
+
+    def _ahead(self, times: np.ndarray, out: np.ndarray) -> np.ndarray:
+        # out[d, y, x] = times[d] of the cell one forward move ahead of (y, x) in direction d
+        out.fill(_UNREACHABLE)
+        rows, cols = self.grid_size
+        for d, (dy, dx) in enumerate(_MOVES):
+            out[d, max(0, -dy):rows - max(0, dy), max(0, -dx):cols - max(0, dx)] = times[
+                d, max(0, dy):rows + min(0, dy), max(0, dx):cols + min(0, dx)
+            ]
+        return out
+
+    @staticmethod
+    def _turned(times: np.ndarray) -> np.ndarray:
+        # Best time over first turning in place to any other direction
+        return np.min(times[None, :, :, :] + TURN_STEPS[:, :, None, None], axis=1)
+
+    def _compute_field(self, target: Tuple[int, int], agent_type: AgentType) -> np.ndarray:
+        passable = self._passable[agent_type].copy()
+        passable[target] = True
+        # times[d, y, x]: steps from (y, x) facing d, through passable cells only
+        times = np.full((len(Direction),) + self.grid_size, _UNREACHABLE, dtype=np.int64)
+        times[(slice(None),) + target] = 0
+        ahead = np.empty_like(times)
+        while True:
+            self._ahead(times, ahead)
+            ahead += 1
+            ahead[:, ~passable] = _UNREACHABLE
+            relaxed = self._turned(np.minimum(times, ahead))
+            if np.array_equal(relaxed, times):
+                break
+            times = relaxed
+
+        # Agents can start from any cell, e.g. pickers on a rack location, and leave it through a passable one
+        start_times = self._turned(self._ahead(times, ahead) + 1)
+        times[:, ~passable] = start_times[:, ~passable]
+        times[(slice(None),) + target] = 0
+        return np.minimum(times, _UNREACHABLE).astype(np.int32)
+
+    def time_field(self, target: Tuple[int, int], agent_type: AgentType) -> np.ndarray:
+        """(4, rows, cols) steps to reach `target` (y, x) from every (direction value, y, x) state."""
+        key = ((int(target[0]), int(target[1])), agent_type)
+        field = self._fields.get(key)
+        if field is None:
+            field = self._compute_field(key[0], agent_type)
+            self._fields[key] = field
+            if len(self._fields) > self.max_cached_fields:
+                self._fields.popitem(last=False)
+        else:
+            self._fields.move_to_end(key)
+        return field
+
+    def travel_time(self, agent, target: Tuple[int, int]) -> int:
+        """Steps for `agent` to reach `target` (y, x) from its current cell and direction."""
+        return int(self.time_field(target, agent.type)[agent.dir.value, agent.y, agent.x])
+
+    def travel_times(self, agents: Sequence, target: Tuple[int, int]) -> np.ndarray:
+        """Steps for each of `agents` (all of the same type) to reach `target` (y, x)."""
+        if not agents:
+            return np.zeros(0, dtype=np.int64)
+        field = self.time_field(target, agents[0].type)
+        dirs = np.fromiter((a.dir.value for a in agents), dtype=np.int64, count=len(agents))
+        ys = np.fromiter((a.y for a in agents), dtype=np.int64, count=len(agents))
+        xs = np.fromiter((a.x for a in agents), dtype=np.int64, count=len(agents))
+        return field[dirs, ys, xs].astype(np.int64)
+
+    def path_travel_time(self, env, agent, target: Tuple[int, int]) -> int:
+        """Exact steps for `agent` to follow the path `env` computes to `target` (y, x), -1 if there is none."""
+        path = env.find_path((agent.y, agent.x), target, agent, care_for_agents=False)
+        if not path and (agent.y, agent.x) != tuple(target):
+            return -1
+        return self.path_time(agent.x, agent.y, agent.dir, path)
+
+    @staticmethod
+    def path_time(x: int, y: int, direction: Direction, path: Iterable[Tuple[int, int]]) -> int:
+        """Exact steps to follow `path` of (x, y) cells, as `Warehouse.find_path` returns, from (x, y) facing
+        `direction`."""
+        return int(TravelTimeEstimator.etas_from_paths([(x, y, direction, path)])[0])
+
+    @staticmethod
+    def etas_from_paths(
+        starts_and_paths: Sequence[Tuple[int, int, Direction, Iterable[Tuple[int, int]]]]
+    ) -> np.ndarray:
+        """Vectorised `path_time` for a batch of (x, y, direction, path) tuples."""
+        num_paths = len(starts_and_paths)
+        lengths = np.zeros(num_paths, dtype=np.int64)
+        cells: List[Tuple[int, int]] = []
+        initial_dirs = np.zeros(num_paths, dtype=np.int64)
+        for index, (x, y, direction, path) in enumerate(starts_and_paths):
+            path = list(path)
+            lengths[index] = len(path)
+            initial_dirs[index] = direction.value
+            if path:
+                cells.append((x, y))
+                cells.extend(path)
+        if not cells:
+            return lengths
+
+        # Moves between consecutive cells of every path; the start cell is dropped at each path boundary
+        cells = np.asarray(cells, dtype=np.int64)
+        moves = np.diff(cells, axis=0)
+        with_path = lengths > 0
+        starts = np.concatenate([[0], np.cumsum(lengths[with_path] + 1)[:-1]])
+        keep = np.ones(len(moves), dtype=bool)
+        keep[starts[1:] - 1] = False
+        moves = moves[keep]
+        move_dirs = _DIRECTION_OF_MOVE[moves[:, 1] + 1, moves[:, 0] + 1]
+        if (move_dirs < 0).any():
+            raise ValueError("paths should only contain moves to adjacent cells")
+
+        # Each move turns from the previous move's direction, the first from the agent's direction
+        move_starts = np.concatenate([[0], np.cumsum(lengths[with_path])[:-1]])
+        previous_dirs = np.concatenate([[0], move_dirs[:-1]])
+        previous_dirs[move_starts] = initial_dirs[with_path]
+        turns = TURN_STEPS[previous_dirs, move_dirs]
+        lengths[with_path] += np.add.reduceat(turns, move_starts)
+        return lengths
+
+    def etas(self, agents: Sequence) -> np.ndarray:
+        """Steps each agent needs to reach the end of its current path, 0 for agents without one."""
+        return self.etas_from_paths([(a.x, a.y, a.dir, a.path if a.busy and a.path else []) for a in agents])
@@ -4,90 +4,175 @@ import gymnasium as gym
 import numpy as np
 from gymnasium import ObservationWrapper, spaces
 
-from tarware import Action
+
+class _FlatObservationWriter:
+    """
+    Writes the per-agent observations flattened into one preallocated buffer. If all agents have the same
+    observation length the buffer is a (num_agents, obs_length) array, otherwise a flat array of the
+    concatenated observations. `agent_views` holds the per-agent views into the buffer.
+    """
+    def __init__(self, observation_spaces):
+        self.observation_spaces = tuple(observation_spaces)
+        self.flatdims = [spaces.flatdim(space) for space in self.observation_spaces]
+        # Box observations are copied as is, other spaces go through `spaces.flatten`
+        self._is_box = [isinstance(space, spaces.Box) for space in self.observation_spaces]
+        self.equal_lengths = len(set(self.flatdims)) == 1
+        if self.equal_lengths:
+            self.buffer = np.zeros((len(self.flatdims), self.flatdims[0]), dtype=np.float32)
+            self.agent_views = list(self.buffer)
+        else:
+            self.buffer = np.zeros(sum(self.flatdims), dtype=np.float32)
+            offsets = np.concatenate([[0], np.cumsum(self.flatdims)])
+            self.agent_views = [self.buffer[offsets[i]:offsets[i + 1]] for i in range(len(self.flatdims))]
+
+    def write(self, observation):
+        for view, space, is_box, obs in zip(self.agent_views, self.observation_spaces, self._is_box, observation):
+            view[:] = np.ravel(obs) if is_box else spaces.flatten(space, obs)
+        return self.buffer
 
 
 class FlattenAgents(gym.Wrapper):
-    def __init__(self, env):
+    """
+    Single-agent view of the warehouse: the observations of all agents flattened into one vector, a
+    MultiDiscrete joint action, and summed rewards.
+
+    The returned observation is a preallocated buffer that is overwritten on every `reset` and `step`, pass
+    `copy=True` to get a fresh array instead. Actions can be given as any array-like of one action per agent.
+    """
+    def __init__(self, env, copy=False):
         super().__init__(env)
-        sa_action_space = [len(Action), *env.msg_bits * (2,)]
-        if len(sa_action_space) == 1 and self.n_agents == 1:
-            sa_action_space = spaces.Discrete(sa_action_space[0])
+        self.num_agents = env.unwrapped.num_agents
+        self.copy = copy
+        sa_action_sizes = [space.n for space in env.action_space]
+        if self.num_agents == 1:
+            self.action_space = spaces.Discrete(sa_action_sizes[0])
         else:
-            sa_action_space = spaces.MultiDiscrete(self.n_agents * sa_action_space)
-        self.action_space = sa_action_space
+            self.action_space = spaces.MultiDiscrete(sa_action_sizes)
 
-        self.observation_space = spaces.Tuple(
-            tuple(space for space in self.observation_space)
+        self._writer = _FlatObservationWriter(env.observation_space)
+        self.observation_space = spaces.Box(
+            low=-float("inf"), high=float("inf"), shape=(sum(self._writer.flatdims),), dtype=np.float32
         )
 
+    def _flatten(self, observation):
+        flat = self._writer.write(observation).reshape(-1)
+        return flat.copy() if self.copy else flat
+
     def reset(self, **kwargs):
-        observation = super().reset(**kwargs)
-        return np.concatenate(
-            [spaces.flatten(s, o) for s, o in zip(self.observation_space, observation)]
-        )
+        observation = self.env.reset(**kwargs)
+        return self._flatten(observation)
 
     def step(self, action):
-        try:
-            action = np.split(action, self.n_agents)
-        except (AttributeError, IndexError):
-            action = [action]
-
-        observation, reward, termindated, truncated, info = super().step(action)
-        observation = np.concatenate(
-            [spaces.flatten(s, o) for s, o in zip(self.observation_space, observation)]
-        )
-        reward = np.sum(reward)
-        termindated = all(termindated)
-        truncated = all(truncated)
-        return observation, reward, termindated, truncated, info
+        action = np.asarray(action).reshape(self.num_agents)
+
+        observation, reward, terminated, truncated, info = self.env.step(action)
+        return self._flatten(observation), float(np.sum(reward)), all(terminated), all(truncated), info
 
 
 class DictAgents(gym.Wrapper):
-    def reset(self, **kwargs):
-        observation = super().reset(**kwargs)
-        digits = int(math.log10(self.n_agents)) + 1
+    """
+    Maps the per-agent tuples of the warehouse to dicts keyed by `agent_<i>`. The keys are built once, and
+    actions can be given either as such a dict or as an array-like of one action per agent.
+    """
+    def __init__(self, env):
+        super().__init__(env)
+        self.num_agents = env.unwrapped.num_agents
+        digits = int(math.log10(self.num_agents)) + 1
+        self.agent_keys = tuple(f"agent_{i:{digits}}" for i in range(self.num_agents))
+
+    def _to_dict(self, values):
+        return dict(zip(self.agent_keys, values))
 
-        return {f"agent_{i:{digits}}": obs_i for i, obs_i in enumerate(observation)}
+    def reset(self, **kwargs):
+        observation = self.env.reset(**kwargs)
+        return self._to_dict(observation)
 
     def step(self, action):
-        digits = int(math.log10(self.n_agents)) + 1
-        keys = [f"agent_{i:{digits}}" for i in range(self.n_agents)]
-        assert keys == sorted(action.keys())
-
-        # unwrap actions
-        action = [action[key] for key in sorted(action.keys())]
-
-        # step
-        observation, reward, terminated, truncated, info = super().step(action)
-
-        # wrap observations, rewards,  terminated and truncated
-        observation = {
-            f"agent_{i:{digits}}": obs_i for i, obs_i in enumerate(observation)
-        }
-        reward = {f"agent_{i:{digits}}": rew_i for i, rew_i in enumerate(reward)}
-        terminated = {f"agent_{i:{digits}}": terminated_i for i, terminated_i in enumerate(terminated)}
-        truncated = {f"agent_{i:{digits}}": truncated_i for i, truncated_i in enumerate(truncated)}
-        truncated["__all__"] = all(truncated.values())
+        if isinstance(action, dict):
+            if len(action) != self.num_agents:
+                raise ValueError(f"Expected actions for {self.agent_keys}, got {sorted(action.keys())}")
+            action = [action[key] for key in self.agent_keys]
+
+        observation, reward, terminated, truncated, info = self.env.step(action)
 
-        return observation, reward, terminated, truncated, info
+        truncated = self._to_dict(truncated)
+        truncated["__all__"] = all(truncated.values())
+        return self._to_dict(observation), self._to_dict(reward), self._to_dict(terminated), truncated, info
 
 
 class FlattenSAObservation(ObservationWrapper):
-    r"""Observation wrapper that flattens the observation."""
+    r"""
+    Observation wrapper that flattens the observation of every agent into a float32 vector. The observations
+    are written into one preallocated buffer: a (num_agents, obs_length) array when all agents have the same
+    observation length, returned as is, or otherwise a list of per-agent views. The buffer is overwritten on
+    every `reset` and `step`.
+    """
     def __init__(self, env):
         super(FlattenSAObservation, self).__init__(env)
 
-        ma_spaces = []
-
-        for sa_obs in env.observation_space:
-            flatdim = spaces.flatdim(sa_obs)
-            ma_spaces += [spaces.Box(low=-float('inf'), high=float('inf'), shape=(flatdim,), dtype=np.float32)]
+        self._writer = _FlatObservationWriter(env.observation_space)
+        self.observation_space = spaces.Tuple(tuple(
+            spaces.Box(low=-float('inf'), high=float('inf'), shape=(flatdim,), dtype=np.float32)
+            for flatdim in self._writer.flatdims
+        ))
 
-        self.observation_space = spaces.Tuple(tuple(ma_spaces))
+    def reset(self, **kwargs):
+        return self.observation(self.env.reset(**kwargs))
 
     def observation(self, observation):
-        return [spaces.flatten(obs_space, obs) for obs_space, obs in zip(self.env.observation_space, observation)]
+        buffer = self._writer.write(observation)
+        return buffer if self._writer.equal_lengths else self._writer.agent_views
+
+class ObservationHistory(gym.Wrapper):
+    """
+    Gives every agent its last `history_length` observations, oldest first, as a (history_length, obs_length)
+    array. Works with any observation type that returns one Box observation per agent, e.g. the partial and
+    global ones, and keeps the reset/step signature of the wrapped env. After `reset` the history is filled
+    with the initial observation.
+
+    Each agent's history is a circular buffer of twice the history length in which every observation is
+    written twice, at `i` and `i + history_length`, so the last `history_length` observations are always one
+    contiguous slice. The returned histories are views into these buffers; they are not copied and are only
+    valid until the next `step`.
+    """
+    def __init__(self, env, history_length):
+        super().__init__(env)
+        if history_length < 1:
+            raise ValueError(f"history_length is {history_length}, should be at least 1")
+        self.history_length = history_length
+        self._buffers = [
+            np.zeros((2 * history_length,) + space.shape, dtype=space.dtype) for space in env.observation_space
+        ]
+        self._position = 0
+        self.observation_space = spaces.Tuple(tuple(
+            spaces.Box(
+                low=np.repeat(space.low[None], history_length, axis=0),
+                high=np.repeat(space.high[None], history_length, axis=0),
+                dtype=space.dtype,
+            )
+            for space in env.observation_space
+        ))
+
+    def _history(self):
+        start = self._position + 1
+        return tuple(buffer[start:start + self.history_length] for buffer in self._buffers)
+
+    def reset(self, **kwargs):
+        observation = self.env.reset(**kwargs)
+        for buffer, obs in zip(self._buffers, observation):
+            buffer[:] = obs
+        self._position = self.history_length - 1
+        return self._history()
+
+    def step(self, action):
+        observation, reward, terminated, truncated, info = self.env.step(action)
+        self._position = (self._position + 1) % self.history_length
+        second = self._position + self.history_length
+        for buffer, obs in zip(self._buffers, observation):
+            buffer[self._position] = obs
+            buffer[second] = obs
+        return self._history(), reward, terminated, truncated, info
+
 
 class SquashDones(gym.Wrapper):
 
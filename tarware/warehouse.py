@@ -1,20 +1,25 @@
-import random
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple, Union
 
 import gymnasium as gym
 import networkx as nx
 import numpy as np
 import pyastar2d
 from gymnasium import spaces
-from tarware.definitions import (Action, AgentType, Direction,
+from tarware.definitions import (Action, AgentType, Direction, EventType,
                                  RewardType, CollisionLayers)
-from tarware.spaces import observation_map
+from tarware.events import EventLog, MemmapEventSink
+from tarware.spaces import (LazyObservations, SharedObservations,
+                             observation_map)
 from tarware.utils import find_sections, get_next_micro_action
+from tarware.zones import ZonePartition
 
 _FIXING_CLASH_TIME = 4
 _STUCK_THRESHOLD = 5
+_INFO_LEVELS = ("none", "counters", "full")
 
 class Entity:
+    __slots__ = ("id", "prev_x", "prev_y", "x", "y")
+
     def __init__(self, id_: int, x: int, y: int):
         self.id = id_
         self.prev_x = None
@@ -23,11 +28,13 @@ class Entity:
         self.y = y
 
 class Agent(Entity):
-    counter = 0
+    __slots__ = (
+        "dir", "req_action", "carrying_shelf", "canceled_action", "has_delivered",
+        "path", "busy", "fixing_clash", "type", "target",
+    )
 
-    def __init__(self, x: int, y: int, dir_: Direction, agent_type: AgentType):
-        Agent.counter += 1
-        super().__init__(Agent.counter, x, y)
+    def __init__(self, id_: int, x: int, y: int, dir_: Direction, agent_type: AgentType):
+        super().__init__(id_, x, y)
         self.dir = dir_
         self.req_action: Optional[Action] = None
         self.carrying_shelf: Optional[Shelf] = None
@@ -65,13 +72,11 @@ class Agent(Entity):
             return self.dir
 
 class Shelf(Entity):
-    counter = 0
-
-    def __init__(self, x, y):
-        Shelf.counter += 1
-        super().__init__(Shelf.counter, x, y)
+    __slots__ = ()
 
 class StuckCounter:
+    __slots__ = ("position", "count")
+
     def __init__(self, position: Tuple[int, int]):
         self.position = position
         self.count = 0
@@ -88,6 +93,29 @@ class StuckCounter:
         if position:
             self.position = position
 
+class KPIAccumulators:
+    """Per-agent episode counters, accumulated in place on every simulated step."""
+
+    def __init__(self, num_agents: int):
+        self.deliveries = np.zeros(num_agents, dtype=np.int64)
+        self.clashes = np.zeros(num_agents, dtype=np.int64)
+        self.stucks = np.zeros(num_agents, dtype=np.int64)
+        self.distance = np.zeros(num_agents, dtype=np.int64)
+        self.idle_time = np.zeros(num_agents, dtype=np.int64)
+
+    def reset(self):
+        for counter in (self.deliveries, self.clashes, self.stucks, self.distance, self.idle_time):
+            counter.fill(0)
+
+    def as_dict(self) -> Dict[str, np.ndarray]:
+        return {
+            "deliveries": self.deliveries.copy(),
+            "clashes": self.clashes.copy(),
+            "stucks": self.stucks.copy(),
+            "distance": self.distance.copy(),
+            "idle_time": self.idle_time.copy(),
+        }
+
 class Warehouse(gym.Env):
 
     metadata = {"render_modes": ["human", "rgb_array"]}
@@ -105,6 +133,14 @@ class Warehouse(gym.Env):
         reward_type: RewardType,
         normalised_coordinates: bool=False,
         observation_type: str = "global",
+        sensor_range: int = 1,
+        observation_encoding: str = "dense",
+        info_level: str = "full",
+        record_events: bool = False,
+        event_sink: Optional[MemmapEventSink] = None,
+        low_memory: bool = False,
+        zone_partitioning: bool = False,
+        lazy_observations: bool = False,
     ):
         """The robotic warehouse environment
 
@@ -154,15 +190,48 @@ class Warehouse(gym.Env):
         :type max_inactivity: Optional[int]
         :param reward_type: Specifies if agents are rewarded individually or globally
         :type reward_type: RewardType
-        :param observation_type: Specifies type of observations
-        :type normalised_coordinates: str
+        :param observation_type: Specifies type of observations: "partial", "global", "none" or "shared". The
+            "shared" type returns a `SharedObservations` holding the global state once plus a per-agent ego block,
+            and the "local" type a fixed-size window of the grid around each agent
+        :type observation_type: str
+        :param sensor_range: Number of cells the "local" observation window extends around the agent
+        :type sensor_range: int
+        :param observation_encoding: "dense" float vectors or "packed" observations, dicts of bit-packed flags and
+            uint8/uint16 coordinates that `observation_space_mapper.decode` turns back into dense float32 vectors
+        :type observation_encoding: str
         :param normalised_coordinates: Specifies whether absolute coordinates should be normalised
             with respect to total warehouse size
         :type normalised_coordinates: bool
+        :param info_level: Detail of the per-step info dict: "none" (empty dict), "counters" (scalar counters)
+            or "full" (counters and per-agent busy flags). Per-agent totals are always kept in `self.kpis`, and
+            `step_to_decision` always reports "elapsed_steps"
+        :type info_level: str
+        :param record_events: Records load, unload, delivery, clash and stuck events of each step, which are
+            exposed through `step_events`
+        :type record_events: bool
+        :param event_sink: Optional sink to which the events of every step are appended, implies `record_events`
+        :type event_sink: Optional[MemmapEventSink]
+        :param low_memory: Uses compact dtypes end to end: int16 grid, uint8 highways, float32 rewards, bool
+            dones and action masks, and integer (or float16) observations
+        :type low_memory: bool
+        :param zone_partitioning: Splits the grid into zones along rack rows/columns so that move conflicts are
+            only resolved between agents in range of each other, instead of between every pair of agents. The
+            resulting dynamics are identical; this pays off for layouts with hundreds of agents
+        :type zone_partitioning: bool
+        :param lazy_observations: `reset` and `step` return a `LazyObservations` proxy which only builds the
+            observations (all of them or per agent) on first access. Use `observation_type="none"` to skip
+            observations altogether
+        :type lazy_observations: bool
         """
+        if info_level not in _INFO_LEVELS:
+            raise ValueError(f"info_level is {info_level}. Should be one of {_INFO_LEVELS}")
 
         self.goals: List[Tuple[int, int]] = []
 
+        self.low_memory = low_memory
+        self._reward_dtype = np.float32 if low_memory else np.float64
+        self._mask_dtype = bool if low_memory else np.float64
+
         self.num_agvs = num_agvs
         self.num_pickers = num_pickers
         self.num_agents = num_agvs + num_pickers
@@ -179,6 +248,10 @@ class Warehouse(gym.Env):
         self._cur_inactive_steps = None
         self._cur_steps = 0
         self.max_steps = max_steps
+        self.info_level = info_level
+        self.kpis = KPIAccumulators(self.num_agents)
+        self.events = EventLog() if record_events or event_sink is not None else None
+        self.event_sink = event_sink
 
         self.action_size = len(self.action_id_to_coords_map) + 1
         self.action_space = spaces.Tuple(tuple(self.num_agents * [spaces.Discrete(self.action_size)]))
@@ -188,16 +261,39 @@ class Warehouse(gym.Env):
             self.num_pickers,
             self.grid_size,
             len(self.action_id_to_coords_map)-len(self.goals),
-            normalised_coordinates,
+            normalised_coordinates=normalised_coordinates,
+            low_memory=low_memory,
+            encoding=observation_encoding,
+            **({"sensor_range": sensor_range} if observation_type == "local" else {}),
         )
-        self.observation_space = spaces.Tuple(tuple(self.observation_space_mapper.ma_spaces))
+        if self.observation_space_mapper.joint_space is not None:
+            if lazy_observations:
+                raise ValueError(f"lazy_observations needs per-agent observations, not observation_type {observation_type}")
+            self.observation_space = self.observation_space_mapper.joint_space
+        else:
+            self.observation_space = spaces.Tuple(tuple(self.observation_space_mapper.ma_spaces))
+        self.lazy_observations = lazy_observations
+        # Bumped whenever the state changes, so that stale lazy observations can be detected
+        self._obs_version = 0
 
         self.request_queue_size = request_queue_size
         self.request_queue = []
         self.rack_groups = find_sections(list([loc for loc in self.action_id_to_coords_map.values() if (loc[1], loc[0]) not in self.goals]))
+        self.zones = ZonePartition(self.grid_size, self.rack_groups) if zone_partitioning else None
         self.agents: List[Agent] = []
         self.stuck_counters = []
         self.renderer = None
+        # Instance-scoped RNG so that several warehouses can be interleaved in one process
+        self._rng = np.random.RandomState()
+
+    @property
+    def step_events(self) -> Optional[np.recarray]:
+        """Events of the last `step` call, or None if events are not recorded."""
+        return self.events.records() if self.events is not None else None
+
+    def _record_event(self, event_type: EventType, agent: "Agent", shelf_id: int, x: int, y: int) -> None:
+        if self.events is not None:
+            self.events.record(event_type, self._cur_steps, agent.id, shelf_id, x, y)
 
     @property
     def targets_agvs(self):
@@ -217,7 +313,10 @@ class Warehouse(gym.Env):
             self._highway_lanes + (self.column_height + self._highway_lanes) * shelf_rows  + self._bottom_rows + 1,
             self._highway_lanes + (self.column_width  + self._highway_lanes) * shelf_columns,
         )
-        self.grid = np.zeros((len(CollisionLayers), *self.grid_size), dtype=np.int32)
+        grid_dtype = np.int16 if self.low_memory else np.int32
+        # Entity ids are stored in the grid, the largest one being the number of shelves (non-highway cells)
+        assert self.grid_size[0] * self.grid_size[1] <= np.iinfo(grid_dtype).max, "Layout too large for the grid dtype"
+        self.grid = np.zeros((len(CollisionLayers), *self.grid_size), dtype=grid_dtype)
 
         def get_highway_lanes_indices(axis_size, step):
             return [
@@ -240,7 +339,7 @@ class Warehouse(gym.Env):
         ]
         self.num_goals = len(self.goals)
 
-        self.highways = np.zeros(self.grid_size, dtype=np.int32)
+        self.highways = np.zeros(self.grid_size, dtype=np.uint8 if self.low_memory else np.int32)
         self.action_id_to_coords_map = {i+1: (x, y) for i, (y, x) in enumerate(self.goals)}
         item_loc_index=len(self.action_id_to_coords_map)+1
         for x in range(self.grid_size[1]):
@@ -249,6 +348,10 @@ class Warehouse(gym.Env):
                 if not highway_func(x, y) and (x, y) not in self.goals:
                     self.action_id_to_coords_map[item_loc_index] = (y, x)
                     item_loc_index+=1
+        # (y, x) of the non-goal locations, in the item ordering of the shelf information maps
+        self._item_location_coords = np.array(
+            [coords for id_, coords in self.action_id_to_coords_map.items() if id_ > len(self.goals)], dtype=np.intp
+        ).reshape(-1, 2)
 
     def _is_highway(self, x: int, y: int) -> bool:
         return self.highways[y, x]
@@ -328,7 +431,7 @@ class Warehouse(gym.Env):
         return [agent.carrying_shelf != None for agent in self.agents[:self.num_agvs]]
 
     def get_shelf_request_information(self) -> np.ndarray[int]:
-        request_item_map = np.zeros(len(self.shelfs))
+        request_item_map = np.zeros(len(self.shelfs), dtype=self._mask_dtype)
         requested_shelf_ids = [shelf.id for shelf in self.request_queue]
         for id_, coords in self.action_id_to_coords_map.items():
             if (coords[1], coords[0]) not in self.goals:
@@ -337,17 +440,14 @@ class Warehouse(gym.Env):
         return request_item_map
 
     def get_empty_shelf_information(self) -> np.ndarray[int]:
-        empty_item_map = np.zeros(len(self.shelfs))
-        for id_, coords in self.action_id_to_coords_map.items():
-            if (coords[1], coords[0]) not in self.goals:
-                if self.grid[CollisionLayers.SHELVES, coords[0], coords[1]] == 0 and (
-                    self.grid[CollisionLayers.CARRIED_SHELVES, coords[0], coords[1]] == 0
-                    or self.agents[
-                        self.grid[CollisionLayers.AGVS, coords[0], coords[1]] - 1
-                    ].req_action
-                    not in [Action.NOOP, Action.TOGGLE_LOAD]
-                ):
-                    empty_item_map[id_ - len(self.goals) - 1] = 1
+        empty_item_map = np.zeros(len(self.shelfs), dtype=self._mask_dtype)
+        ys, xs = self._item_location_coords[:, 0], self._item_location_coords[:, 1]
+        empty = self.grid[CollisionLayers.SHELVES, ys, xs] == 0
+        # A location with a carried shelf above it is only empty if the carrying AGV is moving on
+        for index in np.flatnonzero(empty & (self.grid[CollisionLayers.CARRIED_SHELVES, ys, xs] != 0)):
+            agv = self.agents[self.grid[CollisionLayers.AGVS, ys[index], xs[index]] - 1]
+            empty[index] = agv.req_action not in [Action.NOOP, Action.TOGGLE_LOAD]
+        empty_item_map[:len(empty)] = empty
         return empty_item_map
 
     def attribute_macro_actions(self, macro_actions: List[int]) -> Tuple[int, int]:
@@ -378,6 +478,7 @@ class Warehouse(gym.Env):
                         agent.busy = False
                 else:
                     agent.req_action = get_next_micro_action(agent.x, agent.y, agent.dir, agent.path[0])
+                    self.kpis.distance[agent.id - 1] += 1
                     agvs_distance_travelled += int(agent.type == AgentType.AGV)
                     pickrs_distance_travelled += int(agent.type == AgentType.PICKER)
                 if len(agent.path) == 1:
@@ -438,9 +539,11 @@ class Warehouse(gym.Env):
                     picker_id = self.grid[CollisionLayers.PICKERS, y, x]
                     if picker_id:
                         commited_agents.add(picker_id)
+        # Agents further apart than two cells can't clash, zones restrict the pairs to those in range
+        candidates = self.zones.conflict_candidates(agent_list) if self.zones is not None else None
         clashes = 0
         for agent in agent_list:
-            for other in agent_list:
+            for other in (agent_list if candidates is None else candidates[agent]):
                 if agent.id != other.id:
                     agent_new_x, agent_new_y = agent.req_location(self.grid_size)
                     other_new_x, other_new_y = other.req_location(self.grid_size)
@@ -460,6 +563,8 @@ class Warehouse(gym.Env):
                             if (other_new_x, other_new_y) in [(agent.x, agent.y), (agent_new_x, agent_new_y)] and not other.req_action in (Action.LEFT, Action.RIGHT):
                                 if other.fixing_clash == 0:# If the others are not already fixing the clash
                                     clashes+=1
+                                    self.kpis.clashes[agent.id - 1] += 1
+                                    self._record_event(EventType.CLASH, agent, agent.carrying_shelf.id if agent.carrying_shelf else 0, agent_new_x, agent_new_y)
                                     agent.fixing_clash = _FIXING_CLASH_TIME # Agent start time for clash fixing
                                     new_path = self.find_path((agent.y, agent.x), (agent.path[-1][1] ,agent.path[-1][0]), agent)
                                     if new_path != []: # If the agent can find an alternative path, assign it if not let the other solve the clash
@@ -504,10 +609,14 @@ class Warehouse(gym.Env):
                         continue
                 else:
                     overall_stucks += 1
+                    self.kpis.stucks[agent.id - 1] += 1
+                    self._record_event(EventType.STUCK, agent, agent.carrying_shelf.id if agent.carrying_shelf else 0, agent.x, agent.y)
                     agent.busy = False
                     agent_stuck_count.reset()
             if agent_stuck_count.count > _STUCK_THRESHOLD + self.column_height + 2:  # Time to get out of aisle
                 overall_stucks += 1
+                self.kpis.stucks[agent.id - 1] += 1
+                self._record_event(EventType.STUCK, agent, agent.carrying_shelf.id if agent.carrying_shelf else 0, agent.x, agent.y)
                 agent_stuck_count.reset((agent.x, agent.y))
                 agent.req_action = Action.NOOP
                 agent.busy = False
@@ -534,6 +643,7 @@ class Warehouse(gym.Env):
                 self.grid[CollisionLayers.SHELVES, agent.y, agent.x] = 0
                 self.grid[CollisionLayers.CARRIED_SHELVES, agent.y, agent.x] = shelf_id
                 agent.busy = False
+                self._record_event(EventType.LOAD, agent, shelf_id, agent.x, agent.y)
                 # Reward picker for loading
                 if self.reward_type == RewardType.GLOBAL:
                     rewards += 0.5
@@ -558,6 +668,7 @@ class Warehouse(gym.Env):
             ):
                 self.grid[CollisionLayers.SHELVES, agent.y, agent.x] = agent.carrying_shelf.id
                 self.grid[CollisionLayers.CARRIED_SHELVES, agent.y, agent.x] = 0
+                self._record_event(EventType.UNLOAD, agent, agent.carrying_shelf.id, agent.x, agent.y)
                 agent.carrying_shelf = None
                 agent.busy = False
                 agent.has_delivered = False
@@ -594,7 +705,7 @@ class Warehouse(gym.Env):
             carried_shels = [agent.carrying_shelf for agent in self.agents if agent.carrying_shelf]
             new_shelf_candidates = list(set(self.shelfs) - set(self.request_queue) - set(carried_shels)) # sort so np.random with seed is repeatable
             new_shelf_candidates.sort(key = lambda x: x.id)
-            new_request = np.random.choice(new_shelf_candidates)
+            new_request = self._rng.choice(new_shelf_candidates)
             self.request_queue[self.request_queue.index(self.shelfs[shelf_id - 1])] = new_request
 
             agent = self.agents[self.grid[CollisionLayers.AGVS, x, y] - 1]
@@ -605,6 +716,8 @@ class Warehouse(gym.Env):
                 elif self.reward_type == RewardType.INDIVIDUAL:
                     rewards[agent.id - 1] += 1
             shelf_deliveries += 1
+            self.kpis.deliveries[agent.id - 1] += 1
+            self._record_event(EventType.DELIVERY, agent, shelf_id, y, x)
 
         if shelf_deliveries:
             self._cur_inactive_steps = 0
@@ -615,61 +728,68 @@ class Warehouse(gym.Env):
 
     def reset(self, seed=None, options=None)-> Tuple:
         # Reset counters
-        Shelf.counter = 0
-        Agent.counter = 0
         self._cur_inactive_steps = 0
         self._cur_steps = 0
+        self._obs_version += 1
+        self.kpis.reset()
+        if self.events is not None:
+            self.events.clear()
 
         # Set seed
         self.seed(seed)
 
         # Make the shelfs
-        self.shelfs = [
-            Shelf(x, y)
+        shelf_locs = [
+            (y, x)
             for y, x in zip(
                 np.indices(self.grid_size)[0].reshape(-1),
                 np.indices(self.grid_size)[1].reshape(-1),
             )
             if not self._is_highway(x, y)
         ]
+        # Entity ids are allocated per instance, starting at 1 so that `self.shelfs[id - 1]` holds
+        self.shelfs = [Shelf(id_, x, y) for id_, (y, x) in enumerate(shelf_locs, start=1)]
         self._higway_locs = np.array([(y, x) for y, x in zip(
                 np.indices(self.grid_size)[0].reshape(-1),
                 np.indices(self.grid_size)[1].reshape(-1),
-            ) if self._is_highway(x, y)])
+            ) if self._is_highway(x, y)], dtype=np.int16 if self.low_memory else None)
 
         # Spawn agents on higwahy locations
-        agent_loc_ids = np.random.choice(
+        agent_loc_ids = self._rng.choice(
             np.arange(len(self._higway_locs)),
             size=self.num_agents,
             replace=False,
         )
         agent_locs = [self._higway_locs[agent_loc_ids, 0], self._higway_locs[agent_loc_ids, 1]]
         # and direction
-        agent_dirs = np.random.choice([d for d in Direction], size=self.num_agents)
+        agent_dirs = self._rng.choice([d for d in Direction], size=self.num_agents)
         self.agents = [
-            Agent(x, y, dir_, agent_type = agent_type)
-            for y, x, dir_, agent_type in zip(*agent_locs, agent_dirs, self._agent_types)
+            Agent(id_, x, y, dir_, agent_type = agent_type)
+            for id_, (y, x, dir_, agent_type) in enumerate(zip(*agent_locs, agent_dirs, self._agent_types), start=1)
         ]
 
         self.stuck_counters = [StuckCounter((agent.x, agent.y)) for agent in self.agents]
         self._recalc_grid()
 
         self.request_queue = list(
-            np.random.choice(self.shelfs, size=self.request_queue_size, replace=False)
+            self._rng.choice(self.shelfs, size=self.request_queue_size, replace=False)
         )
-        self.observation_space_mapper.extract_environment_info(self)
-        return tuple([self.observation_space_mapper.observation(agent) for agent in self.agents])
+        return self._get_observations()
 
-    def step(
-        self, macro_actions: List[int]
-    ) -> Tuple[List[np.ndarray], List[float], List[bool], List[bool], Dict]:
+    def _get_observations(self) -> Union[Tuple[np.ndarray, ...], LazyObservations, SharedObservations]:
+        if self.lazy_observations:
+            return LazyObservations(self)
+        return self.observation_space_mapper.observations(self)
+
+    def _simulate_step(self, macro_actions: List[int]) -> Tuple[np.ndarray, bool, Tuple[int, ...]]:
+        self._obs_version += 1
         # Attribute macro actions to agents and resolve conflicts
         agvs_distance_travelled, pickers_distance_travelled = self.attribute_macro_actions(macro_actions)
         clashes_count = self.resolve_move_conflict(self.agents)
         # Restart agents if they are stuck at the same position
         stucks_count = self.resolve_stuck_agents()
 
-        rewards = np.zeros(self.num_agents)
+        rewards = np.zeros(self.num_agents, dtype=self._reward_dtype)
         # Apply penalty for inactivity
         rewards -= 0.001
         # Execute micro actions
@@ -679,24 +799,98 @@ class Warehouse(gym.Env):
 
         self._recalc_grid()
         self._cur_steps += 1
-        if (
-            self.max_inactivity_steps
-            and self._cur_inactive_steps >= self.max_inactivity_steps
-        ) or (self.max_steps and self._cur_steps >= self.max_steps):
-            terminateds = truncateds = self.num_agents * [True]
-        else:
-            terminateds = truncateds =  self.num_agents * [False]
-
-        self.observation_space_mapper.extract_environment_info(self)
-        new_obs = tuple([self.observation_space_mapper.observation(agent) for agent in self.agents])
-        info = self._build_info(
+        done = bool(
+            (self.max_inactivity_steps and self._cur_inactive_steps >= self.max_inactivity_steps)
+            or (self.max_steps and self._cur_steps >= self.max_steps)
+        )
+        counters = (
             agvs_distance_travelled,
             pickers_distance_travelled,
             clashes_count,
             stucks_count,
             shelf_deliveries,
+            *self._idle_times(),
+        )
+        return rewards, done, counters
+
+    def _flush_events(self) -> None:
+        if self.event_sink is not None:
+            self.event_sink.append(self.events.records())
+
+    def step(
+        self, macro_actions: List[int]
+    ) -> Tuple[List[np.ndarray], List[float], List[bool], List[bool], Dict]:
+        if self.events is not None:
+            self.events.clear()
+        rewards, done, counters = self._simulate_step(macro_actions)
+        self._flush_events()
+        if self.low_memory:
+            terminateds = np.full(self.num_agents, done)
+            rewards_out = rewards
+        else:
+            terminateds = self.num_agents * [done]
+            rewards_out = list(rewards)
+
+        new_obs = self._get_observations()
+        info = self._build_info(*counters)
+        return new_obs, rewards_out, terminateds, terminateds, info
+
+    def step_to_decision(
+        self, macro_actions: List[int], max_skip: Optional[int] = None
+    ) -> Tuple[List[np.ndarray], List[float], List[bool], List[bool], Dict]:
+        """
+        Semi-MDP variant of `step`. The given macro actions are applied on the first step, after which the
+        simulation keeps advancing with no-op macro actions until at least one busy agent becomes free, no agent
+        is busy, the episode ends or `max_skip` steps have elapsed. Observations are only built once, at the
+        decision point.
+
+        Parameters:
+        - macro_actions (List[int]): The macro actions applied on the first step.
+        - max_skip (Optional[int]): Maximum number of simulated steps per call, unbounded if None.
+
+        Returns:
+        - The same tuple as `step`, where rewards and info counters are summed over all simulated steps and
+          `info["elapsed_steps"]` holds the number of steps that were simulated. When events are recorded,
+          `step_events` holds the events of all simulated steps.
+        """
+        noop_actions = self.num_agents * [0]
+        total_rewards = np.zeros(self.num_agents, dtype=self._reward_dtype)
+        total_counters = np.zeros(7, dtype=int)
+        elapsed_steps = 0
+        actions = macro_actions
+        if self.events is not None:
+            self.events.clear()
+        while True:
+            was_busy = [agent.busy for agent in self.agents]
+            rewards, done, counters = self._simulate_step(actions)
+            total_rewards += rewards
+            total_counters += counters
+            elapsed_steps += 1
+            actions = noop_actions
+            agent_freed = any(busy and not agent.busy for busy, agent in zip(was_busy, self.agents))
+            # With no busy agent left, no agent can become free: every agent is waiting for a decision
+            none_busy = not any(agent.busy for agent in self.agents)
+            if done or agent_freed or none_busy or (max_skip and elapsed_steps >= max_skip):
+                break
+        self._flush_events()
+        if self.low_memory:
+            terminateds = np.full(self.num_agents, done)
+            rewards_out = total_rewards
+        else:
+            terminateds = self.num_agents * [done]
+            rewards_out = list(total_rewards)
+
+        new_obs = self._get_observations()
+        info = self._build_info(*(int(c) for c in total_counters))
+        info["elapsed_steps"] = elapsed_steps
+        return new_obs, rewards_out, terminateds, terminateds, info
+
+    def _idle_times(self) -> Tuple[int, int]:
+        idle = np.fromiter(
+            (agent.req_action in (Action.NOOP, Action.TOGGLE_LOAD) for agent in self.agents), dtype=bool, count=self.num_agents
         )
-        return new_obs, list(rewards), terminateds, terminateds, info
+        self.kpis.idle_time += idle
+        return int(idle[:self.num_agvs].sum()), int(idle[self.num_agvs:].sum())
 
     def _build_info(
         self,
@@ -705,11 +899,14 @@ class Warehouse(gym.Env):
         clashes_count: int,
         stucks_count:  int,
         shelf_deliveries: int,
+        agvs_idle_time: int,
+        pickers_idle_time: int,
     ) -> Dict[str, np.ndarray]:
         info = {}
-        agvs_idle_time = sum([int(agent.req_action in (Action.NOOP, Action.TOGGLE_LOAD)) for agent in self.agents[:self.num_agvs]])
-        pickers_idle_time = sum([int(agent.req_action in (Action.NOOP, Action.TOGGLE_LOAD)) for agent in self.agents[self.num_agvs:]])
-        info["vehicles_busy"] = [agent.busy for agent in self.agents]
+        if self.info_level == "none":
+            return info
+        if self.info_level == "full":
+            info["vehicles_busy"] = [agent.busy for agent in self.agents]
         info["shelf_deliveries"] = shelf_deliveries
         info["clashes"] = clashes_count
         info["stucks"] = stucks_count
@@ -731,7 +928,7 @@ class Warehouse(gym.Env):
         ])
         # Compute valid location list for Pickers
         if pickers_to_agvs:
-            valid_location_list_pickers = np.zeros(len(self.action_id_to_coords_map) - len(self.goals))
+            valid_location_list_pickers = np.zeros(len(self.action_id_to_coords_map) - len(self.goals), dtype=self._mask_dtype)
             valid_location_list_pickers[targets_agvs] = 1
         else:
             valid_location_list_pickers = requested_items
@@ -739,7 +936,7 @@ class Warehouse(gym.Env):
         if block_conflicting_actions:
             valid_location_list_agvs[:, targets_agvs] = 0
             valid_location_list_pickers[targets_pickers] = 0
-        valid_action_masks = np.ones((self.num_agents, self.action_size))
+        valid_action_masks = np.ones((self.num_agents, self.action_size), dtype=self._mask_dtype)
         valid_action_masks[:self.num_agvs,  1 + len(self.goals):] = valid_location_list_agvs
         valid_action_masks[:self.num_agvs,  1 : 1 + len(self.goals)] = np.repeat(np.expand_dims(np.array(carrying_shelf_info), 1), len(self.goals), axis=1)
         valid_action_masks[self.num_agvs:,  1 + len(self.goals):] = valid_location_list_pickers
@@ -757,5 +954,5 @@ class Warehouse(gym.Env):
             self.renderer.close()
 
     def seed(self, seed=None):
-        np.random.seed(seed)
-        random.seed(seed)
+        # Same stream as the previously used global `np.random.seed`, without touching the global RNG state
+        self._rng = np.random.RandomState(seed)
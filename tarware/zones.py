@@ -0,0 +1,72 @@
+"""Spatial partitioning of the warehouse into zones, used to keep conflict resolution local."""
+
+import heapq
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+# Agents only interact in `resolve_move_conflict` if their requested cells can coincide, i.e. if they are at
+# most two cells apart (one move each)
+_INTERACTION_RANGE = 2
+
+
+def _span_boundaries(spans: List[Tuple[int, int]]) -> List[int]:
+    # Zone boundaries lie in the middle of the highway lanes separating consecutive rack spans
+    spans = sorted(set(spans))
+    return [(spans[i][1] + spans[i + 1][0] + 1) // 2 for i in range(len(spans) - 1)]
+
+
+class ZonePartition:
+    """
+    Splits the grid into rectangular zones, one per rack row and rack column, with boundaries in the middle of
+    the highways between racks. The bottom rows with the goals belong to the last row of zones.
+
+    For every cell, the zones within interaction range are precomputed, so that the agents an agent can
+    clash with are found by looking at a few zone buckets instead of every other agent.
+    """
+
+    def __init__(self, grid_size: Tuple[int, int], rack_groups: Sequence[Sequence[Tuple[int, int]]]):
+        self.grid_size = grid_size
+        # Rack groups hold (y, x) locations
+        row_spans = [(min(y for y, _ in group), max(y for y, _ in group)) for group in rack_groups]
+        col_spans = [(min(x for _, x in group), max(x for _, x in group)) for group in rack_groups]
+        row_zone = np.searchsorted(_span_boundaries(row_spans), np.arange(grid_size[0]), side="right")
+        col_zone = np.searchsorted(_span_boundaries(col_spans), np.arange(grid_size[1]), side="right")
+        self.num_zones = int((row_zone.max() + 1) * (col_zone.max() + 1))
+        self.zone_map = row_zone[:, None] * (col_zone.max() + 1) + col_zone[None, :]
+
+        self._reachable_zones = [[()] * grid_size[1] for _ in range(grid_size[0])]
+        for y in range(grid_size[0]):
+            for x in range(grid_size[1]):
+                zones = set()
+                for dy in range(-_INTERACTION_RANGE, _INTERACTION_RANGE + 1):
+                    for dx in range(-_INTERACTION_RANGE + abs(dy), _INTERACTION_RANGE - abs(dy) + 1):
+                        if 0 <= y + dy < grid_size[0] and 0 <= x + dx < grid_size[1]:
+                            zones.add(int(self.zone_map[y + dy, x + dx]))
+                self._reachable_zones[y][x] = tuple(sorted(zones))
+
+    def zone_of(self, x: int, y: int) -> int:
+        return int(self.zone_map[y, x])
+
+    def is_boundary_cell(self, x: int, y: int) -> bool:
+        return len(self._reachable_zones[y][x]) > 1
+
+    def conflict_candidates(self, agents: Sequence) -> Dict[object, List]:
+        """
+        Maps every agent to the agents it could interact with this step, in the same relative order as
+        `agents`. Agents inside a zone only see their zone bucket; agents near a boundary get the merged buckets
+        of all zones in range, which keeps cross-boundary moves deterministic.
+        """
+        order = {agent: index for index, agent in enumerate(agents)}
+        buckets: List[List] = [[] for _ in range(self.num_zones)]
+        for agent in agents:
+            buckets[self.zone_map[agent.y, agent.x]].append(agent)
+
+        candidates = {}
+        for agent in agents:
+            zones = self._reachable_zones[agent.y][agent.x]
+            if len(zones) == 1:
+                candidates[agent] = buckets[zones[0]]
+            else:
+                candidates[agent] = list(heapq.merge(*(buckets[z] for z in zones), key=order.__getitem__))
+        return candidates
@@ -1,9 +1,12 @@
 """Env adapters and registry helpers."""
 
-from .tarware_adapter import TarwareAdapter, Transition
+from .env_pool import EnvPool
+from .tarware_adapter import ArrayTransition, TarwareAdapter, Transition
 from .registry import filter_env_ids, is_env_id_valid, list_env_ids
 
 __all__ = [
+    "ArrayTransition",
+    "EnvPool",
     "TarwareAdapter",
     "Transition",
     "list_env_ids",
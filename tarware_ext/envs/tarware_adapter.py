@@ -7,6 +7,8 @@ from typing import Any, Sequence, Tuple
 
 import numpy as np
 
+from tarware.warehouse import Warehouse
+
 
 def _as_seq(x: Any) -> Sequence:
     if isinstance(x, (list, tuple, np.ndarray)):
@@ -43,11 +45,53 @@ class Transition:
     info: dict
 
 
+class ArrayTransition:
+    """
+    Transition record of the fast step path. Rewards and dones are NumPy arrays, and the adapter reuses one
+    record and its arrays across steps, so the fields of a transition are only valid until the next `step`.
+    """
+
+    __slots__ = (
+        "obs",
+        "reward_by_agent",
+        "reward_team",
+        "terminated_by_agent",
+        "truncated_by_agent",
+        "done_by_agent",
+        "done_all",
+        "info",
+    )
+
+    def __init__(self, num_agents: int) -> None:
+        self.obs = None
+        self.reward_by_agent = np.zeros(num_agents, dtype=np.float64)
+        self.reward_team = 0.0
+        self.terminated_by_agent = np.zeros(num_agents, dtype=bool)
+        self.truncated_by_agent = np.zeros(num_agents, dtype=bool)
+        self.done_by_agent = np.zeros(num_agents, dtype=bool)
+        self.done_all = False
+        self.info = {}
+
+
 class TarwareAdapter:
-    def __init__(self, env: Any, reward_team: bool = False, done_all: bool = True) -> None:
+    def __init__(
+        self,
+        env: Any,
+        reward_team: bool = False,
+        done_all: bool = True,
+        decision_points: bool = False,
+        max_skip: int | None = None,
+        fast: bool = False,
+    ) -> None:
         self.env = env
         self.reward_team = reward_team
         self.done_all = done_all
+        # Semi-MDP stepping: advance the simulator until an agent becomes free (see Warehouse.step_to_decision)
+        self.decision_points = decision_points
+        self.max_skip = max_skip
+        # Fast path: `step` fills a reused ArrayTransition instead of building lists and a new Transition
+        self.fast = fast
+        self._transition: ArrayTransition | None = None
 
     @property
     def action_space(self) -> Any:
@@ -66,14 +110,22 @@ class TarwareAdapter:
             except TypeError:
                 reset_out = self.env.reset(seed=seed)
 
-        if isinstance(reset_out, tuple):
-            if len(reset_out) >= 2:
-                return reset_out[0], reset_out[1]
-            return reset_out[0], {}
+        # The warehouse returns its per-agent observations alone, also through gymnasium's wrappers, and a
+        # 2-agent observation tuple can look like (obs, info). Other envs return (obs, info) or bare observations
+        if isinstance(getattr(self.env, "unwrapped", self.env), Warehouse):
+            return reset_out, {}
+        if isinstance(reset_out, tuple) and len(reset_out) == 2 and isinstance(reset_out[1], dict):
+            return reset_out[0], reset_out[1]
         return reset_out, {}
 
-    def step(self, action: Any) -> Transition:
-        step_out = self.env.step(action)
+    def step(self, action: Any, max_skip: int | None = None) -> Transition | ArrayTransition:
+        if self.decision_points:
+            max_skip = self.max_skip if max_skip is None else max_skip
+            step_out = self.env.unwrapped.step_to_decision(action, max_skip=max_skip)
+        else:
+            step_out = self.env.step(action)
+        if self.fast and len(step_out) == 5:
+            return self._fill_transition(*step_out)
         if len(step_out) == 5:
             obs, reward, terminated, truncated, info = step_out
         elif len(step_out) == 4:
@@ -111,6 +163,32 @@ class TarwareAdapter:
             info=info,
         )
 
+    def _fill_transition(self, obs: Any, reward: Any, terminated: Any, truncated: Any, info: dict) -> ArrayTransition:
+        transition = self._transition
+        if transition is None:
+            transition = self._transition = ArrayTransition(len(_as_seq(reward)))
+        # Slice assignment is a plain memcpy when the env already returns arrays (e.g. Warehouse(low_memory=True))
+        transition.reward_by_agent[:] = reward
+        transition.terminated_by_agent[:] = terminated
+        transition.truncated_by_agent[:] = truncated
+        np.logical_or(transition.terminated_by_agent, transition.truncated_by_agent, out=transition.done_by_agent)
+        if isinstance(reward, list):
+            transition.reward_team = float(sum(reward))
+        else:
+            transition.reward_team = float(np.add.reduce(transition.reward_by_agent))
+        transition.done_all = bool(np.logical_and.reduce(transition.done_by_agent))
+
+        if self.reward_team:
+            transition.reward_by_agent.fill(transition.reward_team)
+        if self.done_all:
+            transition.terminated_by_agent.fill(transition.done_all)
+            transition.truncated_by_agent.fill(transition.done_all)
+            transition.done_by_agent.fill(transition.done_all)
+
+        transition.obs = obs
+        transition.info = info
+        return transition
+
     def render(self, *args: Any, **kwargs: Any) -> Any:
         return self.env.render(*args, **kwargs)
 
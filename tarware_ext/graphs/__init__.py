@@ -1,6 +1,6 @@
 """Graph state builders and helpers."""
 
-from .builder import GraphBuilder
-from .schema import GraphState, NodeType
+from .builder import NODE_FEATURES, GraphBuilder
+from .schema import EdgeType, GraphState, NodeType
 
-__all__ = ["GraphBuilder", "GraphState", "NodeType"]
+__all__ = ["NODE_FEATURES", "EdgeType", "GraphBuilder", "GraphState", "NodeType"]
@@ -1,12 +1,260 @@
-"""Graph builder placeholder."""
+"""Incremental warehouse graph builder."""
 
 from __future__ import annotations
 
-from typing import Any
+from typing import Any, Dict, Sequence, Tuple
+from weakref import WeakKeyDictionary
 
-from .schema import GraphState
+import numpy as np
+
+from tarware.definitions import AgentType, CollisionLayers
+
+from .schema import EdgeType, GraphState, NodeType
+
+NODE_FEATURES = (
+    "is_agv",
+    "is_picker",
+    "is_shelf",
+    "is_goal",
+    "y",
+    "x",
+    # Locations: a shelf is stored there / the stored shelf is requested. Agents: the carried shelf is requested
+    "has_shelf",
+    "requested",
+    "carrying",
+    "busy",
+    "target_y",
+    "target_x",
+    "has_target",
+    # Locations: targeted by an AGV / by a picker
+    "agv_targeted",
+    "picker_targeted",
+)
+_F = {name: index for index, name in enumerate(NODE_FEATURES)}
+_NODE_TYPES = list(NodeType)
+_RAYS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+
+
+# Layout key of every env, with the location map it was computed from: the layout is made once per env
+_layout_keys: "WeakKeyDictionary[Any, Tuple[Dict, Tuple]]" = WeakKeyDictionary()
+
+
+def _layout_key(env: Any) -> Tuple:
+    locations = env.action_id_to_coords_map
+    cached = _layout_keys.get(env)
+    if cached is not None and cached[0] is locations:
+        return cached[1]
+    key = (tuple(env.grid_size), env.num_agvs, env.num_pickers, tuple(locations.items()))
+    _layout_keys[env] = (locations, key)
+    return key
+
+
+class _Layout:
+    """Static part of the graph of one warehouse layout."""
+
+    def __init__(self, env: Any) -> None:
+        self.grid_size = tuple(env.grid_size)
+        rows, cols = self.grid_size
+        self.num_agvs = env.num_agvs
+        self.num_agents = env.num_agents
+        # Location node i is action id i + 1, goals first
+        num_locations = len(env.action_id_to_coords_map)
+        self.num_locations = num_locations
+        self.num_nodes = num_locations + self.num_agents
+        self.location_yx = np.array([env.action_id_to_coords_map[i + 1] for i in range(num_locations)], dtype=np.int64)
+        self.scale = np.array([max(rows - 1, 1), max(cols - 1, 1)], dtype=np.float32)
+        goals = {(y, x) for (x, y) in env.goals}
+        is_goal = np.array([tuple(yx) in goals for yx in self.location_yx])
+
+        node_type_ids = np.empty(self.num_nodes, dtype=np.int64)
+        node_type_ids[:num_locations] = np.where(
+            is_goal, _NODE_TYPES.index(NodeType.GOAL), _NODE_TYPES.index(NodeType.SHELF)
+        )
+        agent_types = [NodeType.AGV if a.type == AgentType.AGV else NodeType.PICKER for a in env.agents]
+        node_type_ids[num_locations:] = [_NODE_TYPES.index(t) for t in agent_types]
+        self.node_type_ids = node_type_ids
+        self.node_types = [_NODE_TYPES[i] for i in node_type_ids]
+
+        self.static_features = np.zeros((self.num_nodes, len(NODE_FEATURES)), dtype=np.float32)
+        self.static_features[np.arange(self.num_nodes), node_type_ids] = 1.0
+        self.static_features[:num_locations, [_F["y"], _F["x"]]] = self.location_yx / self.scale
+
+        self.location_grid = np.full(self.grid_size, -1, dtype=np.int64)
+        self.location_grid[self.location_yx[:, 0], self.location_yx[:, 1]] = np.arange(num_locations)
+        self.edge_index, self.edge_types = self._static_edges(np.asarray(env.highways, dtype=bool))
+
+        # Closest location of every cell, ties to the lowest node
+        cells = np.indices(self.grid_size).reshape(2, -1).T
+        dists = np.abs(cells[:, None, :] - self.location_yx[None, :, :]).sum(axis=2)
+        self.closest_location = dists.argmin(axis=1).reshape(self.grid_size)
+
+        self.num_static_edges = self.edge_index.shape[1]
+        self.num_edges = self.num_static_edges + 4 * self.num_agents
+        dynamic_types = np.tile(
+            [EdgeType.AGENT_LOCATION, EdgeType.AGENT_LOCATION, EdgeType.AGENT_TARGET, EdgeType.AGENT_TARGET],
+            self.num_agents,
+        )
+        self.all_edge_types = np.concatenate([self.edge_types, dynamic_types]).astype(np.int64)
+
+    def _static_edges(self, highways: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # From every location, look along the four directions: the next cell is a location (same rack), or the
+        # ray crosses highway cells and stops at a location (across an aisle)
+        rows, cols = self.grid_size
+        edges = {}
+        for node, (y, x) in enumerate(self.location_yx):
+            for dy, dx in _RAYS:
+                ny, nx = y + dy, x + dx
+                steps = 1
+                while 0 <= ny < rows and 0 <= nx < cols and self.location_grid[ny, nx] < 0 and highways[ny, nx]:
+                    ny, nx = ny + dy, nx + dx
+                    steps += 1
+                if 0 <= ny < rows and 0 <= nx < cols and self.location_grid[ny, nx] >= 0:
+                    edge_type = EdgeType.RACK if steps == 1 else EdgeType.AISLE
+                    edges[(node, int(self.location_grid[ny, nx]))] = edge_type
+        pairs = sorted(edges)
+        edge_index = np.array(pairs, dtype=np.int64).T.reshape(2, -1)
+        edge_types = np.array([edges[pair] for pair in pairs], dtype=np.int64)
+        return edge_index, edge_types
+
+
+class _Batch:
+    """Preallocated arrays of a disjoint union of graphs, with the static parts filled in once."""
+
+    def __init__(self, layouts: Sequence[_Layout]) -> None:
+        self.layouts = list(layouts)
+        self.node_offsets = np.concatenate([[0], np.cumsum([l.num_nodes for l in layouts])]).astype(np.int64)
+        self.edge_offsets = np.concatenate([[0], np.cumsum([l.num_edges for l in layouts])]).astype(np.int64)
+        num_nodes, num_edges = int(self.node_offsets[-1]), int(self.edge_offsets[-1])
+
+        self.node_features = np.zeros((num_nodes, len(NODE_FEATURES)), dtype=np.float32)
+        self.edge_index = np.zeros((2, num_edges), dtype=np.int64)
+        self.edge_types = np.concatenate([l.all_edge_types for l in layouts])
+        self.node_type_ids = np.concatenate([l.node_type_ids for l in layouts])
+        self.node_types = [t for l in layouts for t in l.node_types]
+        self.graph_index = np.repeat(np.arange(len(layouts)), [l.num_nodes for l in layouts])
+        self.agent_nodes = np.concatenate(
+            [offset + l.num_locations + np.arange(l.num_agents) for l, offset in zip(layouts, self.node_offsets)]
+        ).astype(np.int64)
+        for layout, node_offset, edge_offset in zip(layouts, self.node_offsets, self.edge_offsets):
+            self.edge_index[:, edge_offset:edge_offset + layout.num_static_edges] = layout.edge_index + node_offset
+
+        self.state = GraphState(
+            node_features=self.node_features,
+            edge_index=self.edge_index,
+            node_types=self.node_types,
+            metadata={
+                "num_nodes": num_nodes,
+                "num_edges": num_edges,
+                "num_graphs": len(layouts),
+                "num_agents": int(len(self.agent_nodes)),
+            },
+            edge_types=self.edge_types,
+            node_type_ids=self.node_type_ids,
+            graph_index=self.graph_index,
+            agent_nodes=self.agent_nodes,
+        )
 
 
 class GraphBuilder:
+    """
+    Builds the graph of a warehouse: one node per location (node i is action id i + 1, goals first) and one per
+    agent (after the locations, in agent order), with the `NODE_FEATURES` of every node.
+
+    The location nodes and the edges between them (`EdgeType.RACK` and `EdgeType.AISLE`) only depend on the
+    layout and are computed once per layout. Every `build` only refreshes the dynamic features (shelves,
+    requests, agent positions, loads and targets) and the four edges of every agent (to its closest location
+    and to its target) in preallocated arrays.
+
+    `build_batch(envs)` returns the disjoint union of the graphs of several envs, with `graph_index` giving the
+    graph of every node and `agent_nodes` the node of every agent.
+
+    The returned `GraphState` arrays are overwritten by the next build of the same layouts; copy them to keep
+    them.
+    """
+
+    def __init__(self) -> None:
+        self._layouts: Dict[Tuple, _Layout] = {}
+        self._batches: Dict[Tuple, _Batch] = {}
+
+    def layout(self, env: Any) -> _Layout:
+        key = _layout_key(env)
+        layout = self._layouts.get(key)
+        if layout is None:
+            layout = self._layouts[key] = _Layout(env)
+        return layout
+
     def build(self, env: Any) -> GraphState:
-        raise NotImplementedError("GraphBuilder.build is not implemented yet.")
+        return self.build_batch([env])
+
+    def build_batch(self, envs: Sequence[Any]) -> GraphState:
+        envs = [getattr(env, "unwrapped", env) for env in envs]
+        keys = tuple(_layout_key(env) for env in envs)
+        batch = self._batches.get(keys)
+        if batch is None:
+            for env in envs:
+                self.layout(env)
+            batch = self._batches[keys] = _Batch([self._layouts[key] for key in keys])
+
+        for index, (env, layout) in enumerate(zip(envs, batch.layouts)):
+            node_offset = int(batch.node_offsets[index])
+            self._fill(
+                env,
+                layout,
+                batch.node_features[node_offset:node_offset + layout.num_nodes],
+                batch.edge_index[:, batch.edge_offsets[index] + layout.num_static_edges:batch.edge_offsets[index + 1]],
+                node_offset,
+            )
+        return batch.state
+
+    @staticmethod
+    def _fill(env: Any, layout: _Layout, features: np.ndarray, agent_edges: np.ndarray, node_offset: int) -> None:
+        features[:] = layout.static_features
+        num_locations = layout.num_locations
+        ys, xs = layout.location_yx[:, 0], layout.location_yx[:, 1]
+
+        requested = np.zeros(len(env.shelfs) + 1, dtype=bool)
+        requested[[shelf.id for shelf in env.request_queue]] = True
+        stored = env.grid[CollisionLayers.SHELVES, ys, xs]
+        features[:num_locations, _F["has_shelf"]] = stored != 0
+        features[:num_locations, _F["requested"]] = requested[stored] & (stored != 0)
+
+        agents = env.agents
+        num_agents = len(agents)
+        agent_yx = np.array([(a.y, a.x) for a in agents], dtype=np.int64).reshape(num_agents, 2)
+        targets = np.fromiter((a.target for a in agents), dtype=np.int64, count=num_agents)
+        carried = np.fromiter(
+            (a.carrying_shelf.id if a.carrying_shelf else 0 for a in agents), dtype=np.int64, count=num_agents
+        )
+        agent_features = features[num_locations:]
+        agent_features[:, [_F["y"], _F["x"]]] = agent_yx / layout.scale
+        agent_features[:, _F["carrying"]] = carried != 0
+        agent_features[:, _F["requested"]] = requested[carried] & (carried != 0)
+        agent_features[:, _F["busy"]] = np.fromiter((a.busy for a in agents), dtype=bool, count=num_agents)
+        has_target = targets > 0
+        target_nodes = np.where(has_target, targets - 1, 0)
+        agent_features[:, _F["has_target"]] = has_target
+        agent_features[:, [_F["target_y"], _F["target_x"]]] = (
+            layout.location_yx[target_nodes] / layout.scale * has_target[:, None]
+        )
+
+        is_agv = np.arange(num_agents) < layout.num_agvs
+        features[:num_locations, _F["agv_targeted"]] = np.bincount(
+            target_nodes[has_target & is_agv], minlength=num_locations
+        )[:num_locations] > 0
+        features[:num_locations, _F["picker_targeted"]] = np.bincount(
+            target_nodes[has_target & ~is_agv], minlength=num_locations
+        )[:num_locations] > 0
+
+        # Four edges per agent: agent -> location, location -> agent, agent -> target, target -> agent
+        agent_nodes = node_offset + num_locations + np.arange(num_agents)
+        location_nodes = node_offset + layout.closest_location[agent_yx[:, 0], agent_yx[:, 1]]
+        target_nodes = np.where(has_target, node_offset + target_nodes, location_nodes)
+        edges = agent_edges.reshape(2, num_agents, 4)
+        edges[0, :, 0] = agent_nodes
+        edges[1, :, 0] = location_nodes
+        edges[0, :, 1] = location_nodes
+        edges[1, :, 1] = agent_nodes
+        edges[0, :, 2] = agent_nodes
+        edges[1, :, 2] = target_nodes
+        edges[0, :, 3] = target_nodes
+        edges[1, :, 3] = agent_nodes
@@ -3,7 +3,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from enum import Enum
+from enum import Enum, IntEnum
 from typing import Dict, List
 
 import numpy as np
@@ -16,9 +16,26 @@ class NodeType(str, Enum):
     GOAL = "goal"
 
 
+class EdgeType(IntEnum):
+    # Locations next to each other in a rack, or goals next to each other
+    RACK = 0
+    # Locations facing each other across a highway
+    AISLE = 1
+    # Agent and the location closest to its cell, both ways
+    AGENT_LOCATION = 2
+    # Agent and the location it is heading to, both ways (its closest location if it has no target)
+    AGENT_TARGET = 3
+
+
 @dataclass
 class GraphState:
     node_features: np.ndarray
     edge_index: np.ndarray
     node_types: List[NodeType]
     metadata: Dict[str, int]
+    # Optional arrays filled by `GraphBuilder`: the `EdgeType` of every edge, the index of every node's type in
+    # `NodeType`, the graph of every node in a batch and the node of every agent
+    edge_types: np.ndarray | None = None
+    node_type_ids: np.ndarray | None = None
+    graph_index: np.ndarray | None = None
+    agent_nodes: np.ndarray | None = None
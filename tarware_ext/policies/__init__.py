@@ -1,14 +1,25 @@
 """Policies for interacting with the env."""
 
+from .active_cap import ActiveCapController
 from .base import Policy
-from .graph_greedy_policy import DistanceMode, GraphGreedyPolicy
+from .gnn_policy import GNNInferencePolicy, GNNPolicy
+from .graph_greedy_policy import AssignmentStrategy, DistanceMode, GraphGreedyPolicy
 from .heuristic_policy import HeuristicPolicy
+from .inference_server import InferencePolicy, InferenceServer
+from .masked_random_policy import MaskedRandomPolicy
 from .random_policy import RandomPolicy
 
 __all__ = [
     "Policy",
     "RandomPolicy",
+    "MaskedRandomPolicy",
     "HeuristicPolicy",
     "GraphGreedyPolicy",
     "DistanceMode",
+    "AssignmentStrategy",
+    "ActiveCapController",
+    "InferenceServer",
+    "InferencePolicy",
+    "GNNPolicy",
+    "GNNInferencePolicy",
 ]
@@ -0,0 +1,114 @@
+"""Online tuning of the number of AGVs a policy keeps active."""
+
+from __future__ import annotations
+
+from typing import List
+
+import numpy as np
+
+
+class ActiveCapController:
+    """
+    Adjusts the active-AGV cap during an episode from the env's KPI counters (`env.kpis`), instead of fixing it
+    with an offline `active_alpha` sweep.
+
+    Every `window` simulated steps the counters are diffed against the previous window and the cap moves by
+    `step_size`, clamped to [`min_cap`, `max_cap`] (`max_cap` defaults to the number of AGVs):
+
+      1. If the cap was increasing and the AGV clashes and stucks per active AGV and step exceed both
+         `max_congestion` and those of the previous window, the cap decreases. Idle AGVs parked in the aisles
+         also cause clashes, so congestion alone is not a reason to lower the cap.
+      2. Otherwise, if the pickers were idle more than `max_picker_idle` of the time, the cap increases.
+      3. Otherwise the cap hill-climbs on the deliveries: it keeps moving in the same direction while the
+         deliveries do not drop compared to the previous window, and reverses direction when they do. At a
+         bound it holds until they drop.
+
+    The rule only depends on the counters, so runs stay deterministic. `history` holds the cap after every
+    update of the current episode.
+    """
+
+    def __init__(
+        self,
+        window: int = 50,
+        step_size: int = 1,
+        min_cap: int = 1,
+        max_cap: int | None = None,
+        max_congestion: float = 0.02,
+        max_picker_idle: float = 0.5,
+    ) -> None:
+        if window < 1:
+            raise ValueError(f"window is {window}, should be at least 1")
+        if step_size < 1:
+            raise ValueError(f"step_size is {step_size}, should be at least 1")
+        self.window = window
+        self.step_size = step_size
+        self.min_cap = min_cap
+        self.max_cap = max_cap
+        self.max_congestion = max_congestion
+        self.max_picker_idle = max_picker_idle
+        self.cap = 0
+        self.history: List[int] = []
+        self._lower = min_cap
+        self._upper = min_cap
+        self._num_agvs = 0
+        self._num_pickers = 0
+        self._direction = 1
+        self._last_step = 0
+        self._last_counters = np.zeros(4, dtype=np.int64)
+        self._last_deliveries: int | None = None
+        self._last_congestion = 0.0
+
+    def _counters(self, env) -> np.ndarray:
+        kpis = env.kpis
+        agvs = slice(0, self._num_agvs)
+        pickers = slice(self._num_agvs, None)
+        return np.array(
+            [
+                kpis.deliveries[agvs].sum(),
+                kpis.clashes[agvs].sum(),
+                kpis.stucks[agvs].sum(),
+                kpis.idle_time[pickers].sum(),
+            ],
+            dtype=np.int64,
+        )
+
+    def reset(self, env, initial_cap: int) -> int:
+        self._num_agvs = env.num_agvs
+        self._num_pickers = env.num_pickers
+        self._upper = max(1, min(self._num_agvs, self.max_cap or self._num_agvs))
+        self._lower = max(1, min(self.min_cap, self._upper))
+        self.cap = int(np.clip(initial_cap, self._lower, self._upper))
+        self.history = [self.cap]
+        self._direction = 1
+        self._last_step = env._cur_steps
+        self._last_counters = self._counters(env)
+        self._last_deliveries = None
+        self._last_congestion = 0.0
+        return self.cap
+
+    def update(self, env) -> int:
+        """Returns the cap to use for the current step, updating it if a window has elapsed."""
+        elapsed = env._cur_steps - self._last_step
+        if elapsed < self.window:
+            return self.cap
+
+        counters = self._counters(env)
+        deliveries, clashes, stucks, picker_idle = counters - self._last_counters
+        self._last_counters = counters
+        self._last_step = env._cur_steps
+
+        congestion = (clashes + stucks) / (elapsed * self.cap)
+        picker_idle_fraction = picker_idle / (elapsed * self._num_pickers) if self._num_pickers else 0.0
+        if congestion > max(self.max_congestion, self._last_congestion) and self._direction > 0:
+            self._direction = -1
+        elif picker_idle_fraction > self.max_picker_idle:
+            self._direction = 1
+        elif self._last_deliveries is not None and deliveries < self._last_deliveries:
+            self._direction = -self._direction
+        self._last_deliveries = int(deliveries)
+        self._last_congestion = congestion
+
+        # At a bound the cap holds until the deliveries drop and reverse the direction
+        self.cap = int(np.clip(self.cap + self._direction * self.step_size, self._lower, self._upper))
+        self.history.append(self.cap)
+        return self.cap
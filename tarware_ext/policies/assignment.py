@@ -0,0 +1,98 @@
+"""Batched task assignment: cost matrices and a linear-assignment solver."""
+
+from __future__ import annotations
+
+from typing import Callable, Sequence, Tuple
+
+import numpy as np
+
+
+def manhattan_cost_matrix(sources_yx: np.ndarray, targets_yx: np.ndarray) -> np.ndarray:
+    """(num_sources, num_targets) matrix of Manhattan distances, in one broadcast pass."""
+    sources_yx = np.asarray(sources_yx, dtype=np.int64).reshape(-1, 2)
+    targets_yx = np.asarray(targets_yx, dtype=np.int64).reshape(-1, 2)
+    return np.abs(sources_yx[:, None, :] - targets_yx[None, :, :]).sum(axis=2)
+
+
+def pairwise_cost_matrix(
+    sources: Sequence, targets: Sequence, cost_fn: Callable[[object, object], float]
+) -> np.ndarray:
+    """(num_sources, num_targets) matrix of `cost_fn(source, target)`, e.g. path lengths."""
+    cost = np.empty((len(sources), len(targets)), dtype=np.float64)
+    for i, source in enumerate(sources):
+        for j, target in enumerate(targets):
+            cost[i, j] = cost_fn(source, target)
+    return cost
+
+
+def _checked_cost(cost: np.ndarray) -> np.ndarray:
+    cost = np.asarray(cost, dtype=np.float64)
+    if cost.ndim != 2:
+        raise ValueError(f"cost matrix should be 2-dimensional, got shape {cost.shape}")
+    if np.isnan(cost).any() or (cost == -np.inf).any():
+        raise ValueError("cost matrix contains NaN or -inf entries")
+    return cost
+
+
+def linear_sum_assignment(cost: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Minimum-cost assignment of a rectangular cost matrix (Hungarian method with shortest augmenting paths,
+    O(n^2 m) for n <= m). Every row is assigned to a distinct column if there are fewer rows than columns,
+    and vice versa. Infinite costs forbid a pair; a ValueError is raised if every complete assignment uses one.
+
+    Ties are broken towards lower indices, so results are deterministic.
+
+    Returns the assigned row and column indices, sorted by row, like `scipy.optimize.linear_sum_assignment`.
+    """
+    cost = _checked_cost(cost)
+    if cost.size == 0:
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    n, m = cost.shape
+
+    # 1-indexed potentials and matching, column 0 is the virtual start of every augmenting path
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    row_of_col = np.zeros(m + 1, dtype=int)
+    way = np.zeros(m + 1, dtype=int)
+    for row in range(1, n + 1):
+        row_of_col[0] = row
+        col0 = 0
+        min_slack = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[col0] = True
+            row0 = row_of_col[col0]
+            free = ~used[1:]
+            slack = cost[row0 - 1] - u[row0] - v[1:]
+            improved = free & (slack < min_slack[1:])
+            min_slack[1:][improved] = slack[improved]
+            way[1:][improved] = col0
+
+            masked = np.where(free, min_slack[1:], np.inf)
+            col1 = int(np.argmin(masked)) + 1
+            delta = masked[col1 - 1]
+            if delta == np.inf:
+                raise ValueError("cost matrix is infeasible")
+
+            u[row_of_col[used]] += delta
+            v[used] -= delta
+            min_slack[1:][free] -= delta
+            col0 = col1
+            if row_of_col[col0] == 0:
+                break
+        # Flip the augmenting path
+        while col0:
+            col1 = way[col0]
+            row_of_col[col0] = row_of_col[col1]
+            col0 = col1
+
+    cols = np.flatnonzero(row_of_col[1:])
+    rows = row_of_col[1:][cols] - 1
+    if transposed:
+        rows, cols = cols, rows
+    order = np.argsort(rows, kind="stable")
+    return rows[order], cols[order]
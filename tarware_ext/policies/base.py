@@ -4,6 +4,8 @@ from __future__ import annotations
 
 from typing import Any, Protocol
 
+import numpy as np
+
 
 class Policy(Protocol):
     def reset(self) -> None:
@@ -11,3 +13,11 @@ class Policy(Protocol):
 
     def act(self, obs: Any) -> Any:
         ...
+
+    def act_batch(self, batch: Any, masks: np.ndarray | None = None) -> np.ndarray:
+        """
+        Actions for a batch of envs, as an int array of shape (num_envs, num_agents). `batch` holds the
+        observations stacked along a leading env axis, or the list of unwrapped envs for policies with
+        `uses_env`. Policies with `uses_masks` also get the (num_envs, num_agents, num_actions) action masks.
+        """
+        ...
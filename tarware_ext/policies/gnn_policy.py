@@ -1,13 +1,292 @@
-"""GNN policy placeholder."""
+"""Message-passing GNN policy over the warehouse graph, in numpy."""
 
 from __future__ import annotations
 
-from typing import Any
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from tarware_ext.graphs import NODE_FEATURES, EdgeType, GraphBuilder, GraphState
+from tarware_ext.graphs.masks import build_action_masks
+
+from .inference_server import InferenceServer
+
+_NUM_EDGE_TYPES = len(EdgeType)
+
+
+def _aggregation_plan(graph: GraphState) -> List[Tuple[np.ndarray | None, np.ndarray, np.ndarray]]:
+    """
+    Incoming edges of every node, by slot: slot k holds the k-th incoming edge of the nodes with more than k
+    of them (None if that is every node), the row `src * num_edge_types + type` of its per-type message and its
+    weight, 1 / the number of edges of that type into the node, so that summing the slots gives the mean
+    message per edge type. Most nodes have a few incoming edges, so the later slots are short.
+    """
+    num_nodes = len(graph.node_features)
+    src, dst = graph.edge_index
+    key = dst * _NUM_EDGE_TYPES + graph.edge_types
+    weights = (1.0 / np.bincount(key, minlength=num_nodes * _NUM_EDGE_TYPES)[key]).astype(np.float32)
+
+    order = np.argsort(dst, kind="stable")
+    degree = np.bincount(dst, minlength=num_nodes)
+    first_edge = np.cumsum(degree) - degree
+    message_rows = (src * _NUM_EDGE_TYPES + graph.edge_types)[order]
+    weights = weights[order]
+    plan = []
+    for slot in range(int(degree.max(initial=0))):
+        nodes = np.flatnonzero(degree > slot)
+        edges = first_edge[nodes] + slot
+        plan.append((None if len(nodes) == num_nodes else nodes, message_rows[edges], weights[edges, None]))
+    return plan
+
+
+def _union(node_features: np.ndarray, edge_index: np.ndarray, edge_types: np.ndarray, num_agents: int) -> GraphState:
+    """Disjoint union of same-size graphs given with a leading graph axis, whose agents are their last nodes."""
+    num_graphs, num_nodes, _ = node_features.shape
+    offsets = np.arange(num_graphs, dtype=np.int64) * num_nodes
+    agent_nodes = (offsets[:, None] + np.arange(num_nodes - num_agents, num_nodes)).reshape(-1)
+    return GraphState(
+        node_features=node_features.reshape(num_graphs * num_nodes, -1),
+        edge_index=(edge_index + offsets[:, None, None]).transpose(1, 0, 2).reshape(2, -1),
+        # Not needed by the forward pass, the one-hot node type is in the features
+        node_types=[],
+        metadata={
+            "num_nodes": num_graphs * num_nodes,
+            "num_edges": edge_index.shape[0] * edge_index.shape[2],
+            "num_graphs": num_graphs,
+            "num_agents": len(agent_nodes),
+        },
+        edge_types=edge_types.reshape(-1),
+        graph_index=np.repeat(np.arange(num_graphs), num_nodes),
+        agent_nodes=agent_nodes,
+    )
 
 
 class GNNPolicy:
-    def reset(self) -> None:
+    """
+    Scores the actions of every agent with a message-passing network over the graph of `GraphBuilder`, for one
+    env (`act`) or many (`act_batch`) in a single forward pass over the disjoint union of their graphs.
+
+    Network, all in float32 numpy:
+
+      - an input layer maps the `NODE_FEATURES` of every node to `hidden` units;
+      - each of the `num_layers` message-passing layers adds to every node the mean message per edge type
+        (`EdgeType`) from its neighbours, with one weight matrix per edge type, plus a residual connection;
+      - the logit of action id k >= 1 of an agent is the scaled dot product between the agent's query and the
+        key of location node k - 1 of its graph, the logit of NOOP comes from the agent's embedding alone.
+
+    The neighbour aggregation gathers the messages of the incoming edges of all nodes at once, one slot (first
+    incoming edge, second, ...) at a time, from a plan built once per forward pass, so there are no Python
+    loops over nodes or edges. Actions are sampled (or the argmax with
+    `deterministic`) among those allowed by `compute_valid_action_masks`.
+
+    `act_arrays` takes the graphs as arrays with a leading env axis instead of envs, to serve the policy with an
+    `InferenceServer(policy.act_arrays)`; `GNNInferencePolicy` is the matching client.
+
+    The time spent building graphs, computing masks and in the forward pass is accumulated per call;
+    `latency_ms` gives the mean per call. Weights are random until loaded with `load` (saved as `.npz`).
+    """
+
+    uses_env = True
+
+    def __init__(
+        self,
+        hidden: int = 64,
+        num_layers: int = 2,
+        key_size: int = 32,
+        deterministic: bool = False,
+        seed: int | None = None,
+        builder: GraphBuilder | None = None,
+    ) -> None:
+        self.hidden = hidden
+        self.num_layers = num_layers
+        self.key_size = key_size
+        self.deterministic = deterministic
+        self.rng = np.random.default_rng(seed)
+        self.builder = builder or GraphBuilder()
+        self.params = self._init_params(np.random.default_rng(seed))
+        self.reset_stats()
+
+    def _init_params(self, rng: np.random.Generator) -> Dict[str, np.ndarray]:
+        def dense(fan_in: int, fan_out: int, gain: float = 2.0) -> np.ndarray:
+            return (rng.normal(size=(fan_in, fan_out)) * np.sqrt(gain / fan_in)).astype(np.float32)
+
+        hidden = self.hidden
+        params = {"w_in": dense(len(NODE_FEATURES), hidden), "b_in": np.zeros(hidden, dtype=np.float32)}
+        for layer in range(self.num_layers):
+            params[f"w_self_{layer}"] = dense(hidden, hidden)
+            params[f"w_msg_{layer}"] = dense(hidden, hidden * _NUM_EDGE_TYPES, gain=2.0 / _NUM_EDGE_TYPES)
+            params[f"b_{layer}"] = np.zeros(hidden, dtype=np.float32)
+        params["w_query"] = dense(hidden, self.key_size)
+        params["w_key"] = dense(hidden, self.key_size)
+        params["w_noop"] = dense(hidden, 1)
+        params["b_noop"] = np.zeros(1, dtype=np.float32)
+        return params
+
+    def save(self, path: str | Path) -> None:
+        np.savez(path, **self.params)
+
+    def load(self, path: str | Path) -> "GNNPolicy":
+        with np.load(path) as data:
+            params = {name: data[name].astype(np.float32) for name in data.files}
+        missing = set(self.params) - set(params)
+        if missing:
+            raise ValueError(f"{path} is missing the weights {sorted(missing)}")
+        self.hidden = params["w_in"].shape[1]
+        self.key_size = params["w_query"].shape[1]
+        self.num_layers = sum(name.startswith("w_self_") for name in params)
+        self.params = params
+        return self
+
+    def reset(self, env: Any = None) -> None:
+        return None
+
+    def reset_stats(self) -> None:
+        self.num_calls = 0
+        self.num_envs = 0
+        self.graph_time_s = 0.0
+        self.mask_time_s = 0.0
+        self.forward_time_s = 0.0
+
+    @property
+    def latency_ms(self) -> Dict[str, float]:
+        """Mean milliseconds per call spent building graphs, computing masks, in the forward pass and in total."""
+        calls = max(self.num_calls, 1)
+        graph, masks, forward = (1e3 * t / calls for t in (self.graph_time_s, self.mask_time_s, self.forward_time_s))
+        return {"graph": graph, "masks": masks, "forward": forward, "total": graph + masks + forward}
+
+    def embed(self, graph: GraphState) -> np.ndarray:
+        """(num_nodes, hidden) node embeddings after the message-passing layers."""
+        params = self.params
+        num_nodes = len(graph.node_features)
+        plan = _aggregation_plan(graph)
+        h = np.maximum(graph.node_features @ params["w_in"] + params["b_in"], 0.0)
+        for layer in range(self.num_layers):
+            # Row `node * num_edge_types + type`: the message of the node along edges of that type
+            messages = (h @ params[f"w_msg_{layer}"]).reshape(num_nodes * _NUM_EDGE_TYPES, self.hidden)
+            aggregated = h @ params[f"w_self_{layer}"] + params[f"b_{layer}"]
+            for nodes, rows, weights in plan:
+                if nodes is None:
+                    aggregated += messages[rows] * weights
+                else:
+                    aggregated[nodes] += messages[rows] * weights
+            h = h + np.maximum(aggregated, 0.0)
+        return h
+
+    def forward(self, graph: GraphState) -> np.ndarray:
+        """
+        (num_graphs, num_agents, num_actions) logits of a graph of one or more envs with the same number of
+        locations and agents.
+        """
+        h = self.embed(graph)
+        params = self.params
+        num_graphs = int(graph.graph_index[-1]) + 1
+        num_agents = len(graph.agent_nodes) // num_graphs
+        nodes_per_graph = len(h) // num_graphs
+        num_locations = nodes_per_graph - num_agents
+        if num_graphs * nodes_per_graph != len(h) or num_graphs * num_agents != len(graph.agent_nodes):
+            raise ValueError("all graphs of a batch should have the same number of locations and agents")
+
+        per_graph = h.reshape(num_graphs, nodes_per_graph, self.hidden)
+        agents = per_graph[:, num_locations:]
+        queries = agents @ params["w_query"]
+        keys = per_graph[:, :num_locations] @ params["w_key"]
+        logits = np.empty((num_graphs, num_agents, 1 + num_locations), dtype=np.float32)
+        np.matmul(queries, keys.transpose(0, 2, 1), out=logits[:, :, 1:])
+        logits[:, :, 1:] /= np.sqrt(self.key_size)
+        logits[:, :, 0] = (agents @ params["w_noop"])[..., 0] + params["b_noop"]
+        return logits
+
+    def sample(self, logits: np.ndarray, masks: np.ndarray) -> np.ndarray:
+        """Actions among those allowed by `masks`, the argmax if `deterministic`, NOOP if none is allowed."""
+        masks = np.asarray(masks, dtype=bool)
+        scores = logits if self.deterministic else logits - np.log(-np.log(self.rng.random(logits.shape)))
+        scores = np.where(masks, scores, -np.inf)
+        actions = scores.argmax(axis=-1)
+        actions[~masks.any(axis=-1)] = 0
+        return actions
+
+    def act_batch(self, batch: Sequence[Any], masks: np.ndarray | None = None) -> np.ndarray:
+        envs = [getattr(env, "unwrapped", env) for env in batch]
+        start = time.perf_counter()
+        graph = self.builder.build_batch(envs)
+        built = time.perf_counter()
+        if masks is None:
+            masks = np.stack([build_action_masks(env) for env in envs])
+        masked = time.perf_counter()
+        logits = self.forward(graph)
+        actions = self.sample(logits, masks)
+        done = time.perf_counter()
+
+        self.num_calls += 1
+        self.num_envs += len(envs)
+        self.graph_time_s += built - start
+        self.mask_time_s += masked - built
+        self.forward_time_s += done - masked
+        return actions
+
+    def act(self, env: Any, masks: np.ndarray | None = None) -> np.ndarray:
+        return self.act_batch([env], masks=None if masks is None else np.asarray(masks)[None])[0]
+
+    def act_arrays(
+        self, node_features: np.ndarray, edge_index: np.ndarray, edge_types: np.ndarray, masks: np.ndarray
+    ) -> np.ndarray:
+        """
+        (num_envs, num_agents) actions of envs of the same layout from the graph of every env on its own, with
+        a leading env axis: `node_features` (num_envs, num_nodes, num_features), `edge_index` (num_envs, 2,
+        num_edges), `edge_types` (num_envs, num_edges) and `masks` (num_envs, num_agents, num_actions).
+        """
+        start = time.perf_counter()
+        graph = _union(node_features, edge_index, edge_types, masks.shape[1])
+        built = time.perf_counter()
+        actions = self.sample(self.forward(graph), masks)
+        done = time.perf_counter()
+
+        self.num_calls += 1
+        self.num_envs += len(masks)
+        self.graph_time_s += built - start
+        self.forward_time_s += done - built
+        return actions
+
+
+class GNNInferencePolicy:
+    """
+    Client of an `InferenceServer(policy.act_arrays)` serving a `GNNPolicy`: builds the graph and action masks
+    of its env, sends them to the server and blocks until the actions come back. One instance can be shared by
+    all worker threads, every thread builds its graphs with its own `GraphBuilder`.
+    """
+
+    uses_env = True
+
+    def __init__(self, server: InferenceServer) -> None:
+        self.server = server
+        self._local = threading.local()
+
+    def reset(self, env: Any = None) -> None:
         return None
 
-    def act(self, obs: Any) -> Any:
-        raise NotImplementedError("GNN policy not implemented yet.")
+    def _builder(self) -> GraphBuilder:
+        builder = getattr(self._local, "builder", None)
+        if builder is None:
+            builder = self._local.builder = GraphBuilder()
+        return builder
+
+    def act_batch(self, batch: Sequence[Any], masks: np.ndarray | None = None) -> np.ndarray:
+        envs = [getattr(env, "unwrapped", env) for env in batch]
+        builder = self._builder()
+        features, edges, edge_types = [], [], []
+        for env in envs:
+            # The arrays of a graph are overwritten by the next build, copy them
+            graph = builder.build(env)
+            features.append(graph.node_features.copy())
+            edges.append(graph.edge_index.copy())
+            edge_types.append(graph.edge_types)
+        if masks is None:
+            masks = np.stack([build_action_masks(env) for env in envs])
+        inputs = (np.stack(features), np.stack(edges), np.stack(edge_types), np.asarray(masks, dtype=bool))
+        return self.server.submit(*inputs).result()
+
+    def act(self, env: Any, masks: np.ndarray | None = None) -> np.ndarray:
+        return self.act_batch([env], masks=None if masks is None else np.asarray(masks)[None])[0]
@@ -2,16 +2,21 @@
 
 from __future__ import annotations
 
-from collections import OrderedDict
+import copy
+from collections import Counter, OrderedDict
 from enum import Enum
 from typing import Dict, List, Tuple
 
 import numpy as np
 
 from tarware.heuristic import Mission, MissionType
+from tarware.travel_time import TravelTimeEstimator
 from tarware.utils.utils import flatten_list, split_list
 from tarware.warehouse import Agent, AgentType
 
+from .active_cap import ActiveCapController
+from .assignment import linear_sum_assignment, manhattan_cost_matrix, pairwise_cost_matrix
+
 
 def _manhattan(a_yx: Tuple[int, int], b_yx: Tuple[int, int]) -> int:
     return abs(a_yx[0] - b_yx[0]) + abs(a_yx[1] - b_yx[1])
@@ -20,6 +25,15 @@ def _manhattan(a_yx: Tuple[int, int], b_yx: Tuple[int, int]) -> int:
 class DistanceMode(str, Enum):
     MANHATTAN = "manhattan"
     FIND_PATH = "find_path"
+    # Steps including turns, from the agent's current direction (see `TravelTimeEstimator`)
+    TRAVEL_TIME = "travel_time"
+
+
+class AssignmentStrategy(str, Enum):
+    # One request at a time to the closest AGV, pickers to the first mission in their zone
+    GREEDY = "greedy"
+    # Minimum-cost matching of AGVs to requests and of idle pickers to missions
+    OPTIMAL = "optimal"
 
 
 class GraphGreedyPolicy:
@@ -30,6 +44,19 @@ class GraphGreedyPolicy:
       - Assign AGVs to request_queue items greedily by distance.
       - Send pickers to the same mission locations (same as heuristic).
       - Keep mission state across steps (step-wise policy).
+
+    With `assignment=AssignmentStrategy.OPTIMAL`, the oldest pending requests (as many as there are free
+    AGVs and active slots) are matched to the free AGVs by solving the AGV x request distance matrix, and
+    idle pickers are matched to the AGV missions without a picker by their meeting time, i.e. the larger of
+    the picker's and the AGV's distance to the location, regardless of picker zones.
+
+    The number of AGVs on a mission is capped at `max_active_agvs`, by default `active_alpha * num_pickers`.
+    With a `cap_controller`, this is only the initial cap, which the controller then adjusts during the episode
+    from the live clash, stuck, picker idle time and delivery counters.
+
+    `act_batch(envs)` drives a batch of envs with one clone of the policy per env, since the missions are
+    per-env state. `reset_batch` resets the clones at the start of an episode; envs are matched to their clone
+    by identity, so a batch can be any subset of them, e.g. the envs still running.
     """
 
     uses_env = True
@@ -39,10 +66,16 @@ class GraphGreedyPolicy:
         distance_mode: DistanceMode = DistanceMode.MANHATTAN,
         active_alpha: int = 3,
         max_active_agvs: int | None = None,
+        assignment: AssignmentStrategy = AssignmentStrategy.GREEDY,
+        cap_controller: ActiveCapController | None = None,
     ) -> None:
         self.distance_mode = distance_mode
+        self.assignment = AssignmentStrategy(assignment)
         self.active_alpha = active_alpha
         self.max_active_agvs = max_active_agvs
+        self.cap_controller = cap_controller
+        # Cap in effect for the current step, `max_active_agvs` unless a controller adjusts it
+        self.active_cap = 0
         self._initialized = False
         self._timestep = 0
         self._agents: List[Agent] = []
@@ -55,6 +88,22 @@ class GraphGreedyPolicy:
         self._assigned_agvs: "OrderedDict[Agent, Mission]" = OrderedDict()
         self._assigned_pickers: "OrderedDict[Agent, Mission]" = OrderedDict()
         self._assigned_items: "OrderedDict[int, Agent]" = OrderedDict()
+        # Indexes kept in sync with the missions: item of each AGV, AGVs without a mission and a multiset of
+        # the locations targeted by AGV missions
+        self._item_of_agv: Dict[Agent, int] = {}
+        self._unassigned_agvs: set = set()
+        self._reserved_locations: Counter = Counter()
+        # Per-cell lookups: location id (-1 if none) and index of the responsible picker (-1 if none)
+        self._loc_id_grid = np.zeros((0, 0), dtype=int)
+        self._picker_zone_grid = np.zeros((0, 0), dtype=int)
+        self._location_yx = np.zeros((0, 2), dtype=int)
+        self._goal_yx: List[Tuple[int, int]] = []
+        self._goal_loc_ids: List[int | None] = []
+        self._travel_times: TravelTimeEstimator | None = None
+        self._batch_policies: Dict[int, "GraphGreedyPolicy"] = {}
+        # Set when the last `act` released agents from their missions; they are only re-dispatched on the
+        # next call, so decision-point runners should not skip past it.
+        self.redispatch = False
 
     def reset(self, env) -> None:
         self._timestep = 0
@@ -71,18 +120,43 @@ class GraphGreedyPolicy:
                 non_goal_ids.append(loc_id)
         self._non_goal_location_ids = np.array(non_goal_ids, dtype=int)
 
+        self._loc_id_grid = np.full(env.grid_size, -1, dtype=int)
+        self._location_yx = np.zeros((max(self._location_map) + 1, 2), dtype=int)
+        for loc_id, (y, x) in self._location_map.items():
+            self._loc_id_grid[y, x] = loc_id
+            self._location_yx[loc_id] = (y, x)
+
         sections = env.rack_groups
         picker_sections = split_list(sections, max(1, len(self._pickers)))
         picker_sections = [flatten_list(l) for l in picker_sections]
         self._picker_sections = picker_sections
+        # A location belongs to the first section containing it
+        self._picker_zone_grid = np.full(env.grid_size, -1, dtype=int)
+        for index, section in reversed(list(enumerate(picker_sections[:len(self._pickers)]))):
+            for (y, x) in section:
+                self._picker_zone_grid[y, x] = index
+
+        self._goal_yx = [(y, x) for (x, y) in env.goals]
+        if self.distance_mode == DistanceMode.TRAVEL_TIME and (
+            self._travel_times is None or self._travel_times.grid_size != tuple(env.grid_size)
+        ):
+            # The fields only depend on the layout, so they are kept across episodes
+            self._travel_times = TravelTimeEstimator(env)
+        self._goal_loc_ids = [self._goal_loc_id(goal_yx) for goal_yx in self._goal_yx]
 
         self._assigned_agvs = OrderedDict()
         self._assigned_pickers = OrderedDict()
         self._assigned_items = OrderedDict()
+        self._item_of_agv = {}
+        self._unassigned_agvs = set(self._agvs)
+        self._reserved_locations = Counter()
 
         if self.max_active_agvs is None:
             default_limit = max(1, self.active_alpha * max(1, len(self._pickers)))
             self.max_active_agvs = min(len(self._agvs), default_limit)
+        self.active_cap = self.max_active_agvs
+        if self.cap_controller is not None:
+            self.active_cap = self.cap_controller.reset(env, self.max_active_agvs)
 
         self._initialized = True
 
@@ -99,127 +173,225 @@ class GraphGreedyPolicy:
         if self.distance_mode == DistanceMode.FIND_PATH:
             path = env.find_path(start_yx, goal_yx, agent, care_for_agents=False)
             return len(path)
+        if self.distance_mode == DistanceMode.TRAVEL_TIME:
+            return int(self._travel_times.time_field(goal_yx, agent.type)[agent.dir.value, start_yx[0], start_yx[1]])
         return _manhattan(start_yx, goal_yx)
 
-    def act(self, env) -> List[int]:
-        if not self._initialized:
-            self.reset(env)
-
-        request_queue = list(env.request_queue)
-        actions: Dict[Agent, int] = {a: 0 for a in self._agents}
-
-        active_count = sum(
-            1
-            for a in self._agvs
-            if (a in self._assigned_agvs) or a.busy or a.carrying_shelf
-        )
-
-        for item in request_queue:
-            item_id = int(item.id)
-            if item_id in self._assigned_items:
+    def _cost_matrix(self, env, agents: List[Agent], targets_yx) -> np.ndarray:
+        # (num_agents, num_targets) distances from the agents' current locations
+        if self.distance_mode == DistanceMode.TRAVEL_TIME:
+            return np.stack([self._travel_times.travel_times(agents, yx) for yx in targets_yx], axis=1)
+        if self.distance_mode == DistanceMode.FIND_PATH:
+            return pairwise_cost_matrix(
+                agents, targets_yx, lambda agent, yx: self._dist(env, (agent.y, agent.x), tuple(yx), agent)
+            )
+        return manhattan_cost_matrix([(a.y, a.x) for a in agents], targets_yx)
+
+    def _set_agv_location(self, mission: Mission, loc_id: int, yx: Tuple[int, int]) -> None:
+        self._reserved_locations[mission.location_id] -= 1
+        self._reserved_locations[loc_id] += 1
+        mission.location_id = loc_id
+        mission.location_y = int(yx[0])
+        mission.location_x = int(yx[1])
+        mission.at_location = False
+
+    def _closest_empty_location(self, env, agv: Agent) -> Tuple[int, Tuple[int, int]] | None:
+        empty_shelves = env.get_empty_shelf_information()
+        empty_location_ids = self._non_goal_location_ids[empty_shelves > 0]
+        reserved = [loc for loc, count in self._reserved_locations.items() if count > 0]
+        empty_location_ids = empty_location_ids[~np.isin(empty_location_ids, reserved)]
+        if not len(empty_location_ids):
+            return None
+
+        empty_yx = self._location_yx[empty_location_ids]
+        dists = self._cost_matrix(env, [agv], empty_yx)[0]
+        idx = int(np.argmin(dists))
+        return int(empty_location_ids[idx]), tuple(empty_yx[idx])
+
+    def _assign_requests_greedy(self, env, active_count: int) -> None:
+        # Built on the first unassigned item, then AGVs are taken out of it as they get missions
+        available_agvs = None
+        for item in env.request_queue:
+            if int(item.id) in self._assigned_items:
                 continue
 
-            if active_count >= (self.max_active_agvs or 0):
+            if active_count >= self.active_cap:
                 break
 
-            available_agvs = [
-                a
-                for a in self._agvs
-                if (not a.busy) and (not a.carrying_shelf) and (a not in self._assigned_agvs)
-            ]
+            if available_agvs is None:
+                available_agvs = [
+                    a
+                    for a in self._agvs
+                    if (a in self._unassigned_agvs) and (not a.busy) and (not a.carrying_shelf)
+                ]
             if not available_agvs:
-                continue
+                break
 
             item_yx = (int(item.y), int(item.x))
+            loc_id = int(self._loc_id_grid[item_yx])
+            if loc_id < 0:
+                continue
+
             dists = [self._dist(env, (a.y, a.x), item_yx, a) for a in available_agvs]
-            chosen_agv = available_agvs[int(np.argmin(dists))]
+            chosen_agv = available_agvs.pop(int(np.argmin(dists)))
+            self._new_agv_mission(chosen_agv, item, loc_id)
+            active_count += 1
+
+    def _new_agv_mission(self, agv: Agent, item, loc_id: int) -> None:
+        item_id = int(item.id)
+        self._assigned_items[item_id] = agv
+        self._item_of_agv[agv] = item_id
+        self._unassigned_agvs.discard(agv)
+        self._reserved_locations[loc_id] += 1
+        self._assigned_agvs[agv] = Mission(
+            MissionType.PICKING,
+            loc_id,
+            int(item.x),
+            int(item.y),
+            self._timestep,
+        )
 
-            loc_id = self._coords_to_loc_id.get(item_yx)
-            if loc_id is None:
+    def _assign_requests_optimal(self, env, active_count: int) -> None:
+        slots = self.active_cap - active_count
+        if slots <= 0:
+            return
+        available_agvs = [
+            a for a in self._agvs if (a in self._unassigned_agvs) and (not a.busy) and (not a.carrying_shelf)
+        ]
+        if not available_agvs:
+            return
+
+        # Oldest requests first, as many as can be served now
+        pending = []
+        for item in env.request_queue:
+            if int(item.id) in self._assigned_items:
                 continue
+            loc_id = int(self._loc_id_grid[item.y, item.x])
+            if loc_id < 0:
+                continue
+            pending.append((item, loc_id))
+            if len(pending) == min(slots, len(available_agvs)):
+                break
+        if not pending:
+            return
 
-            self._assigned_items[item_id] = chosen_agv
-            self._assigned_agvs[chosen_agv] = Mission(
+        cost = self._cost_matrix(env, available_agvs, [(int(item.y), int(item.x)) for item, _ in pending])
+        agv_indices, item_indices = linear_sum_assignment(cost)
+        # Missions are created in request order, which is also the order pickers serve them in
+        for agv_index, item_index in sorted(zip(agv_indices, item_indices), key=lambda pair: pair[1]):
+            item, loc_id = pending[item_index]
+            self._new_agv_mission(available_agvs[agv_index], item, loc_id)
+
+    def _assign_pickers_greedy(self) -> None:
+        for agv, mission in self._assigned_agvs.items():
+            if mission.mission_type not in (MissionType.PICKING, MissionType.RETURNING):
+                continue
+            picker_index = self._picker_zone_grid[mission.location_y, mission.location_x]
+            if picker_index < 0:
+                continue
+            picker = self._pickers[picker_index]
+            if picker not in self._assigned_pickers:
+                self._assigned_pickers[picker] = Mission(
+                    MissionType.PICKING,
+                    mission.location_id,
+                    mission.location_x,
+                    mission.location_y,
+                    self._timestep,
+                )
+
+    def _assign_pickers_optimal(self, env) -> None:
+        idle_pickers = [p for p in self._pickers if p not in self._assigned_pickers]
+        served_locations = {m.location_id for m in self._assigned_pickers.values()}
+        missions = [
+            (agv, mission)
+            for agv, mission in self._assigned_agvs.items()
+            if mission.mission_type in (MissionType.PICKING, MissionType.RETURNING)
+            and mission.location_id not in served_locations
+        ]
+        if not idle_pickers or not missions:
+            return
+
+        mission_yx = [(m.location_y, m.location_x) for _, m in missions]
+        picker_cost = self._cost_matrix(env, idle_pickers, mission_yx)
+        if self.distance_mode == DistanceMode.TRAVEL_TIME:
+            agv_cost = np.array(
+                [self._dist(env, (agv.y, agv.x), yx, agv) for (agv, _), yx in zip(missions, mission_yx)]
+            )
+        else:
+            agv_cost = np.array([_manhattan((agv.y, agv.x), yx) for (agv, _), yx in zip(missions, mission_yx)])
+        # Both agents have to be at the location for the pick, so the meeting time is the larger distance
+        cost = np.maximum(picker_cost, agv_cost[None, :])
+        picker_indices, mission_indices = linear_sum_assignment(cost)
+        for picker_index, mission_index in sorted(zip(picker_indices, mission_indices), key=lambda pair: pair[1]):
+            mission = missions[mission_index][1]
+            self._assigned_pickers[idle_pickers[picker_index]] = Mission(
                 MissionType.PICKING,
-                int(loc_id),
-                int(item.x),
-                int(item.y),
+                mission.location_id,
+                mission.location_x,
+                mission.location_y,
                 self._timestep,
             )
-            active_count += 1
+
+    def act(self, env) -> List[int]:
+        if not self._initialized:
+            self.reset(env)
+
+        actions: Dict[Agent, int] = {a: 0 for a in self._agents}
+        self.redispatch = False
+        if self.cap_controller is not None:
+            self.active_cap = self.cap_controller.update(env)
+
+        active_count = len(self._assigned_agvs) + sum(
+            1 for a in self._unassigned_agvs if a.busy or a.carrying_shelf
+        )
+
+        if self.assignment == AssignmentStrategy.OPTIMAL:
+            self._assign_requests_optimal(env, active_count)
+        else:
+            self._assign_requests_greedy(env, active_count)
 
         for agv in list(self._assigned_agvs.keys()):
             mission = self._assigned_agvs[agv]
 
             if (agv.x == mission.location_x) and (agv.y == mission.location_y):
                 mission.at_location = True
+            if not mission.at_location:
+                continue
 
-            if mission.mission_type == MissionType.PICKING and mission.at_location and agv.carrying_shelf:
-                goal_locations = list(env.goals)
-                goal_yx_list = [(y, x) for (x, y) in goal_locations]
-                dists = [self._dist(env, (agv.y, agv.x), goal_yx, agv) for goal_yx in goal_yx_list]
-                closest_goal_yx = goal_yx_list[int(np.argmin(dists))]
-                closest_goal_loc_id = self._goal_loc_id(closest_goal_yx)
+            if mission.mission_type == MissionType.PICKING and agv.carrying_shelf:
+                dists = [self._dist(env, (agv.y, agv.x), goal_yx, agv) for goal_yx in self._goal_yx]
+                goal_index = int(np.argmin(dists))
+                closest_goal_loc_id = self._goal_loc_ids[goal_index]
                 if closest_goal_loc_id is None:
                     continue
                 mission.mission_type = MissionType.DELIVERING
-                mission.location_id = int(closest_goal_loc_id)
-                mission.location_y = int(closest_goal_yx[0])
-                mission.location_x = int(closest_goal_yx[1])
-                mission.at_location = False
+                self._set_agv_location(mission, int(closest_goal_loc_id), self._goal_yx[goal_index])
 
             if mission.mission_type == MissionType.DELIVERING and mission.at_location and agv.carrying_shelf:
-                empty_shelves = env.get_empty_shelf_information()
-                empty_location_ids = list(self._non_goal_location_ids[empty_shelves > 0])
-
-                assigned_item_loc_ids = [m.location_id for m in self._assigned_agvs.values()]
-                empty_location_ids = [loc for loc in empty_location_ids if loc not in assigned_item_loc_ids]
-                if not empty_location_ids:
+                closest_empty = self._closest_empty_location(env, agv)
+                if closest_empty is None:
                     continue
-
-                empty_yx = [self._location_map[int(loc)] for loc in empty_location_ids]
-                dists = [self._dist(env, (agv.y, agv.x), (y, x), agv) for (y, x) in empty_yx]
-                idx = int(np.argmin(dists))
-                chosen_loc_id = int(empty_location_ids[idx])
-                chosen_yx = empty_yx[idx]
-
                 mission.mission_type = MissionType.RETURNING
-                mission.location_id = chosen_loc_id
-                mission.location_y = int(chosen_yx[0])
-                mission.location_x = int(chosen_yx[1])
-                mission.at_location = False
+                self._set_agv_location(mission, *closest_empty)
 
             if mission.mission_type == MissionType.RETURNING and mission.at_location and (not agv.carrying_shelf):
                 self._assigned_agvs.pop(agv, None)
-                for item_id, assigned_agv in list(self._assigned_items.items()):
-                    if assigned_agv == agv:
-                        self._assigned_items.pop(item_id, None)
-
-        for agv, mission in list(self._assigned_agvs.items()):
-            if mission.mission_type not in (MissionType.PICKING, MissionType.RETURNING):
-                continue
-            if not self._pickers:
-                break
-
-            mission_yx = (mission.location_y, mission.location_x)
-            in_zone = [(mission_yx[0], mission_yx[1]) in section for section in self._picker_sections]
-            if True not in in_zone:
-                continue
-            picker = self._pickers[in_zone.index(True)]
-            if picker not in self._assigned_pickers:
-                self._assigned_pickers[picker] = Mission(
-                    MissionType.PICKING,
-                    mission.location_id,
-                    mission.location_x,
-                    mission.location_y,
-                    self._timestep,
-                )
-
-        for picker in list(self._pickers):
-            if picker in self._assigned_pickers:
-                pm = self._assigned_pickers[picker]
-                if (picker.x == pm.location_x) and (picker.y == pm.location_y):
-                    self._assigned_pickers.pop(picker, None)
+                self._reserved_locations[mission.location_id] -= 1
+                self._assigned_items.pop(self._item_of_agv.pop(agv), None)
+                self._unassigned_agvs.add(agv)
+                self.redispatch = True
+
+        if self._pickers and len(self._assigned_pickers) < len(self._pickers):
+            if self.assignment == AssignmentStrategy.OPTIMAL:
+                self._assign_pickers_optimal(env)
+            else:
+                self._assign_pickers_greedy()
+
+        for picker in self._pickers:
+            pm = self._assigned_pickers.get(picker)
+            if pm is not None and (picker.x == pm.location_x) and (picker.y == pm.location_y):
+                self._assigned_pickers.pop(picker, None)
+                self.redispatch = True
 
         for agv, mission in self._assigned_agvs.items():
             actions[agv] = int(mission.location_id) if not agv.busy else 0
@@ -228,3 +400,31 @@ class GraphGreedyPolicy:
 
         self._timestep += 1
         return [int(actions[a]) for a in self._agents]
+
+    def _clone(self) -> "GraphGreedyPolicy":
+        return GraphGreedyPolicy(
+            distance_mode=self.distance_mode,
+            active_alpha=self.active_alpha,
+            max_active_agvs=self.max_active_agvs,
+            assignment=self.assignment,
+            cap_controller=copy.deepcopy(self.cap_controller),
+        )
+
+    def _batch_policy(self, env) -> "GraphGreedyPolicy":
+        policy = self._batch_policies.get(id(env))
+        if policy is None:
+            policy = self._clone()
+            # Clones share the travel-time fields of a layout
+            policy._travel_times = self._travel_times
+            policy.reset(env)
+            self._travel_times = policy._travel_times
+            self._batch_policies[id(env)] = policy
+        return policy
+
+    def reset_batch(self, envs) -> None:
+        self._batch_policies = {}
+        for env in envs:
+            self._batch_policy(env)
+
+    def act_batch(self, envs, masks: np.ndarray | None = None) -> np.ndarray:
+        return np.array([self._batch_policy(env).act(env) for env in envs], dtype=np.int64)
@@ -2,40 +2,30 @@
 
 from __future__ import annotations
 
-import time
-from typing import Any, Dict
+from typing import Any, List
 
-from tarware.heuristic import heuristic_episode
-from tarware_ext.runners.metrics import summarize_episode
+from tarware.heuristic import StepwiseHeuristic
 
 
 class HeuristicPolicy:
-    def __init__(self, env: Any) -> None:
+    """
+    Step-wise wrapper around the baseline heuristic of `tarware/heuristic.py`. The mission state lives in a
+    `StepwiseHeuristic`, so episodes are driven by the runner like any other step-wise policy and produce the
+    same actions as `heuristic_episode` for the same seed.
+    """
+
+    uses_env = True
+
+    def __init__(self, env: Any = None) -> None:
         self.env = env
+        self._heuristic = StepwiseHeuristic()
+
+    @property
+    def redispatch(self) -> bool:
+        return self._heuristic.redispatch
+
+    def reset(self, env) -> None:
+        self._heuristic.reset(env)
 
-    def reset(self) -> None:
-        return None
-
-    def act(self, obs: Any) -> Any:
-        raise NotImplementedError("HeuristicPolicy uses run_episode in episodic mode.")
-
-    def run_episode(
-        self,
-        env: Any,
-        seed: int | None = None,
-        render: bool = False,
-        max_steps: int | None = None,
-    ) -> Dict[str, Any]:
-        _ = max_steps
-        start = time.time()
-        infos, global_episode_return, episode_returns = heuristic_episode(
-            env.unwrapped, render=render, seed=seed
-        )
-        metrics = summarize_episode(
-            infos=infos,
-            global_episode_return=float(global_episode_return),
-            episode_returns=episode_returns,
-        )
-        duration_s = max(time.time() - start, 1e-9)
-        metrics["fps"] = float(metrics["episode_length"] / duration_s) if metrics["episode_length"] else 0.0
-        return metrics
+    def act(self, env) -> List[int]:
+        return self._heuristic.act(env)
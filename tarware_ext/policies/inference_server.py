@@ -0,0 +1,209 @@
+"""Batched inference for learned policies shared by many rollout workers."""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+
+class _Request:
+    __slots__ = ("inputs", "size", "future")
+
+    def __init__(self, inputs: Tuple[np.ndarray, ...], future: Future) -> None:
+        self.inputs = inputs
+        self.size = len(inputs[0])
+        self.future = future
+
+    @property
+    def signature(self) -> Tuple:
+        # Requests can only share a forward pass if their inputs stack
+        return tuple((x.shape[1:], x.dtype.str) for x in self.inputs)
+
+
+class InferenceServer:
+    """
+    Runs the forward pass of a policy on a background thread for many rollout workers at once.
+
+    Workers `submit` the inputs of one or more envs, e.g. observations and action masks with a leading env
+    axis, and get a `Future` of the actions. The server waits for the first request, then keeps collecting
+    requests until `max_batch_size` envs are queued or `max_wait_s` has passed, concatenates the inputs of
+    requests with the same shapes, calls `forward(*inputs)` once per shape and scatters the rows of the
+    result back to the futures. If `forward` raises, the exception is set on the futures of that batch.
+    Requests the server does not serve, as it was closed or `forward` stopped it, fail with a RuntimeError.
+
+    `forward` should release the GIL for most of its work (numpy matrix products do) for the workers to keep
+    stepping their envs meanwhile.
+    """
+
+    def __init__(
+        self,
+        forward: Callable[..., np.ndarray],
+        max_batch_size: int = 64,
+        max_wait_s: float = 0.002,
+    ) -> None:
+        if max_batch_size < 1:
+            raise ValueError(f"max_batch_size is {max_batch_size}, should be at least 1")
+        self.forward = forward
+        self.max_batch_size = max_batch_size
+        self.max_wait_s = max_wait_s
+        self._requests: "queue.Queue[_Request | None]" = queue.Queue()
+        self._thread: threading.Thread | None = None
+        # Set by `close` under the lock, so that no request is queued after the stop sentinel
+        self._lock = threading.Lock()
+        self._closing = False
+        self.num_batches = 0
+        self.num_requests = 0
+        self.num_envs = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def mean_batch_size(self) -> float:
+        """Mean number of envs per forward pass."""
+        return self.num_envs / self.num_batches if self.num_batches else 0.0
+
+    def start(self) -> "InferenceServer":
+        with self._lock:
+            if not self.running:
+                self._closing = False
+                self._thread = threading.Thread(target=self._serve, name="inference-server", daemon=True)
+                self._thread.start()
+        return self
+
+    def close(self) -> None:
+        """Stops the server; the requests it did not serve fail with a RuntimeError."""
+        with self._lock:
+            self._closing = True
+            thread = self._thread
+            if thread is not None and thread.is_alive():
+                self._requests.put(None)
+        if thread is not None:
+            thread.join()
+        self._thread = None
+        self._fail_pending()
+
+    def _fail_pending(self) -> None:
+        # Requests left in the queue when the server stopped, or died in `forward`
+        while True:
+            try:
+                request = self._requests.get_nowait()
+            except queue.Empty:
+                return
+            if request is not None and not request.future.done():
+                request.future.set_exception(RuntimeError("InferenceServer closed"))
+
+    def __enter__(self) -> "InferenceServer":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def submit(self, *inputs: Any) -> Future:
+        """Queues inputs with a leading env axis; the future resolves to the rows of `forward` for them."""
+        inputs = tuple(np.asarray(x) for x in inputs)
+        if not inputs or any(x.ndim == 0 or len(x) != len(inputs[0]) for x in inputs):
+            raise ValueError("inputs should be arrays with the same leading (env) dimension")
+        future: Future = Future()
+        with self._lock:
+            if self._closing or not self.running:
+                raise RuntimeError("InferenceServer is not running, call start() or use it as a context manager")
+            self._requests.put(_Request(inputs, future))
+        return future
+
+    def _collect(self, first: _Request) -> Tuple[List[_Request], bool]:
+        batch = [first]
+        size = first.size
+        deadline = time.monotonic() + self.max_wait_s
+        while size < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                request = self._requests.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if request is None:
+                return batch, True
+            batch.append(request)
+            size += request.size
+        return batch, False
+
+    def _run(self, batch: Sequence[_Request]) -> None:
+        groups: Dict[Tuple, List[_Request]] = defaultdict(list)
+        for request in batch:
+            groups[request.signature].append(request)
+
+        for requests in groups.values():
+            try:
+                if len(requests) == 1:
+                    inputs = requests[0].inputs
+                else:
+                    inputs = tuple(np.concatenate(arrays) for arrays in zip(*(r.inputs for r in requests)))
+                outputs = np.asarray(self.forward(*inputs))
+            except Exception as error:
+                for request in requests:
+                    request.future.set_exception(error)
+                continue
+
+            self.num_batches += 1
+            self.num_requests += len(requests)
+            offset = 0
+            for request in requests:
+                request.future.set_result(outputs[offset:offset + request.size])
+                offset += request.size
+            self.num_envs += offset
+
+    def _serve(self) -> None:
+        batch: List[_Request] = []
+        try:
+            while True:
+                request = self._requests.get()
+                if request is None:
+                    return
+                batch, stop = self._collect(request)
+                self._run(batch)
+                if stop:
+                    return
+        finally:
+            # Also reached if `forward` raises something that is not an Exception and stops the thread
+            with self._lock:
+                self._closing = True
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_exception(RuntimeError("InferenceServer closed"))
+            self._fail_pending()
+
+
+class InferencePolicy:
+    """
+    Client side of an `InferenceServer`: sends the observations (and action masks) of each step to the server
+    and blocks until the actions come back. One instance can be shared by all worker threads. Observations
+    are stacked per env into a (num_agents, obs_length) array, so they should have the same length for all
+    agents, e.g. the "global" observations.
+    """
+
+    def __init__(self, server: InferenceServer, uses_masks: bool = True) -> None:
+        self.server = server
+        self.uses_masks = uses_masks
+
+    def reset(self) -> None:
+        return None
+
+    def _inputs(self, obs: np.ndarray, masks: np.ndarray | None) -> Tuple[np.ndarray, ...]:
+        return (obs,) if masks is None else (obs, np.asarray(masks))
+
+    def act(self, obs: Any, masks: np.ndarray | None = None) -> np.ndarray:
+        obs = np.stack([np.asarray(o) for o in obs])[None]
+        masks = None if masks is None else np.asarray(masks)[None]
+        return self.server.submit(*self._inputs(obs, masks)).result()[0]
+
+    def act_batch(self, batch: Any, masks: np.ndarray | None = None) -> np.ndarray:
+        return self.server.submit(*self._inputs(np.asarray(batch), masks)).result()
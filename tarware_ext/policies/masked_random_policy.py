@@ -0,0 +1,39 @@
+"""Random policy over the valid actions."""
+
+from __future__ import annotations
+
+from typing import Any
+
+import numpy as np
+
+
+class MaskedRandomPolicy:
+    """
+    Samples every agent's action uniformly among the actions its mask allows (NOOP if none), for any number of
+    envs at once: each valid action gets a uniform random key and the largest key wins, so a whole
+    (num_envs, num_agents, num_actions) mask stack is sampled in one vectorised pass.
+    """
+
+    uses_masks = True
+
+    def __init__(self, seed: int | None = None) -> None:
+        self.rng = np.random.default_rng(seed)
+
+    def reset(self) -> None:
+        return None
+
+    def sample(self, masks: np.ndarray) -> np.ndarray:
+        masks = np.asarray(masks, dtype=bool)
+        keys = self.rng.random(masks.shape)
+        keys[~masks] = -1.0
+        actions = keys.argmax(axis=-1)
+        actions[~masks.any(axis=-1)] = 0
+        return actions
+
+    def act(self, obs: Any, masks: np.ndarray | None = None) -> np.ndarray:
+        if masks is None:
+            raise ValueError("MaskedRandomPolicy needs the action masks of the env")
+        return self.sample(masks)
+
+    def act_batch(self, batch: Any, masks: np.ndarray | None = None) -> np.ndarray:
+        return self.act(batch, masks=masks)
@@ -4,13 +4,20 @@ from __future__ import annotations
 
 from typing import Any
 
+import numpy as np
+
 
 class RandomPolicy:
-    def __init__(self, env: Any) -> None:
+    def __init__(self, env: Any, seed: int | None = None) -> None:
         self.env = env
+        self.action_sizes = np.array([space.n for space in env.action_space], dtype=np.int64)
+        self.rng = np.random.default_rng(seed)
 
     def reset(self) -> None:
         return None
 
     def act(self, obs: Any) -> Any:
         return self.env.action_space.sample()
+
+    def act_batch(self, batch: Any, masks: np.ndarray | None = None) -> np.ndarray:
+        return self.rng.integers(0, self.action_sizes, size=(len(batch), len(self.action_sizes)))
@@ -1,6 +1,6 @@
 """Episode runners and evaluation utilities."""
 
 from .evaluate import evaluate
-from .rollout import run_episode
+from .rollout import run_episode, run_episode_batch
 
-__all__ = ["run_episode", "evaluate"]
+__all__ = ["run_episode", "run_episode_batch", "evaluate"]
@@ -5,21 +5,14 @@ from __future__ import annotations
 from typing import Any, Dict, Iterable
 
 
-def summarize_episode(
-    infos: Iterable[Dict[str, Any]],
+def summarize_counters(
+    total_deliveries: float,
+    total_clashes: float,
+    total_stuck: float,
+    episode_length: int,
     global_episode_return: float,
     episode_returns: Iterable[float],
 ) -> Dict[str, float | int | list]:
-    total_deliveries = 0.0
-    total_clashes = 0.0
-    total_stuck = 0.0
-    info_list = list(infos)
-    for info in info_list:
-        total_deliveries += float(info.get("shelf_deliveries", 0))
-        total_clashes += float(info.get("clashes", 0))
-        total_stuck += float(info.get("stucks", 0))
-
-    episode_length = len(info_list)
     pick_rate = 0.0
     if episode_length > 0:
         pick_rate = total_deliveries * 3600.0 / (5.0 * episode_length)
@@ -36,3 +29,46 @@ def summarize_episode(
         "stucks": total_stuck,
         "pick_rate": pick_rate,
     }
+
+
+def summarize_episode(
+    infos: Iterable[Dict[str, Any]],
+    global_episode_return: float,
+    episode_returns: Iterable[float],
+) -> Dict[str, float | int | list]:
+    total_deliveries = 0.0
+    total_clashes = 0.0
+    total_stuck = 0.0
+    episode_length = 0
+    for info in infos:
+        total_deliveries += float(info.get("shelf_deliveries", 0))
+        total_clashes += float(info.get("clashes", 0))
+        total_stuck += float(info.get("stucks", 0))
+        # Decision-point stepping reports several simulated steps per info
+        episode_length += int(info.get("elapsed_steps", 1))
+
+    return summarize_counters(
+        total_deliveries,
+        total_clashes,
+        total_stuck,
+        episode_length,
+        global_episode_return,
+        episode_returns,
+    )
+
+
+def summarize_kpis(
+    kpis: Any,
+    episode_length: int,
+    global_episode_return: float,
+    episode_returns: Iterable[float],
+) -> Dict[str, float | int | list]:
+    """Summarizes an episode from the env's in-place KPI accumulators instead of the per-step infos."""
+    return summarize_counters(
+        float(kpis.deliveries.sum()),
+        float(kpis.clashes.sum()),
+        float(kpis.stucks.sum()),
+        episode_length,
+        global_episode_return,
+        episode_returns,
+    )
@@ -3,12 +3,12 @@
 from __future__ import annotations
 
 import time
-from typing import Any, Dict, Sequence
+from typing import Any, Dict, List, Sequence, Tuple
 
 import numpy as np
 
-from tarware_ext.envs import Transition
-from .metrics import summarize_episode
+from tarware_ext.envs import ArrayTransition, Transition
+from .metrics import summarize_episode, summarize_kpis
 
 
 def _as_seq(x: Any) -> Sequence:
@@ -17,48 +17,83 @@ def _as_seq(x: Any) -> Sequence:
     return [x]
 
 
-def run_episode(env: Any, policy: Any, max_steps: int, render: bool = False, seed: int | None = None) -> Dict[str, Any]:
-    if hasattr(policy, "run_episode"):
-        return policy.run_episode(env, seed=seed, render=render, max_steps=max_steps)
+def _stack_observations(observations: Sequence[Any]) -> Any:
+    # (num_envs, num_agents, obs_length) if every agent of every env has an array observation of the same shape
+    try:
+        return np.stack([np.stack(obs) for obs in observations])
+    except (TypeError, ValueError):
+        return list(observations)
 
-    obs, _info = env.reset(seed=seed)
+
+def _normalize_step(step_out: Any) -> Tuple[Any, float, Sequence[float] | np.ndarray, bool, Dict[str, Any]]:
+    # (obs, reward_team, reward_by_agent, done_all, info) from an ArrayTransition, a Transition or a gym tuple
+    if isinstance(step_out, ArrayTransition):
+        # Fast adapter path: rewards are already a float64 array, valid until the next step
+        return step_out.obs, step_out.reward_team, step_out.reward_by_agent, step_out.done_all, step_out.info
+    if isinstance(step_out, Transition):
+        return step_out.obs, step_out.reward_team, step_out.reward_by_agent, step_out.done_all, step_out.info
+    obs, reward, terminated, truncated, info = step_out
+    reward_by_agent = [float(x) for x in _as_seq(reward)]
+    done_all = all(bool(x) for x in _as_seq(terminated)) or all(bool(x) for x in _as_seq(truncated))
+    return obs, float(np.sum(reward_by_agent)), reward_by_agent, done_all, info
+
+
+def _reset_policy(policy: Any, base_env: Any) -> None:
     if hasattr(policy, "reset"):
         try:
-            policy.reset(env.unwrapped if hasattr(env, "unwrapped") else env)
+            policy.reset(base_env)
         except TypeError:
             policy.reset()
 
+
+def _act(policy: Any, obs: Any, base_env: Any) -> Any:
+    if getattr(policy, "uses_env", False):
+        return policy.act(base_env)
+    if getattr(policy, "uses_masks", False):
+        return policy.act(obs, masks=base_env.compute_valid_action_masks())
+    return policy.act(obs)
+
+
+def _decision_skip(env: Any, policy: Any, remaining: int) -> int:
+    # The policy re-dispatches released agents on its next call; otherwise never simulate past the step budget
+    if getattr(policy, "redispatch", False):
+        return 1
+    max_skip = getattr(env, "max_skip", None)
+    return remaining if max_skip is None else min(max_skip, remaining)
+
+
+def run_episode(env: Any, policy: Any, max_steps: int, render: bool = False, seed: int | None = None) -> Dict[str, Any]:
+    if hasattr(policy, "run_episode"):
+        return policy.run_episode(env, seed=seed, render=render, max_steps=max_steps)
+
+    obs, _info = env.reset(seed=seed)
+    base_env = env.unwrapped if hasattr(env, "unwrapped") else env
+    _reset_policy(policy, base_env)
+
+    # Envs with in-place KPI accumulators don't need the per-step infos to be kept around
+    kpis = getattr(base_env, "kpis", None)
+    decision_points = getattr(env, "decision_points", False)
     episode_returns = None
     infos = []
     global_episode_return = 0.0
+    steps = 0
     start = time.time()
 
-    for _ in range(max_steps):
-        if getattr(policy, "uses_env", False):
-            action = policy.act(env.unwrapped if hasattr(env, "unwrapped") else env)
-        else:
-            action = policy.act(obs)
-        step_out = env.step(action)
-
-        if isinstance(step_out, Transition):
-            obs = step_out.obs
-            reward_team = step_out.reward_team
-            reward_by_agent = step_out.reward_by_agent
-            done_all = step_out.done_all
-            info = step_out.info
+    while steps < max_steps:
+        action = _act(policy, obs, base_env)
+        if decision_points:
+            step_out = env.step(action, max_skip=_decision_skip(env, policy, max_steps - steps))
         else:
-            obs, reward, terminated, truncated, info = step_out
-            reward_by_agent = [float(x) for x in _as_seq(reward)]
-            reward_team = float(np.sum(reward_by_agent))
-            done_all = all(bool(x) for x in _as_seq(terminated)) or all(
-                bool(x) for x in _as_seq(truncated)
-            )
+            step_out = env.step(action)
 
+        obs, reward_team, reward_by_agent, done_all, info = _normalize_step(step_out)
         if episode_returns is None:
             episode_returns = np.zeros(len(reward_by_agent), dtype=np.float64)
-        episode_returns += np.array(reward_by_agent, dtype=np.float64)
+        episode_returns += reward_by_agent
         global_episode_return += reward_team
-        infos.append(info)
+        if kpis is None:
+            infos.append(info)
+        steps += int(info.get("elapsed_steps", 1))
 
         if render:
             env.render()
@@ -67,10 +102,90 @@ def run_episode(env: Any, policy: Any, max_steps: int, render: bool = False, see
             break
 
     duration_s = max(time.time() - start, 1e-9)
-    metrics = summarize_episode(
-        infos=infos,
-        global_episode_return=global_episode_return,
-        episode_returns=episode_returns if episode_returns is not None else [],
-    )
+    episode_returns = episode_returns if episode_returns is not None else []
+    if kpis is not None:
+        metrics = summarize_kpis(
+            kpis,
+            episode_length=steps,
+            global_episode_return=global_episode_return,
+            episode_returns=episode_returns,
+        )
+    else:
+        metrics = summarize_episode(
+            infos=infos,
+            global_episode_return=global_episode_return,
+            episode_returns=episode_returns,
+        )
     metrics["fps"] = float(metrics["episode_length"] / duration_s) if metrics["episode_length"] else 0.0
     return metrics
+
+
+def run_episode_batch(
+    pool: Any, policy: Any, max_steps: int, seed: int | Sequence[int | None] | None = None
+) -> List[Dict[str, Any]]:
+    """
+    Runs one episode in every env of an `EnvPool`, asking the policy for the actions of all running envs at
+    once through `act_batch`. Envs that finish early are no longer stepped. Returns the metrics of every env,
+    as `run_episode` does; `fps` is the number of steps per second of each env.
+    """
+    observations = list(pool.reset(seed=seed))
+    envs = [getattr(env, "unwrapped", env) for env in pool.envs]
+    if hasattr(policy, "reset_batch"):
+        policy.reset_batch(envs)
+    elif hasattr(policy, "reset"):
+        policy.reset()
+
+    uses_env = getattr(policy, "uses_env", False)
+    uses_masks = getattr(policy, "uses_masks", False)
+    kpis = [getattr(env, "kpis", None) for env in envs]
+    infos: List[List[Dict[str, Any]]] = [[] for _ in envs]
+    running = np.ones(len(envs), dtype=bool)
+    steps = np.zeros(len(envs), dtype=np.int64)
+    global_episode_returns = np.zeros(len(envs), dtype=np.float64)
+    episode_returns = None
+    start = time.time()
+
+    while running.any():
+        indices = np.flatnonzero(running)
+        if uses_env:
+            batch = [envs[i] for i in indices]
+        else:
+            batch = _stack_observations([observations[i] for i in indices])
+        masks = np.stack([envs[i].compute_valid_action_masks() for i in indices]) if uses_masks else None
+        actions = policy.act_batch(batch, masks=masks)
+
+        obs, rewards, terminated, truncated, step_infos = pool.step(actions, indices=indices)
+        rewards = rewards.reshape(len(indices), -1).astype(np.float64)
+        if episode_returns is None:
+            episode_returns = np.zeros((len(envs), rewards.shape[1]), dtype=np.float64)
+        episode_returns[indices] += rewards
+        global_episode_returns[indices] += rewards.sum(axis=1)
+        for j, i in enumerate(indices):
+            observations[i] = obs[j]
+            steps[i] += int(step_infos[j].get("elapsed_steps", 1))
+            if kpis[i] is None:
+                infos[i].append(step_infos[j])
+
+        done = terminated.reshape(len(indices), -1).all(axis=1) | truncated.reshape(len(indices), -1).all(axis=1)
+        running[indices[done | (steps[indices] >= max_steps)]] = False
+
+    duration_s = max(time.time() - start, 1e-9)
+    results = []
+    for i in range(len(envs)):
+        returns = episode_returns[i] if episode_returns is not None else []
+        if kpis[i] is not None:
+            metrics = summarize_kpis(
+                kpis[i],
+                episode_length=int(steps[i]),
+                global_episode_return=float(global_episode_returns[i]),
+                episode_returns=returns,
+            )
+        else:
+            metrics = summarize_episode(
+                infos=infos[i],
+                global_episode_return=float(global_episode_returns[i]),
+                episode_returns=returns,
+            )
+        metrics["fps"] = float(metrics["episode_length"] / duration_s) if metrics["episode_length"] else 0.0
+        results.append(metrics)
+    return results
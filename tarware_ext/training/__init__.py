@@ -1,5 +1,8 @@
 """Training utilities and algorithms."""
 
+from .algo_mappo import MAPPO
+from .algo_ppo import PPO, PPOConfig
 from .buffer import RolloutBuffer
+from .workers import EnvWorkers
 
-__all__ = ["RolloutBuffer"]
+__all__ = ["RolloutBuffer", "EnvWorkers", "PPO", "PPOConfig", "MAPPO"]
@@ -1,8 +1,27 @@
-"""MAPPO placeholder."""
+"""MAPPO: PPO with a centralized critic."""
 
 from __future__ import annotations
 
+from typing import Dict, List, Tuple
 
-class MAPPO:
-    def train(self) -> None:
-        raise NotImplementedError("MAPPO training not implemented yet.")
+import numpy as np
+
+from .algo_ppo import PPO
+from .mlp import MLP
+
+
+class MAPPO(PPO):
+    """
+    PPO with a centralized critic: one MLP over the global state of an env outputs the values of all its agents.
+    The critic input is the state stored once per env step in the rollout buffer, so the critic runs once per
+    env step rather than once per agent. The actor is the shared one of `PPO`.
+    """
+
+    def _make_critic(self, state_size: int, ego_size: int, num_agents: int) -> MLP:
+        return MLP(state_size, self.config.hidden, num_agents, rng=self.rng)
+
+    def _values(self, states: np.ndarray, egos: np.ndarray) -> Tuple[np.ndarray, List[np.ndarray]]:
+        return self.critic.forward(states)
+
+    def _critic_grads(self, activations: List[np.ndarray], grad_values: np.ndarray) -> Dict[str, np.ndarray]:
+        return self.critic.backward(activations, grad_values)
@@ -1,8 +1,223 @@
-"""PPO placeholder."""
+"""PPO with parameter sharing over the agents, on batched envs."""
 
 from __future__ import annotations
 
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+
+from .buffer import RolloutBuffer
+from .mlp import MLP, Adam
+from .utils import set_seed
+from .workers import EnvWorkers
+
+
+@dataclass
+class PPOConfig:
+    env_id: str = "tarware-tiny-3agvs-2pickers-sharedobs-v1"
+    env_kwargs: Dict[str, Any] = field(default_factory=lambda: {"normalised_coordinates": True})
+    num_envs: int = 8
+    # Worker processes stepping the envs, None for one per core but one
+    num_workers: int | None = None
+    total_steps: int = 100_000
+    rollout_steps: int = 128
+    epochs: int = 4
+    minibatch_size: int = 256
+    hidden: Tuple[int, ...] = (128, 128)
+    lr: float = 3e-4
+    gamma: float = 0.99
+    gae_lambda: float = 0.95
+    clip: float = 0.2
+    entropy_coef: float = 0.01
+    value_coef: float = 0.5
+    max_grad_norm: float | None = 0.5
+    seed: int | None = 0
+    # Directory of memory-mapped rollout arrays, for long rollouts
+    memmap_dir: str | None = None
+
+
+def masked_log_softmax(logits: np.ndarray, masks: np.ndarray) -> np.ndarray:
+    """Log-probabilities over the valid actions, a very negative number for the others."""
+    logits = np.where(masks, logits, -1e9)
+    logits = logits - logits.max(axis=-1, keepdims=True)
+    return logits - np.log(np.exp(logits).sum(axis=-1, keepdims=True))
+
 
 class PPO:
-    def train(self) -> None:
-        raise NotImplementedError("PPO training not implemented yet.")
+    """
+    PPO over `num_envs` warehouses stepped by `EnvWorkers`. All agents share an MLP actor over the global state
+    of their env and their own ego block; the state goes through the first layer once per env step and is
+    broadcast to the agents. Actions are sampled among those allowed by `compute_valid_action_masks`, and the
+    masks are applied again to the log-probabilities in the update.
+
+    The critic gives each agent a value from the same input as the actor; `MAPPO` replaces it with a
+    centralized critic. `train` runs `total_steps` env steps (of all envs) and returns the metrics of every
+    iteration, including the env steps per second of the rollouts and the gradient updates per second of
+    the learner.
+    """
+
+    def __init__(self, config: PPOConfig | None = None) -> None:
+        self.config = config or PPOConfig()
+        set_seed(self.config.seed)
+        self.rng = np.random.default_rng(self.config.seed)
+        self.envs: EnvWorkers | None = None
+        self.actor: MLP | None = None
+        self.critic: MLP | None = None
+
+    def _build(self, state_size: int, ego_size: int, num_agents: int, num_actions: int) -> None:
+        hidden = self.config.hidden
+        self.actor = MLP(ego_size, hidden, num_actions, shared_size=state_size, out_gain=0.01, rng=self.rng)
+        self.critic = self._make_critic(state_size, ego_size, num_agents)
+        self.actor_optimizer = Adam(self.actor.params, lr=self.config.lr, max_grad_norm=self.config.max_grad_norm)
+        self.critic_optimizer = Adam(self.critic.params, lr=self.config.lr, max_grad_norm=self.config.max_grad_norm)
+
+    def _make_critic(self, state_size: int, ego_size: int, num_agents: int) -> MLP:
+        return MLP(ego_size, self.config.hidden, 1, shared_size=state_size, rng=self.rng)
+
+    def _values(self, states: np.ndarray, egos: np.ndarray) -> Tuple[np.ndarray, List[np.ndarray]]:
+        """(batch, num_agents) values and the critic activations."""
+        values, activations = self.critic.forward(egos, states)
+        return values[..., 0], activations
+
+    def _critic_grads(self, activations: List[np.ndarray], grad_values: np.ndarray) -> Dict[str, np.ndarray]:
+        return self.critic.backward(activations, grad_values[..., None])
+
+    def _sample(self, states: np.ndarray, egos: np.ndarray, masks: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        log_probs = masked_log_softmax(self.actor(egos, states), masks)
+        # Gumbel-max over the log-probabilities of the valid actions
+        actions = (log_probs - np.log(-np.log(self.rng.random(log_probs.shape)))).argmax(axis=-1)
+        return actions, np.take_along_axis(log_probs, actions[..., None], axis=-1)[..., 0]
+
+    def collect(self, buffer: RolloutBuffer, observations: Tuple[np.ndarray, ...]) -> Tuple[Tuple, List, float]:
+        """Fills `buffer` with one rollout, returning the next observations, the finished episodes and the time."""
+        start = time.perf_counter()
+        states, egos, masks = observations
+        episodes = []
+        for _ in range(buffer.capacity):
+            actions, log_probs = self._sample(states, egos, masks)
+            values, _ = self._values(states, egos)
+            (next_states, next_egos, next_masks), rewards, dones, finished = self.envs.step(actions)
+            buffer.add(egos, masks, actions, log_probs, rewards, values, dones, states=states)
+            episodes.extend(finished)
+            states, egos, masks = next_states, next_egos, next_masks
+        last_values, _ = self._values(states, egos)
+        buffer.compute_returns_and_advantages(last_values, gamma=self.config.gamma, gae_lambda=self.config.gae_lambda)
+        return (states, egos, masks), episodes, time.perf_counter() - start
+
+    def update(self, buffer: RolloutBuffer) -> Dict[str, float]:
+        """`epochs` passes of minibatch gradient steps over the rollout in `buffer`."""
+        config = self.config
+        start = time.perf_counter()
+        totals = np.zeros(5)
+        num_updates = 0
+        fields = ("states", "obs", "masks", "actions", "log_probs", "advantages", "returns")
+        for _ in range(config.epochs):
+            for batch in buffer.minibatches(config.minibatch_size, self.rng, fields=fields):
+                totals += self._gradient_step(batch)
+                num_updates += 1
+        elapsed = time.perf_counter() - start
+        policy_loss, value_loss, entropy, approx_kl, clip_fraction = (float(x) for x in totals / max(num_updates, 1))
+        return {
+            "policy_loss": policy_loss,
+            "value_loss": value_loss,
+            "entropy": entropy,
+            "approx_kl": approx_kl,
+            "clip_fraction": clip_fraction,
+            "updates": num_updates,
+            "updates_per_s": num_updates / max(elapsed, 1e-9),
+            "update_time_s": elapsed,
+        }
+
+    def _gradient_step(self, batch: Dict[str, np.ndarray]) -> np.ndarray:
+        config = self.config
+        states, egos, masks, actions = batch["states"], batch["obs"], batch["masks"], batch["actions"]
+        advantages = batch["advantages"]
+        advantages = (advantages - advantages.mean()) / (advantages.std() + 1e-8)
+        count = advantages.size
+
+        logits, actor_activations = self.actor.forward(egos, states)
+        log_probs = masked_log_softmax(logits, masks)
+        probs = np.exp(log_probs) * masks
+        new_log_probs = np.take_along_axis(log_probs, actions[..., None], axis=-1)[..., 0]
+        log_ratio = new_log_probs - batch["log_probs"]
+        ratio = np.exp(log_ratio)
+        unclipped = ratio * advantages
+        clipped = np.clip(ratio, 1.0 - config.clip, 1.0 + config.clip) * advantages
+        policy_loss = -np.minimum(unclipped, clipped).mean()
+        entropy_terms = np.where(masks, probs * log_probs, 0.0)
+        entropy = -entropy_terms.sum(axis=-1)
+
+        # d(loss)/d(log-prob of the taken action) flows through the unclipped term only where it is the minimum
+        grad_log_prob = np.where(unclipped <= clipped, -unclipped, 0.0) / count
+        # d(log-prob of the taken action)/d(logits) = one_hot(action) - probs
+        grad_logits = -grad_log_prob[..., None] * probs
+        taken = np.take_along_axis(grad_logits, actions[..., None], axis=-1) + grad_log_prob[..., None]
+        np.put_along_axis(grad_logits, actions[..., None], taken, axis=-1)
+        # d(-entropy_coef * mean entropy)/d(logits) = entropy_coef * p * (log p + entropy) / count
+        grad_logits += config.entropy_coef * np.where(masks, probs * (log_probs + entropy[..., None]), 0.0) / count
+        self.actor_optimizer.step(self.actor.backward(actor_activations, grad_logits.astype(np.float32)))
+
+        values, critic_activations = self._values(states, egos)
+        errors = values - batch["returns"]
+        value_loss = np.mean(errors * errors)
+        grad_values = (config.value_coef * 2.0 * errors / count).astype(np.float32)
+        self.critic_optimizer.step(self._critic_grads(critic_activations, grad_values))
+
+        approx_kl = np.mean(ratio - 1.0 - log_ratio)
+        clip_fraction = np.mean(np.abs(ratio - 1.0) > config.clip)
+        return np.array([policy_loss, value_loss, entropy.mean(), approx_kl, clip_fraction])
+
+    def train(self, callback: Callable[[Dict[str, float]], None] | None = None) -> List[Dict[str, float]]:
+        """Runs `total_steps` env steps; `callback` gets the metrics of every iteration."""
+        config = self.config
+        self.envs = EnvWorkers(config.env_id, config.num_envs, config.num_workers, config.env_kwargs)
+        history: List[Dict[str, float]] = []
+        try:
+            observations = self.envs.reset(seed=config.seed)
+            states, egos, masks = observations
+            if self.actor is None:
+                self._build(states.shape[-1], egos.shape[-1], self.envs.num_agents, self.envs.num_actions)
+            buffer = RolloutBuffer(
+                config.rollout_steps,
+                config.num_envs,
+                self.envs.num_agents,
+                egos.shape[2:],
+                self.envs.num_actions,
+                state_shape=states.shape[1:],
+                memmap_dir=config.memmap_dir,
+            )
+            env_steps = 0
+            episodes: List[Tuple[float, int, int]] = []
+            iteration = 0
+            while env_steps < config.total_steps:
+                observations, finished, rollout_time = self.collect(buffer, observations)
+                steps = buffer.num_samples
+                env_steps += steps
+                episodes = (episodes + finished)[-100:]
+                metrics = {
+                    "iteration": iteration,
+                    "env_steps": env_steps,
+                    "env_steps_per_s": steps / max(rollout_time, 1e-9),
+                    "rollout_time_s": rollout_time,
+                    "episodes": len(finished),
+                }
+                # Means over the last 100 finished episodes, left out until the first one ends
+                if episodes:
+                    metrics["mean_episode_return"] = float(np.mean([e[0] for e in episodes]))
+                    metrics["mean_episode_deliveries"] = float(np.mean([e[2] for e in episodes]))
+                metrics.update(self.update(buffer))
+                history.append(metrics)
+                if callback is not None:
+                    callback(metrics)
+                iteration += 1
+        finally:
+            self.envs.close()
+        return history
+
+    def save(self, path: str | Path) -> None:
+        params = {f"actor/{name}": p for name, p in self.actor.params.items()}
+        params.update({f"critic/{name}": p for name, p in self.critic.params.items()})
+        np.savez(path, **params)
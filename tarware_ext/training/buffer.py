@@ -1,23 +1,163 @@
-"""Simple rollout buffer."""
+"""Preallocated rollout buffer for on-policy training."""
 
 from __future__ import annotations
 
-from typing import Any, List
+from pathlib import Path
+from typing import Dict, Iterator, Sequence, Tuple
+
+import numpy as np
 
 
 class RolloutBuffer:
-    def __init__(self) -> None:
-        self._items: List[Any] = []
+    """
+    Ring buffer of the last `capacity` steps of `num_envs` envs stepped together, preallocated with a leading
+    (capacity, num_envs) shape:
 
-    def add(self, item: Any) -> None:
-        self._items.append(item)
+      - `obs` (capacity, num_envs, num_agents, *obs_shape), `masks` (..., num_agents, num_actions),
+        `actions`, `log_probs`, `rewards` and `values` (..., num_agents), `dones` (capacity, num_envs);
+      - `states` (capacity, num_envs, *state_shape) if `state_shape` is given, e.g. the input of a centralized
+        critic, stored once per env step rather than per agent;
+      - `advantages` and `returns` (..., num_agents), filled by `compute_returns_and_advantages`.
 
-    def clear(self) -> None:
-        self._items.clear()
+    `add` writes one step of every env and overwrites the oldest step once the buffer is full. With
+    `memmap_dir`, the arrays are `.npy` files in that directory instead of in memory, for long horizons.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        num_envs: int,
+        num_agents: int,
+        obs_shape: Sequence[int],
+        num_actions: int,
+        state_shape: Sequence[int] | None = None,
+        obs_dtype: np.dtype | type = np.float32,
+        memmap_dir: str | Path | None = None,
+    ) -> None:
+        if capacity < 1:
+            raise ValueError(f"capacity is {capacity}, should be at least 1")
+        self.capacity = capacity
+        self.num_envs = num_envs
+        self.num_agents = num_agents
+        self.memmap_dir = None if memmap_dir is None else Path(memmap_dir)
+        if self.memmap_dir is not None:
+            self.memmap_dir.mkdir(parents=True, exist_ok=True)
+
+        steps = (capacity, num_envs)
+        per_agent = steps + (num_agents,)
+        specs: Dict[str, Tuple[Tuple[int, ...], np.dtype | type]] = {
+            "obs": (per_agent + tuple(obs_shape), obs_dtype),
+            "masks": (per_agent + (num_actions,), bool),
+            "actions": (per_agent, np.int64),
+            "log_probs": (per_agent, np.float32),
+            "rewards": (per_agent, np.float32),
+            "values": (per_agent, np.float32),
+            "dones": (steps, bool),
+            "advantages": (per_agent, np.float32),
+            "returns": (per_agent, np.float32),
+        }
+        if state_shape is not None:
+            specs["states"] = (steps + tuple(state_shape), np.float32)
+        self.fields = list(specs)
+        for name, (shape, dtype) in specs.items():
+            setattr(self, name, self._allocate(name, shape, dtype))
+        self.pos = 0
+        self.full = False
+
+    def _allocate(self, name: str, shape: Tuple[int, ...], dtype: np.dtype | type) -> np.ndarray:
+        if self.memmap_dir is None:
+            return np.zeros(shape, dtype=dtype)
+        return np.lib.format.open_memmap(self.memmap_dir / f"{name}.npy", mode="w+", dtype=dtype, shape=shape)
 
     def __len__(self) -> int:
-        return len(self._items)
+        """Number of stored steps (of all envs)."""
+        return self.capacity if self.full else self.pos
 
     @property
-    def items(self) -> List[Any]:
-        return list(self._items)
+    def num_samples(self) -> int:
+        """Number of stored (step, env) samples."""
+        return len(self) * self.num_envs
+
+    def clear(self) -> None:
+        self.pos = 0
+        self.full = False
+
+    def add(
+        self,
+        obs: np.ndarray,
+        masks: np.ndarray,
+        actions: np.ndarray,
+        log_probs: np.ndarray,
+        rewards: np.ndarray,
+        values: np.ndarray,
+        dones: np.ndarray,
+        states: np.ndarray | None = None,
+    ) -> None:
+        """Stores one step of every env; per-agent inputs are (num_envs, num_agents, ...), `dones` (num_envs,)."""
+        step = self.pos
+        self.obs[step] = obs
+        self.masks[step] = masks
+        self.actions[step] = actions
+        self.log_probs[step] = log_probs
+        self.rewards[step] = rewards
+        self.values[step] = values
+        self.dones[step] = dones
+        if states is not None:
+            self.states[step] = states
+        self.pos = (step + 1) % self.capacity
+        self.full = self.full or self.pos == 0
+
+    def _chronological(self) -> np.ndarray:
+        # Buffer rows from the oldest stored step to the newest
+        size = len(self)
+        return (self.pos - size + np.arange(size)) % self.capacity
+
+    def compute_returns_and_advantages(
+        self, last_values: np.ndarray, gamma: float = 0.99, gae_lambda: float = 0.95
+    ) -> None:
+        """
+        Generalised advantage estimates and returns (advantages + values) of the stored steps, for all envs and
+        agents at once. `last_values` (num_envs, num_agents) are the values of the observations after the newest
+        step; `dones[t]` cuts the bootstrap from step t to the next one.
+        """
+        rows = self._chronological()
+        next_values = np.asarray(last_values, dtype=np.float32)
+        advantage = np.zeros((self.num_envs, self.num_agents), dtype=np.float32)
+        for row in rows[::-1]:
+            not_done = 1.0 - self.dones[row, :, None].astype(np.float32)
+            delta = self.rewards[row] + gamma * next_values * not_done - self.values[row]
+            advantage = delta + gamma * gae_lambda * not_done * advantage
+            self.advantages[row] = advantage
+            next_values = self.values[row]
+        self.returns[rows] = self.advantages[rows] + self.values[rows]
+
+    def flat(self, name: str) -> np.ndarray:
+        """View of a field with the (step, env) axes of the stored steps merged into one sample axis."""
+        array = getattr(self, name)
+        stored = array if self.full else array[:self.pos]
+        return stored.reshape((-1,) + array.shape[2:])
+
+    def minibatch_indices(self, batch_size: int, rng: np.random.Generator | None = None) -> Iterator[np.ndarray]:
+        """
+        Shuffled sample indices into the `flat` views, `batch_size` at a time (the last minibatch may be
+        shorter). The minibatches are slices of one permutation, not copies.
+        """
+        rng = rng or np.random.default_rng()
+        permutation = rng.permutation(self.num_samples)
+        for start in range(0, len(permutation), batch_size):
+            yield permutation[start:start + batch_size]
+
+    def minibatches(
+        self, batch_size: int, rng: np.random.Generator | None = None, fields: Sequence[str] | None = None
+    ) -> Iterator[Dict[str, np.ndarray]]:
+        """The `fields` (all by default) of each shuffled minibatch of samples."""
+        views = {name: self.flat(name) for name in (fields or self.fields)}
+        for indices in self.minibatch_indices(batch_size, rng):
+            yield {name: view[indices] for name, view in views.items()}
+
+    def flush(self) -> None:
+        """Writes memory-mapped arrays to disk."""
+        for name in self.fields:
+            array = getattr(self, name)
+            if isinstance(array, np.memmap):
+                array.flush()
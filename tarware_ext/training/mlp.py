@@ -0,0 +1,119 @@
+"""Small numpy MLP with manual backprop and an Adam optimizer."""
+
+from __future__ import annotations
+
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+Params = Dict[str, np.ndarray]
+
+
+class MLP:
+    """
+    Tanh MLP over inputs with any leading axes, float32 throughout.
+
+    With `shared_size`, `forward(x, shared)` also takes a (batch, shared_size) input common to all the rows of
+    a (batch, group, in_size) `x`, e.g. the global state of an env and the per-agent inputs of its agents: the
+    first layer multiplies `shared` once per batch row and broadcasts the result over the group axis, instead
+    of multiplying a copy of it per row of `x`.
+    """
+
+    def __init__(
+        self,
+        in_size: int,
+        hidden: Sequence[int],
+        out_size: int,
+        shared_size: int = 0,
+        out_gain: float = 1.0,
+        rng: np.random.Generator | None = None,
+    ) -> None:
+        rng = rng or np.random.default_rng()
+        sizes = [in_size] + list(hidden) + [out_size]
+        self.num_layers = len(sizes) - 1
+        self.shared_size = shared_size
+        self.params: Params = {}
+        for layer, (fan_in, fan_out) in enumerate(zip(sizes[:-1], sizes[1:])):
+            gain = out_gain if layer == self.num_layers - 1 else np.sqrt(2.0)
+            scale = gain / np.sqrt(fan_in + (shared_size if layer == 0 else 0))
+            self.params[f"w{layer}"] = (rng.normal(size=(fan_in, fan_out)) * scale).astype(np.float32)
+            self.params[f"b{layer}"] = np.zeros(fan_out, dtype=np.float32)
+            if layer == 0 and shared_size:
+                self.params["w_shared"] = (rng.normal(size=(shared_size, fan_out)) * scale).astype(np.float32)
+
+    def forward(self, x: np.ndarray, shared: np.ndarray | None = None) -> Tuple[np.ndarray, List[np.ndarray]]:
+        """Output and the activations `backward` needs."""
+        params = self.params
+        activations = [x]
+        h = x @ params["w0"] + params["b0"]
+        if self.shared_size:
+            activations.append(shared)
+            h += (shared @ params["w_shared"])[:, None, :]
+        for layer in range(1, self.num_layers):
+            h = np.tanh(h)
+            activations.append(h)
+            h = h @ params[f"w{layer}"] + params[f"b{layer}"]
+        return h, activations
+
+    def __call__(self, x: np.ndarray, shared: np.ndarray | None = None) -> np.ndarray:
+        return self.forward(x, shared)[0]
+
+    def backward(self, activations: List[np.ndarray], grad_out: np.ndarray) -> Params:
+        """Gradients of the parameters given the gradient of the output, summed over all leading axes."""
+        params = self.params
+        grads: Params = {}
+        hidden = activations[2:] if self.shared_size else activations[1:]
+        grad = grad_out
+        for layer in range(self.num_layers - 1, 0, -1):
+            h = hidden[layer - 1]
+            grads[f"w{layer}"] = h.reshape(-1, h.shape[-1]).T @ grad.reshape(-1, grad.shape[-1])
+            grads[f"b{layer}"] = grad.reshape(-1, grad.shape[-1]).sum(axis=0)
+            grad = (grad @ params[f"w{layer}"].T) * (1.0 - h * h)
+        x = activations[0]
+        grads["w0"] = x.reshape(-1, x.shape[-1]).T @ grad.reshape(-1, grad.shape[-1])
+        grads["b0"] = grad.reshape(-1, grad.shape[-1]).sum(axis=0)
+        if self.shared_size:
+            grads["w_shared"] = activations[1].T @ grad.sum(axis=1)
+        return grads
+
+
+class Adam:
+    """Adam over a dict of parameters, updated in place, with optional clipping of the global gradient norm."""
+
+    def __init__(
+        self,
+        params: Params,
+        lr: float = 3e-4,
+        betas: Tuple[float, float] = (0.9, 0.999),
+        eps: float = 1e-8,
+        max_grad_norm: float | None = None,
+    ) -> None:
+        self.params = params
+        self.lr = lr
+        self.beta1, self.beta2 = betas
+        self.eps = eps
+        self.max_grad_norm = max_grad_norm
+        self.steps = 0
+        self._m = {name: np.zeros_like(p) for name, p in params.items()}
+        self._v = {name: np.zeros_like(p) for name, p in params.items()}
+
+    def step(self, grads: Params) -> float:
+        """Applies one update and returns the gradient norm before clipping."""
+        norm = float(np.sqrt(sum(float(np.sum(g * g)) for g in grads.values())))
+        scale = 1.0
+        if self.max_grad_norm is not None and norm > self.max_grad_norm:
+            scale = self.max_grad_norm / (norm + 1e-6)
+        self.steps += 1
+        correction1 = 1.0 - self.beta1 ** self.steps
+        correction2 = 1.0 - self.beta2 ** self.steps
+        for name, grad in grads.items():
+            grad = grad * scale
+            m, v = self._m[name], self._v[name]
+            m *= self.beta1
+            m += (1.0 - self.beta1) * grad
+            v *= self.beta2
+            v += (1.0 - self.beta2) * grad * grad
+            self.params[name] -= (self.lr * (m / correction1) / (np.sqrt(v / correction2) + self.eps)).astype(
+                np.float32
+            )
+        return norm
@@ -0,0 +1,156 @@
+"""Envs stepped in parallel worker processes, returning the arrays the trainers need."""
+
+from __future__ import annotations
+
+import multiprocessing as mp
+import os
+from typing import Any, Dict, List, Sequence, Tuple
+
+import gymnasium as gym
+import numpy as np
+
+import tarware  # noqa: F401
+from tarware_ext.envs import EnvPool
+
+# states (num_envs, state_size), egos (num_envs, num_agents, ego_size), masks (num_envs, num_agents, num_actions)
+Observations = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+class _EnvChunk:
+    """The envs of one worker, with autoreset and per-episode statistics."""
+
+    def __init__(self, env_id: str, num_envs: int, env_kwargs: Dict[str, Any], seed_stride: int) -> None:
+        self.pool = EnvPool([lambda: gym.make(env_id, **env_kwargs).unwrapped for _ in range(num_envs)])
+        self.envs = self.pool.envs
+        # Seeded envs advance their seed by the total number of envs on reset, whatever the number of workers
+        self.seed_stride = seed_stride
+        self.seeds: List[int | None] = [None] * num_envs
+        self.num_agents = self.envs[0].num_agents
+        self.returns = np.zeros(num_envs, dtype=np.float64)
+        self.lengths = np.zeros(num_envs, dtype=np.int64)
+        self.deliveries = np.zeros(num_envs, dtype=np.int64)
+
+    def _observations(self, observations: Sequence[Any]) -> Observations:
+        if not hasattr(observations[0], "state"):
+            raise ValueError("the trainers need shared observations, use a `...-sharedobs-v1` env")
+        states = np.stack([obs.state for obs in observations]).astype(np.float32)
+        egos = np.stack([obs.ego for obs in observations]).astype(np.float32)
+        # The first ego column is the agent index
+        egos[:, :, 0] /= self.num_agents
+        masks = np.stack([env.compute_valid_action_masks() for env in self.envs]).astype(bool)
+        return states, egos, masks
+
+    def reset(self, seeds: Sequence[int | None]) -> Observations:
+        self.returns[:] = 0.0
+        self.lengths[:] = 0
+        self.deliveries[:] = 0
+        self.seeds = list(seeds)
+        return self._observations(self.pool.reset(seed=self.seeds))
+
+    def step(self, actions: np.ndarray) -> Tuple[Observations, np.ndarray, np.ndarray, List[Tuple[float, int, int]]]:
+        observations, rewards, terminated, truncated, infos = self.pool.step(actions)
+        rewards = rewards.reshape(len(self.envs), -1).astype(np.float32)
+        dones = terminated.reshape(len(self.envs), -1).all(axis=1) | truncated.reshape(len(self.envs), -1).all(axis=1)
+        self.returns += rewards.sum(axis=1)
+        self.lengths += 1
+        self.deliveries += [int(info.get("shelf_deliveries", 0)) for info in infos]
+        finished = []
+        for index in np.flatnonzero(dones):
+            finished.append((float(self.returns[index]), int(self.lengths[index]), int(self.deliveries[index])))
+            self.returns[index] = 0.0
+            self.lengths[index] = 0
+            self.deliveries[index] = 0
+            if self.seeds[index] is not None:
+                self.seeds[index] += self.seed_stride
+            observations[index] = self.pool.reset_env(index, self.seeds[index])
+        return self._observations(observations), rewards, dones, finished
+
+
+def _worker(conn: Any, env_id: str, num_envs: int, env_kwargs: Dict[str, Any], seed_stride: int) -> None:
+    chunk = _EnvChunk(env_id, num_envs, env_kwargs, seed_stride)
+    conn.send((chunk.envs[0].num_agents, chunk.envs[0].action_size))
+    while True:
+        command, data = conn.recv()
+        if command == "reset":
+            conn.send(chunk.reset(data))
+        elif command == "step":
+            conn.send(chunk.step(data))
+        else:
+            conn.close()
+            return
+
+
+class EnvWorkers:
+    """
+    `num_envs` envs of `env_id` split over `num_workers` processes that step their envs at the same time, or
+    stepped in the current process with `num_workers=0`. By default there is one worker per core but one,
+    left for the learner, and none on a single core.
+
+    Envs reset automatically at the end of an episode. `reset` and `step` return the arrays of all envs:
+    the global state and per-agent ego block of their shared observations and their valid action masks; `step`
+    also returns the rewards, done flags and the (return, length, deliveries) of the episodes that ended.
+    """
+
+    def __init__(
+        self,
+        env_id: str,
+        num_envs: int,
+        num_workers: int | None = None,
+        env_kwargs: Dict[str, Any] | None = None,
+    ) -> None:
+        env_kwargs = dict(env_kwargs or {})
+        if num_workers is None:
+            num_workers = (os.cpu_count() or 1) - 1
+        self.num_envs = num_envs
+        self.num_workers = max(0, min(num_workers, num_envs))
+        self._chunk: _EnvChunk | None = None
+        self._conns: List[Any] = []
+        self._processes: List[Any] = []
+        if self.num_workers == 0:
+            self._chunk = _EnvChunk(env_id, num_envs, env_kwargs, num_envs)
+            self.num_agents = self._chunk.num_agents
+            self.num_actions = self._chunk.envs[0].action_size
+            self._sizes = [num_envs]
+            return
+
+        self._sizes = [len(part) for part in np.array_split(np.arange(num_envs), self.num_workers)]
+        for size in self._sizes:
+            parent, child = mp.Pipe()
+            process = mp.Process(target=_worker, args=(child, env_id, size, env_kwargs, num_envs), daemon=True)
+            process.start()
+            child.close()
+            self._conns.append(parent)
+            self._processes.append(process)
+        self.num_agents, self.num_actions = [conn.recv() for conn in self._conns][0]
+
+    def reset(self, seed: int | None = None) -> Observations:
+        seeds = [None if seed is None else seed + i for i in range(self.num_envs)]
+        if self._chunk is not None:
+            return self._chunk.reset(seeds)
+        offsets = np.cumsum([0] + self._sizes)
+        for conn, start, end in zip(self._conns, offsets[:-1], offsets[1:]):
+            conn.send(("reset", seeds[start:end]))
+        parts = [conn.recv() for conn in self._conns]
+        return tuple(np.concatenate(arrays) for arrays in zip(*parts))
+
+    def step(self, actions: np.ndarray) -> Tuple[Observations, np.ndarray, np.ndarray, List[Tuple[float, int, int]]]:
+        if self._chunk is not None:
+            return self._chunk.step(actions)
+        offsets = np.cumsum([0] + self._sizes)
+        for conn, start, end in zip(self._conns, offsets[:-1], offsets[1:]):
+            conn.send(("step", actions[start:end]))
+        parts = [conn.recv() for conn in self._conns]
+        observations = tuple(np.concatenate(arrays) for arrays in zip(*(part[0] for part in parts)))
+        rewards = np.concatenate([part[1] for part in parts])
+        dones = np.concatenate([part[2] for part in parts])
+        finished = [episode for part in parts for episode in part[3]]
+        return observations, rewards, dones, finished
+
+    def close(self) -> None:
+        for conn in self._conns:
+            conn.send(("close", None))
+            conn.close()
+        for process in self._processes:
+            process.join()
+        self._conns = []
+        self._processes = []
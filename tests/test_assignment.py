@@ -0,0 +1,73 @@
+import itertools
+
+import gymnasium as gym
+import numpy as np
+import pytest
+
+import tarware  # noqa: F401
+from tarware_ext.policies import AssignmentStrategy, GraphGreedyPolicy
+from tarware_ext.policies.assignment import linear_sum_assignment
+
+
+def _brute_force(cost):
+    # Minimum total cost over all injective maps of the smaller side into the larger one
+    flip = cost.shape[0] > cost.shape[1]
+    matrix = cost.T if flip else cost
+    rows = np.arange(matrix.shape[0])
+    best = min(matrix[rows, list(cols)].sum() for cols in itertools.permutations(range(matrix.shape[1]), len(rows)))
+    return best
+
+
+def _check(cost):
+    rows, cols = linear_sum_assignment(cost)
+    assert len(rows) == len(cols) == min(cost.shape)
+    assert len(set(rows.tolist())) == len(rows) and len(set(cols.tolist())) == len(cols)
+    assert (np.diff(rows) > 0).all()
+    assert cost[rows, cols].sum() == pytest.approx(_brute_force(cost))
+
+
+@pytest.mark.parametrize("shape", [(1, 1), (3, 3), (5, 5), (6, 6), (2, 5), (5, 2), (4, 6), (6, 3)])
+def test_matches_brute_force(shape):
+    rng = np.random.default_rng(sum(shape))
+    for _ in range(10):
+        _check(rng.integers(0, 10, size=shape).astype(float))
+        _check(rng.random(shape))
+
+
+@pytest.mark.parametrize("shape", [(4, 4), (3, 5), (5, 3)])
+def test_matches_brute_force_with_large_and_infinite_costs(shape):
+    rng = np.random.default_rng(1)
+    for _ in range(20):
+        cost = rng.random(shape)
+        cost[rng.random(shape) < 0.2] = 1e12
+        cost[rng.random(shape) < 0.3] = np.inf
+        if not np.isfinite(_brute_force(cost)):
+            with pytest.raises(ValueError):
+                linear_sum_assignment(cost)
+            continue
+        _check(cost)
+
+
+def test_rejects_invalid_matrices():
+    with pytest.raises(ValueError):
+        linear_sum_assignment(np.array([[1.0, np.nan], [0.0, 1.0]]))
+    with pytest.raises(ValueError):
+        linear_sum_assignment(np.array([[np.inf, np.inf], [0.0, 1.0]]))
+    rows, cols = linear_sum_assignment(np.zeros((0, 3)))
+    assert len(rows) == len(cols) == 0
+
+
+def test_graph_greedy_policy_with_optimal_assignment_delivers():
+    env = gym.make("tarware-tiny-3agvs-2pickers-globalobs-v1").unwrapped
+    env.reset(seed=0)
+    policy = GraphGreedyPolicy(assignment=AssignmentStrategy.OPTIMAL)
+    policy.reset(env)
+
+    deliveries = 0
+    for _ in range(300):
+        _obs, _rewards, terminateds, _truncateds, info = env.step(policy.act(env))
+        deliveries += info["shelf_deliveries"]
+        if all(terminateds):
+            break
+
+    assert deliveries > 0
@@ -0,0 +1,77 @@
+import gymnasium as gym
+import numpy as np
+
+import tarware  # noqa: F401
+
+
+def test_step_to_decision_stops_when_no_agent_is_busy():
+    env = gym.make("tarware-tiny-3agvs-2pickers-globalobs-v1").unwrapped
+    env.reset(seed=0)
+
+    _obs, _rewards, terminateds, _truncateds, info = env.step_to_decision([0] * env.num_agents)
+
+    assert info["elapsed_steps"] == 1
+    assert not any(terminateds)
+
+
+def _dispatch_actions(env):
+    masks = env.compute_valid_action_masks()
+    return [int(mask[1:].argmax()) + 1 if mask[1:].any() else 0 for mask in masks]
+
+
+def _replay_with_step(env, actions, max_skip=None):
+    """Plain `step` calls equivalent to one `step_to_decision`: the busy flags before and after every step."""
+    noop_actions = [0] * env.num_agents
+    total_rewards = np.zeros(env.num_agents)
+    trace = []
+    while True:
+        before = [agent.busy for agent in env.agents]
+        _obs, rewards, terminateds, _truncateds, _info = env.step(actions)
+        total_rewards += rewards
+        after = [agent.busy for agent in env.agents]
+        trace.append((before, after))
+        actions = noop_actions
+        freed = any(b and not a for b, a in zip(before, after))
+        if all(terminateds) or freed or not any(after) or (max_skip and len(trace) >= max_skip):
+            return total_rewards, trace
+
+
+def test_step_to_decision_runs_until_a_busy_agent_is_free():
+    env = gym.make("tarware-tiny-3agvs-2pickers-globalobs-v1").unwrapped
+    reference = gym.make("tarware-tiny-3agvs-2pickers-globalobs-v1").unwrapped
+    env.reset(seed=0)
+    reference.reset(seed=0)
+
+    for _ in range(5):
+        actions = _dispatch_actions(env)
+        _obs, rewards, terminateds, _truncateds, info = env.step_to_decision(actions)
+        expected_rewards, trace = _replay_with_step(reference, actions)
+
+        # Every step before the last kept all the busy agents busy, the last one freed one of them
+        assert info["elapsed_steps"] == len(trace) > 1
+        for before, after in trace[:-1]:
+            assert any(after)
+            assert all(a for b, a in zip(before, after) if b)
+        before, after = trace[-1]
+        assert any(b and not a for b, a in zip(before, after))
+
+        np.testing.assert_allclose(rewards, expected_rewards)
+        assert env._cur_steps == reference._cur_steps
+        assert [(a.x, a.y, a.busy) for a in env.agents] == [(a.x, a.y, a.busy) for a in reference.agents]
+        assert not any(terminateds)
+
+
+def test_step_to_decision_respects_max_skip():
+    env = gym.make("tarware-tiny-3agvs-2pickers-globalobs-v1").unwrapped
+    reference = gym.make("tarware-tiny-3agvs-2pickers-globalobs-v1").unwrapped
+    env.reset(seed=0)
+    reference.reset(seed=0)
+    actions = _dispatch_actions(env)
+
+    _obs, rewards, _terminateds, _truncateds, info = env.step_to_decision(actions, max_skip=2)
+    expected_rewards, trace = _replay_with_step(reference, actions, max_skip=2)
+
+    # Stopped by max_skip, before any agent is free
+    assert info["elapsed_steps"] == len(trace) == 2
+    assert all(agent.busy for agent, busy in zip(env.agents, trace[0][1]) if busy)
+    np.testing.assert_allclose(rewards, expected_rewards)
@@ -0,0 +1,83 @@
+import gymnasium as gym
+import numpy as np
+
+import tarware  # noqa: F401
+from tarware_ext.envs import EnvPool
+
+ENV_ID = "tarware-tiny-3agvs-2pickers-globalobs-v1"
+
+
+def _make_pool(num_envs, max_steps=500, autoreset=False):
+    env_fns = [lambda: gym.make(ENV_ID, max_steps=max_steps).unwrapped for _ in range(num_envs)]
+    return EnvPool(env_fns, autoreset=autoreset)
+
+
+def _noops(pool, count):
+    return [[0] * pool.envs[0].num_agents for _ in range(count)]
+
+
+def test_step_advances_every_env():
+    pool = _make_pool(3)
+    pool.reset(seed=0)
+
+    obs, rewards, terminated, truncated, infos = pool.step(_noops(pool, 3))
+
+    assert [env._cur_steps for env in pool.envs] == [1, 1, 1]
+    assert len(obs) == len(infos) == 3
+    assert rewards.shape == terminated.shape == truncated.shape == (3, pool.envs[0].num_agents)
+
+
+def test_step_with_indices_only_advances_those_envs():
+    pool = _make_pool(3)
+    pool.reset(seed=0)
+
+    obs, rewards, _terminated, _truncated, _infos = pool.step(_noops(pool, 2), indices=[0, 2])
+    pool.step(_noops(pool, 1), indices=[2])
+
+    assert [env._cur_steps for env in pool.envs] == [1, 0, 2]
+    assert len(obs) == 2
+    assert rewards.shape == (2, pool.envs[0].num_agents)
+
+
+def test_interleaved_envs_match_isolated_runs():
+    pool = _make_pool(2)
+    pool.reset(seed=3)
+    isolated = gym.make(ENV_ID).unwrapped
+    isolated.reset(seed=4)
+    rng = np.random.default_rng(0)
+
+    for _ in range(20):
+        actions = rng.integers(0, isolated.action_size, size=(2, isolated.num_agents))
+        obs, rewards, _terminated, _truncated, _infos = pool.step(actions)
+        expected_obs, expected_rewards, *_ = isolated.step(actions[1])
+        np.testing.assert_array_equal(np.concatenate(obs[1]), np.concatenate(expected_obs))
+        np.testing.assert_array_equal(rewards[1], expected_rewards)
+
+
+def test_autoreset_at_episode_end():
+    pool = _make_pool(2, max_steps=5, autoreset=True)
+    pool.reset(seed=0)
+
+    for _ in range(4):
+        _obs, _rewards, terminated, _truncated, infos = pool.step(_noops(pool, 2))
+        assert not terminated.any()
+        assert all("final_observation" not in info for info in infos)
+    obs, _rewards, terminated, _truncated, infos = pool.step(_noops(pool, 2))
+
+    assert terminated.all()
+    assert all("final_observation" in info for info in infos)
+    assert [env._cur_steps for env in pool.envs] == [0, 0]
+    # A re-seeded env advances its seed by the number of envs
+    fresh = gym.make(ENV_ID, max_steps=5).unwrapped
+    np.testing.assert_array_equal(np.concatenate(obs[0]), np.concatenate(fresh.reset(seed=2)))
+
+
+def test_autoreset_only_resets_finished_envs():
+    pool = _make_pool(2, max_steps=3, autoreset=True)
+    pool.reset(seed=0)
+    pool.step(_noops(pool, 1), indices=[1])
+
+    for _ in range(2):
+        pool.step(_noops(pool, 2))
+
+    assert [env._cur_steps for env in pool.envs] == [2, 0]
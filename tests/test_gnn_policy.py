@@ -0,0 +1,31 @@
+import gymnasium as gym
+import numpy as np
+
+import tarware  # noqa: F401
+from tarware_ext.graphs.masks import build_action_masks
+from tarware_ext.policies import GNNInferencePolicy, GNNPolicy, InferenceServer
+
+
+def _envs(count):
+    envs = [gym.make("tarware-tiny-3agvs-2pickers-globalobs-v1").unwrapped for _ in range(count)]
+    for seed, env in enumerate(envs):
+        env.reset(seed=seed)
+        for _ in range(5 * seed):
+            env.step(np.zeros(env.num_agents, dtype=np.int64))
+    return envs
+
+
+def test_served_policy_matches_act_batch():
+    envs = _envs(3)
+    masks = np.stack([build_action_masks(env) for env in envs]).astype(bool)
+    policy = GNNPolicy(deterministic=True, seed=0)
+    expected = policy.act_batch(envs)
+
+    with InferenceServer(policy.act_arrays) as server:
+        client = GNNInferencePolicy(server)
+        actions = client.act_batch(envs)
+        single = client.act(envs[1])
+
+    np.testing.assert_array_equal(actions, expected)
+    np.testing.assert_array_equal(single, expected[1])
+    assert (masks[np.arange(3)[:, None], np.arange(5), actions] | (actions == 0)).all()
@@ -0,0 +1,101 @@
+import gymnasium as gym
+import numpy as np
+
+import tarware  # noqa: F401
+from tarware_ext.graphs import NODE_FEATURES, EdgeType, GraphBuilder
+from tarware_ext.graphs.builder import _layout_key
+
+
+def _env(size, seed, steps=0):
+    env = gym.make(f"tarware-{size}-3agvs-2pickers-globalobs-v1").unwrapped
+    env.reset(seed=seed)
+    _random_steps(env, np.random.default_rng(seed), steps)
+    return env
+
+
+def _random_steps(env, rng, steps):
+    for _ in range(steps):
+        masks = env.compute_valid_action_masks()
+        env.step([rng.choice(np.flatnonzero(mask)) for mask in masks])
+
+
+def test_layout_key_is_cached_until_the_layout_changes():
+    env = gym.make("tarware-tiny-3agvs-2pickers-globalobs-v1").unwrapped
+    env.reset(seed=0)
+    builder = GraphBuilder()
+
+    builder.build(env)
+    assert _layout_key(env) is _layout_key(env)
+    assert builder.layout(env) is builder.layout(env)
+
+    key = _layout_key(env)
+    env.action_id_to_coords_map = dict(env.action_id_to_coords_map)
+    assert _layout_key(env) is not key
+    assert _layout_key(env) == key
+
+
+def test_incremental_builds_match_fresh_builds():
+    envs = [_env("tiny", 0), _env("small", 1), _env("tiny", 2)]
+    builder = GraphBuilder()
+    rng = np.random.default_rng(0)
+
+    for _ in range(4):
+        for env in envs:
+            _random_steps(env, rng, 10)
+        graph = builder.build_batch(envs)
+        fresh = GraphBuilder().build_batch(envs)
+        np.testing.assert_array_equal(graph.node_features, fresh.node_features)
+        np.testing.assert_array_equal(graph.edge_index, fresh.edge_index)
+        np.testing.assert_array_equal(graph.edge_types, fresh.edge_types)
+        np.testing.assert_array_equal(graph.graph_index, fresh.graph_index)
+        np.testing.assert_array_equal(graph.agent_nodes, fresh.agent_nodes)
+
+
+def test_rack_and_aisle_edges_of_the_tiny_layout():
+    env = _env("tiny", 0)
+    layout = GraphBuilder().layout(env)
+    locations = [tuple(yx) for yx in layout.location_yx]
+    index = {yx: node for node, yx in enumerate(locations)}
+
+    # Pairs of locations on the same row or column: next to each other (RACK), or with only highway cells that
+    # are not locations between them (AISLE)
+    expected = {}
+    for a, (ya, xa) in enumerate(locations):
+        for b, (yb, xb) in enumerate(locations):
+            if a == b or (ya != yb and xa != xb):
+                continue
+            between = [(y, x) for y in range(min(ya, yb), max(ya, yb) + 1) for x in range(min(xa, xb), max(xa, xb) + 1)]
+            between = between[1:-1]
+            if not between:
+                expected[(a, b)] = EdgeType.RACK
+            elif all(env.highways[y, x] and (y, x) not in index for y, x in between):
+                expected[(a, b)] = EdgeType.AISLE
+
+    edges = {(int(s), int(t)): EdgeType(int(k)) for (s, t), k in zip(layout.edge_index.T, layout.edge_types)}
+    assert edges == expected
+    assert {EdgeType.RACK, EdgeType.AISLE} <= set(edges.values())
+
+
+def test_offsets_of_a_mixed_layout_batch():
+    envs = [_env("tiny", 0, 5), _env("small", 1, 5), _env("tiny", 2, 5)]
+    builder = GraphBuilder()
+    graph = builder.build_batch(envs)
+    layouts = [builder.layout(env) for env in envs]
+
+    offsets = np.concatenate([[0], np.cumsum([layout.num_nodes for layout in layouts])])
+    assert layouts[0].num_nodes != layouts[1].num_nodes
+    np.testing.assert_array_equal(np.bincount(graph.graph_index), [layout.num_nodes for layout in layouts])
+    expected_agents = np.concatenate(
+        [offset + layout.num_locations + np.arange(layout.num_agents) for layout, offset in zip(layouts, offsets)]
+    )
+    np.testing.assert_array_equal(graph.agent_nodes, expected_agents)
+
+    # Edges stay inside their graph, agents are typed like the env's agents
+    src, dst = graph.edge_index
+    np.testing.assert_array_equal(graph.graph_index[src], graph.graph_index[dst])
+    is_agv = graph.node_features[graph.agent_nodes, NODE_FEATURES.index("is_agv")]
+    np.testing.assert_array_equal(is_agv, np.tile([1, 1, 1, 0, 0], 3))
+    for g, (env, layout) in enumerate(zip(envs, layouts)):
+        single = GraphBuilder().build(env)
+        nodes = slice(offsets[g], offsets[g + 1])
+        np.testing.assert_array_equal(graph.node_features[nodes], single.node_features)
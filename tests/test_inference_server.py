@@ -0,0 +1,93 @@
+import threading
+
+import numpy as np
+import pytest
+
+from tarware_ext.policies import InferenceServer
+
+
+class _Stop(BaseException):
+    pass
+
+
+def test_requests_are_batched_and_scattered_back():
+    with InferenceServer(lambda x: x * 2, max_batch_size=8, max_wait_s=0.05) as server:
+        futures = [server.submit(np.full((2, 3), i)) for i in range(3)]
+        results = [future.result(timeout=5) for future in futures]
+
+    for i, result in enumerate(results):
+        np.testing.assert_array_equal(result, np.full((2, 3), 2 * i))
+
+
+def test_submit_while_closing_never_hangs():
+    started, release = threading.Event(), threading.Event()
+
+    def forward(x):
+        started.set()
+        release.wait(5)
+        return x
+
+    server = InferenceServer(forward, max_batch_size=1).start()
+    in_flight = server.submit(np.zeros((1, 2)))
+    started.wait(5)
+    queued = server.submit(np.ones((1, 2)))
+    closer = threading.Thread(target=server.close)
+    closer.start()
+    while not server._closing:
+        pass
+
+    with pytest.raises(RuntimeError):
+        server.submit(np.ones((1, 2)))
+    release.set()
+    closer.join(5)
+
+    assert not closer.is_alive()
+    np.testing.assert_array_equal(in_flight.result(timeout=5), np.zeros((1, 2)))
+    np.testing.assert_array_equal(queued.result(timeout=5), np.ones((1, 2)))
+
+
+def test_concurrent_submits_resolve_or_fail_when_closed():
+    server = InferenceServer(lambda x: x, max_batch_size=4, max_wait_s=0.0005).start()
+    outcomes = []
+
+    def worker():
+        for _ in range(200):
+            try:
+                future = server.submit(np.zeros((1, 1)))
+            except RuntimeError:
+                outcomes.append("rejected")
+                return
+            try:
+                future.result(timeout=5)
+                outcomes.append("served")
+            except RuntimeError:
+                outcomes.append("closed")
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    server.close()
+    for thread in threads:
+        thread.join(10)
+
+    assert not any(thread.is_alive() for thread in threads)
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_pending_requests_fail_when_forward_stops_the_server():
+    release = threading.Event()
+
+    def forward(x):
+        release.wait(5)
+        raise _Stop()
+
+    server = InferenceServer(forward, max_batch_size=1).start()
+    futures = [server.submit(np.zeros((1, 1))) for _ in range(3)]
+    release.set()
+
+    for future in futures:
+        with pytest.raises(RuntimeError):
+            future.result(timeout=5)
+    with pytest.raises(RuntimeError):
+        server.submit(np.zeros((1, 1)))
+    server.close()
@@ -0,0 +1,45 @@
+import gymnasium as gym
+import numpy as np
+import pytest
+
+import tarware  # noqa: F401
+
+
+def _envs(obs_type, normalised):
+    env_id = f"tarware-tiny-3agvs-2pickers-{obs_type}-v1"
+    dense = gym.make(env_id, normalised_coordinates=normalised).unwrapped
+    packed = gym.make(env_id, normalised_coordinates=normalised, observation_encoding="packed").unwrapped
+    return dense, packed
+
+
+@pytest.mark.parametrize("normalised", [False, True])
+@pytest.mark.parametrize("obs_type", ["partialobs", "globalobs"])
+def test_packed_observations_roundtrip(obs_type, normalised):
+    dense_env, packed_env = _envs(obs_type, normalised)
+    mapper = packed_env.observation_space_mapper
+    # Normalised coordinates are stored as 16-bit fixed point numbers
+    atol = 1.0 / np.iinfo(np.uint16).max if normalised else 0.0
+    rng = np.random.default_rng(0)
+
+    dense, packed = dense_env.reset(seed=0), packed_env.reset(seed=0)
+    for _ in range(30):
+        assert packed_env.observation_space.contains(packed)
+        for index, (vector, encoded) in enumerate(zip(dense, packed)):
+            np.testing.assert_allclose(mapper.decode(index, mapper.encode(index, vector)), vector, atol=atol)
+            np.testing.assert_allclose(mapper.decode(index, encoded), vector, atol=atol)
+        masks = dense_env.compute_valid_action_masks()
+        actions = [rng.choice(np.flatnonzero(mask)) for mask in masks]
+        dense, *_ = dense_env.step(actions)
+        packed, *_ = packed_env.step(actions)
+
+
+def test_decode_of_a_batch_of_packed_observations():
+    dense_env, packed_env = _envs("globalobs", False)
+    mapper = packed_env.observation_space_mapper
+    dense, packed = dense_env.reset(seed=0), packed_env.reset(seed=0)
+    other_dense = dense_env.step([0] * dense_env.num_agents)[0]
+    other_packed = packed_env.step([0] * packed_env.num_agents)[0]
+
+    batch = {key: np.stack([packed[0][key], other_packed[0][key]]) for key in ("flags", "coords")}
+
+    np.testing.assert_array_equal(mapper.decode(0, batch), np.stack([dense[0], other_dense[0]]))
@@ -0,0 +1,14 @@
+import gymnasium as gym
+
+import tarware  # noqa: F401
+from tarware_ext.envs import TarwareAdapter
+from tarware_ext.policies import MaskedRandomPolicy
+from tarware_ext.runners import run_episode
+
+
+def test_run_episode_with_decision_points_stays_within_max_steps():
+    env = TarwareAdapter(gym.make("tarware-tiny-3agvs-2pickers-globalobs-v1").unwrapped, decision_points=True)
+
+    metrics = run_episode(env, MaskedRandomPolicy(seed=0), max_steps=37, seed=0)
+
+    assert metrics["episode_length"] == 37
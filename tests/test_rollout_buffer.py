@@ -0,0 +1,84 @@
+import numpy as np
+
+from tarware_ext.training import RolloutBuffer
+
+
+def _fill(buffer, steps, rng):
+    added = []
+    for _ in range(steps):
+        step = {
+            "obs": rng.normal(size=(buffer.num_envs, buffer.num_agents, 3)).astype(np.float32),
+            "masks": rng.random((buffer.num_envs, buffer.num_agents, 4)) < 0.5,
+            "actions": rng.integers(0, 4, size=(buffer.num_envs, buffer.num_agents)),
+            "log_probs": rng.normal(size=(buffer.num_envs, buffer.num_agents)).astype(np.float32),
+            "rewards": rng.normal(size=(buffer.num_envs, buffer.num_agents)).astype(np.float32),
+            "values": rng.normal(size=(buffer.num_envs, buffer.num_agents)).astype(np.float32),
+            "dones": rng.random(buffer.num_envs) < 0.3,
+        }
+        buffer.add(**step)
+        added.append(step)
+    return added
+
+
+def _reference_gae(steps, last_values, gamma, gae_lambda):
+    # Per step, env and agent recursion over the stored steps, newest first
+    num_envs, num_agents = last_values.shape
+    advantages = np.zeros((len(steps), num_envs, num_agents))
+    for env in range(num_envs):
+        for agent in range(num_agents):
+            next_value, advantage = last_values[env, agent], 0.0
+            for t in reversed(range(len(steps))):
+                not_done = 0.0 if steps[t]["dones"][env] else 1.0
+                value = steps[t]["values"][env, agent]
+                delta = steps[t]["rewards"][env, agent] + gamma * next_value * not_done - value
+                advantage = delta + gamma * gae_lambda * not_done * advantage
+                advantages[t, env, agent] = advantage
+                next_value = value
+    return advantages
+
+
+def test_gae_after_wrapping_matches_the_recursion():
+    rng = np.random.default_rng(0)
+    buffer = RolloutBuffer(5, num_envs=3, num_agents=2, obs_shape=(3,), num_actions=4)
+    added = _fill(buffer, 13, rng)
+    last_values = rng.normal(size=(3, 2)).astype(np.float32)
+
+    buffer.compute_returns_and_advantages(last_values, gamma=0.9, gae_lambda=0.8)
+
+    # The buffer keeps the last 5 steps, the oldest at row pos
+    kept = added[-5:]
+    expected = _reference_gae(kept, last_values, 0.9, 0.8)
+    rows = (buffer.pos + np.arange(5)) % 5
+    assert buffer.full and len(buffer) == 5
+    np.testing.assert_allclose(buffer.advantages[rows], expected, rtol=1e-5, atol=1e-5)
+    values = np.stack([step["values"] for step in kept])
+    np.testing.assert_allclose(buffer.returns[rows], expected + values, rtol=1e-5, atol=1e-5)
+    np.testing.assert_array_equal(buffer.rewards[rows], np.stack([step["rewards"] for step in kept]))
+
+
+def test_minibatches_cover_every_sample_once():
+    rng = np.random.default_rng(1)
+    buffer = RolloutBuffer(4, num_envs=3, num_agents=2, obs_shape=(3,), num_actions=4)
+    _fill(buffer, 3, rng)
+
+    indices = np.concatenate(list(buffer.minibatch_indices(4, rng)))
+    assert buffer.num_samples == 9
+    assert sorted(indices.tolist()) == list(range(9))
+    assert buffer.flat("obs").shape == (9, 2, 3)
+
+    actions = np.concatenate([batch["actions"] for batch in buffer.minibatches(4, np.random.default_rng(2))])
+    order = np.concatenate(list(buffer.minibatch_indices(4, np.random.default_rng(2))))
+    np.testing.assert_array_equal(actions, buffer.flat("actions")[order])
+
+
+def test_memmap_dir_keeps_the_arrays_in_npy_files(tmp_path):
+    buffer = RolloutBuffer(
+        4, num_envs=2, num_agents=2, obs_shape=(3,), num_actions=4, state_shape=(5,), memmap_dir=tmp_path / "rollout"
+    )
+    _fill(buffer, 2, np.random.default_rng(0))
+    buffer.flush()
+
+    files = {path.name for path in (tmp_path / "rollout").iterdir()}
+    assert files == {f"{name}.npy" for name in buffer.fields}
+    assert isinstance(buffer.obs, np.memmap)
+    np.testing.assert_array_equal(np.load(tmp_path / "rollout" / "obs.npy")[:2], buffer.obs[:2])
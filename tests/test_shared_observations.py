@@ -0,0 +1,31 @@
+import gymnasium as gym
+import numpy as np
+import pytest
+
+import tarware  # noqa: F401
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"normalised_coordinates": True}, {"low_memory": True}])
+def test_shared_observations_are_in_the_observation_space(kwargs):
+    env = gym.make("tarware-tiny-3agvs-2pickers-sharedobs-v1", **kwargs).unwrapped
+    rng = np.random.default_rng(0)
+
+    obs = env.reset(seed=0)
+    assert env.observation_space.contains(obs)
+    for _ in range(20):
+        masks = env.compute_valid_action_masks()
+        actions = [rng.choice(np.flatnonzero(mask)) for mask in masks]
+        obs, *_ = env.step(actions)
+        assert env.observation_space.contains(obs)
+        assert obs.state is obs["state"] and obs.ego is obs["ego"]
+
+
+def test_shared_observations_rebuild_the_global_observations():
+    shared_env = gym.make("tarware-tiny-3agvs-2pickers-sharedobs-v1").unwrapped
+    global_env = gym.make("tarware-tiny-3agvs-2pickers-globalobs-v1").unwrapped
+
+    shared = shared_env.reset(seed=0)
+    expected = global_env.reset(seed=0)
+
+    np.testing.assert_array_equal(shared.to_legacy(), np.stack(expected))
+    np.testing.assert_array_equal(shared.agent_observation(1), expected[1])
@@ -0,0 +1,46 @@
+import gymnasium as gym
+import numpy as np
+
+import tarware  # noqa: F401
+
+
+def _trajectory(env_id, steps, **kwargs):
+    """Positions, carried shelves, rewards and deliveries of every step, with seeded random valid actions."""
+    env = gym.make(env_id, **kwargs).unwrapped
+    env.reset(seed=0)
+    rng = np.random.default_rng(0)
+    trajectory = []
+    for _ in range(steps):
+        masks = env.compute_valid_action_masks()
+        actions = [int(rng.choice(np.flatnonzero(mask))) for mask in masks]
+        _obs, rewards, terminateds, _truncateds, info = env.step(actions)
+        agents = [(a.x, a.y, a.dir, a.carrying_shelf.id if a.carrying_shelf else 0) for a in env.agents]
+        trajectory.append((agents, np.asarray(rewards, dtype=np.float64), info["shelf_deliveries"], all(terminateds)))
+        if all(terminateds):
+            break
+    return trajectory
+
+
+def _assert_same_trajectory(trajectory, expected):
+    assert len(trajectory) == len(expected)
+    for (agents, rewards, deliveries, done), (exp_agents, exp_rewards, exp_deliveries, exp_done) in zip(
+        trajectory, expected
+    ):
+        assert agents == exp_agents
+        np.testing.assert_allclose(rewards, exp_rewards, rtol=1e-6)
+        assert (deliveries, done) == (exp_deliveries, exp_done)
+
+
+def test_low_memory_mode_follows_the_default_simulator():
+    env_id = "tarware-small-6agvs-3pickers-globalobs-v1"
+    expected = _trajectory(env_id, 300)
+
+    _assert_same_trajectory(_trajectory(env_id, 300, low_memory=True), expected)
+
+
+def test_zone_partitioning_follows_the_default_simulator():
+    env_id = "tarware-large-19agvs-9pickers-globalobs-v1"
+    assert gym.make(env_id, zone_partitioning=True).unwrapped.zones.num_zones > 1
+    expected = _trajectory(env_id, 300)
+
+    _assert_same_trajectory(_trajectory(env_id, 300, zone_partitioning=True), expected)
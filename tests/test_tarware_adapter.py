@@ -0,0 +1,49 @@
+import warnings
+
+import gymnasium as gym
+
+import tarware  # noqa: F401
+from tarware_ext.envs import TarwareAdapter
+
+
+class _GymnasiumEnv:
+    def reset(self, seed=None, options=None):
+        return "obs", {"seed": seed}
+
+
+class _BareObservationEnv:
+    def __init__(self, obs):
+        self.obs = obs
+
+    def reset(self, seed=None, options=None):
+        return self.obs
+
+
+def test_reset_keeps_packed_observations_of_two_agents():
+    # Packed observations are dicts, so the observations of 2 agents look like an (obs, info) pair
+    env = gym.make("tarware-tiny-1agvs-1pickers-globalobs-v1", observation_encoding="packed").unwrapped
+    expected = env.reset(seed=0)
+
+    obs, info = TarwareAdapter(env).reset(seed=0)
+
+    assert info == {}
+    assert len(obs) == 2
+    assert obs[0].keys() == expected[0].keys()
+
+
+def test_reset_of_wrapped_warehouse_returns_all_observations():
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        obs, info = TarwareAdapter(gym.make("tarware-tiny-3agvs-2pickers-globalobs-v1")).reset(seed=0)
+
+    assert info == {}
+    assert len(obs) == 5
+
+
+def test_reset_of_gymnasium_env_splits_info():
+    assert TarwareAdapter(_GymnasiumEnv()).reset(seed=3) == ("obs", {"seed": 3})
+
+
+def test_reset_of_env_with_bare_observations_returns_them_all():
+    for obs in (("a", "b"), ("a", "b", "c"), [1, 2]):
+        assert TarwareAdapter(_BareObservationEnv(obs)).reset(seed=0) == (obs, {})
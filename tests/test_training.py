@@ -0,0 +1,21 @@
+import numpy as np
+
+from tarware_ext.training import MAPPO, EnvWorkers, PPOConfig
+
+
+def test_default_env_kwargs_normalise_the_coordinates():
+    envs = EnvWorkers(PPOConfig.env_id, 2, num_workers=0, env_kwargs=PPOConfig().env_kwargs)
+    states, egos, _ = envs.reset(seed=0)
+
+    assert states.max() <= 1.0
+    assert egos.max() <= 1.0
+
+
+def test_episode_means_are_left_out_until_an_episode_ends():
+    config = PPOConfig(num_envs=2, num_workers=0, total_steps=64, rollout_steps=8, epochs=1, minibatch_size=16)
+
+    history = MAPPO(config).train()
+
+    assert history[0]["episodes"] == 0
+    assert "mean_episode_return" not in history[0]
+    assert all(np.isfinite(value) for metrics in history for value in metrics.values())
@@ -0,0 +1,32 @@
+import gymnasium as gym
+import numpy as np
+
+import tarware  # noqa: F401
+from tarware.utils.wrappers import ObservationHistory
+
+
+def test_observation_history_holds_the_last_observations_oldest_first():
+    env_id = "tarware-tiny-3agvs-2pickers-partialobs-v1"
+    history_length = 3
+    env = ObservationHistory(gym.make(env_id).unwrapped, history_length)
+    raw_env = gym.make(env_id).unwrapped
+    rng = np.random.default_rng(0)
+
+    history = env.reset(seed=0)
+    raw = [raw_env.reset(seed=0)]
+    # After reset the history repeats the initial observation
+    for agent, obs in enumerate(raw[0]):
+        np.testing.assert_array_equal(history[agent], np.repeat(obs[None], history_length, axis=0))
+
+    for _ in range(4 * history_length):
+        masks = raw_env.compute_valid_action_masks()
+        actions = [int(rng.choice(np.flatnonzero(mask))) for mask in masks]
+        history, *_ = env.step(actions)
+        raw.append(raw_env.step(actions)[0])
+
+        assert env.observation_space.contains(history)
+        # The initial observation pads the history of the first steps
+        last = ([raw[0]] * history_length + raw)[-history_length:]
+        for agent in range(raw_env.num_agents):
+            assert history[agent].shape == (history_length, len(raw[0][agent]))
+            np.testing.assert_array_equal(history[agent], np.stack([obs[agent] for obs in last]))